@@ -0,0 +1 @@
+"""Benchmarks, run e.g. as `python -m prpr.benchmarks.dates`, `hot_paths` or `e2e`."""
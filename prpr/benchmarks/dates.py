@@ -0,0 +1,56 @@
+"""Compare the datetime parsing paths on synthetic tracker timestamps.
+
+python -m prpr.benchmarks.dates [COUNT]"""
+
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from prpr.date_utils import LOCAL_TIMEZONE, parse_datetime
+
+DEFAULT_COUNT = 50_000
+REPEAT = 5
+
+
+def reference_parse_datetime(datetime_string: Optional[str]) -> Optional[datetime]:
+    """parse_datetime as it used to be, the baseline."""
+    if datetime_string is None:
+        return None
+    utc_tz_suffix = "+0000"
+    if not datetime_string.endswith(utc_tz_suffix):
+        raise ValueError(f"Unexpected datetime string format: {datetime_string} 😿")
+    datetime_wo_tz = datetime_string.removesuffix(utc_tz_suffix)
+    naive_utc_datetime = datetime.fromisoformat(datetime_wo_tz)
+    return naive_utc_datetime.replace(tzinfo=timezone.utc).astimezone(tz=LOCAL_TIMEZONE)
+
+
+def make_timestamps(count: int, seed: int = 42) -> list[str]:
+    """E.g. "2020-09-23T22:14:37.658+0000", spread over a few years."""
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    moments = (start + timedelta(seconds=rng.randrange(3 * 365 * 24 * 3600) + rng.random()) for _ in range(count))
+    return [f"{moment.isoformat(timespec='milliseconds')}+0000" for moment in moments]
+
+
+def run(count: int = DEFAULT_COUNT) -> dict[str, float]:
+    """Best of REPEAT runs, in seconds, for every parsing path."""
+    timestamps = make_timestamps(count)
+    paths: dict[str, Callable[[], object]] = {
+        "reference": lambda: [reference_parse_datetime(s) for s in timestamps],
+        "parse_datetime": lambda: [parse_datetime(s) for s in timestamps],
+    }
+    return {name: min(timeit.repeat(path, number=1, repeat=REPEAT)) for name, path in paths.items()}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    results = run(count)
+    reference = results["reference"]
+    for name, seconds in results.items():
+        print(f"{name:>16}: {seconds * 1000:8.1f} ms, {reference / seconds:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
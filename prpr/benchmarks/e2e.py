@@ -0,0 +1,95 @@
+"""Run prpr end to end against the local fake server and record wall time, requests and peak RSS per flow.
+
+python -m prpr.benchmarks.e2e [--tickets N] [--latency SECONDS] [--zip-size BYTES] [--json FILE]
+
+Every flow is a `python -m prpr.main ...` process of its own with HOME pointing at a temporary directory,
+so the config, the issue cache and the downloads are isolated from the real ones. The flows share them
+with each other though, in order: the second listing is served from the cache, `--post-process`
+finds the zips downloaded by `--download all`."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+import yaml
+
+from prpr.benchmarks.fake_server import DEFAULT_TICKETS, DEFAULT_ZIP_SIZE, FakeServer
+
+FLOWS = {
+    "list": ["--mode", "all"],
+    "list-cached": ["--mode", "all"],
+    "download-all": ["--download", "all"],
+    "post-process": ["--download", "all", "--post-process"],
+}
+
+
+class FlowResult(NamedTuple):
+    flow: str
+    seconds: float
+    requests: dict[str, int]
+    peak_rss_mib: float
+
+
+def run_flow(args: list[str], home: Path) -> tuple[float, float]:
+    """Wall time in seconds and peak RSS in MiB of `prpr` with the arguments."""
+    environment = {**os.environ, "HOME": str(home), "XDG_CACHE_HOME": str(home / ".cache")}
+    started = time.perf_counter()
+    with open(home / "prpr.log", "ab") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "prpr.main", *args],
+            env=environment,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=log,
+        )
+        _, status, usage = os.wait4(process.pid, 0)
+    seconds = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        log_tail = "\n".join((home / "prpr.log").read_text().splitlines()[-20:])
+        raise RuntimeError(f"prpr {' '.join(args)} exited with {process.returncode}:\n{log_tail}")
+    rss_unit = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is in bytes on macOS, in KiB on Linux
+    return seconds, usage.ru_maxrss * rss_unit / 1024 / 1024
+
+
+def run(tickets: int = DEFAULT_TICKETS, latency: float = 0.0, zip_size: int = DEFAULT_ZIP_SIZE) -> list[FlowResult]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="prpr-e2e-") as temporary_directory, FakeServer(
+        tickets, latency, zip_size
+    ) as server:
+        home = Path(temporary_directory)
+        config = server.config(str(home / "homeworks"))
+        (home / ".prpr.yaml").write_text(yaml.safe_dump(config, allow_unicode=True))
+        for flow, args in FLOWS.items():
+            server.reset_counts()
+            seconds, peak_rss_mib = run_flow(args, home)
+            results.append(FlowResult(flow, seconds, dict(server.reset_counts()), peak_rss_mib))
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--tickets", type=int, default=DEFAULT_TICKETS)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="seconds every request to the server waits")
+    arg_parser.add_argument("--zip-size", type=int, default=DEFAULT_ZIP_SIZE, help="bytes")
+    arg_parser.add_argument("--json", type=Path, help="write the results to the file as well")
+    args = arg_parser.parse_args()
+    results = run(args.tickets, args.latency, args.zip_size)
+    print(f"{args.tickets} tickets, {args.latency * 1000:.0f} ms latency, {args.zip_size} byte zips:")
+    for result in results:
+        requests = ", ".join(f"{kind} {count}" for kind, count in sorted(result.requests.items()))
+        print(f"{result.flow:>14}: {result.seconds:6.2f} s, {result.peak_rss_mib:6.1f} MiB peak RSS, {requests}")
+    if args.json:
+        args.json.write_text(json.dumps([result._asdict() for result in results], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""A local stand-in for the Tracker API and Revisor: issues, changelogs, Revisor reviews and zips.
+
+python -m prpr.benchmarks.fake_server [--tickets N] [--latency SECONDS] [--zip-size BYTES] [--port PORT]
+
+It speaks just enough of both to run prpr end to end (see prpr.benchmarks.e2e) without the VPN:
+POST /v2/issues/_search (paginated with Link headers, honors the key, status and updated filters),
+GET /v2/issues/<key>/changelog, GET /revisor/<id>/<hash> (a review with the zip urls of its iterations)
+and GET/HEAD /zips/<name> (with ETag and Content-Length). Everything is generated from a seed."""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+import zipfile
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, NamedTuple, Optional
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_TICKETS = 200
+DEFAULT_ZIP_SIZE = 64 * 1024
+DEFAULT_ITERATIONS = 2
+DEFAULT_PER_PAGE = 50
+STATUSES = ("open", "inReview", "onTheSideOfUser", "resolved", "closed")
+STATUS_WEIGHTS = (1, 2, 2, 5, 10)  # Most of the tickets are closed, like in real life
+COURSES = ("backend-developer", "python-developer-plus")
+STUDENTS = ("Даниил Хармс", "Александр Введенский", "Николай Олейников", "Леонид Липавский", "Яков Друскин")
+FILES_PER_ZIP = 8
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.000+0000"
+START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+
+class Ticket(NamedTuple):
+    key: str
+    number: int
+    status: str
+    status_start_time: datetime
+    updated_at: datetime
+    summary: str
+    course: str
+    cohort: str
+    review_id: int
+    review_hash: str
+
+
+class FakeServer:
+    """Serves `tickets` generated tickets on a free port of 127.0.0.1 while in the `with` block.
+
+    Every request waits `latency` seconds first. Every open or in review ticket has `iterations` zips
+    of about `zip_size` bytes (random, i.e. incompressible data). `requests` counts the requests by kind."""
+
+    def __init__(
+        self,
+        tickets: int = DEFAULT_TICKETS,
+        latency: float = 0.0,
+        zip_size: int = DEFAULT_ZIP_SIZE,
+        iterations: int = DEFAULT_ITERATIONS,
+        seed: int = 42,
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.zip_size = zip_size
+        self.iterations = iterations
+        self.seed = seed
+        self.tickets = make_tickets(tickets, seed)
+        self.tickets_by_key = {ticket.key: ticket for ticket in self.tickets}
+        self.requests: Counter[str] = Counter()
+        self._zips: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _handler_for(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> FakeServer:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, name="prpr-fake-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count(self, kind: str) -> None:
+        with self._lock:
+            self.requests[kind] += 1
+
+    def reset_counts(self) -> Counter[str]:
+        """The request counts so far, the counting starts over."""
+        with self._lock:
+            counts, self.requests = self.requests, Counter()
+        return counts
+
+    def config(self, download_directory: str) -> dict[str, Any]:
+        """A prpr config (as in ~/.prpr.yaml) pointing at the server."""
+        return {
+            "startrek_token": "fake",
+            "startrek_base_url": self.url,
+            "free_work_owner": "nobody",
+            "download": {
+                "directory": download_directory,
+                "discovery": "api",
+                "api_url": f"{self.url}/revisor/{{review_id}}/{{review_hash}}",
+            },
+            "process": {
+                "runner": ["bash", "-c"],
+                "default": {
+                    "steps": {
+                        "count": "find {it_last} -type f | wc -l",
+                        "diff": "cd {hw} && diff -r -q -N {it_prev_} {it_last_}",
+                    }
+                },
+            },
+        }
+
+    def search(self, expression: dict[str, Any]) -> list[Ticket]:
+        statuses = expression.get("status")
+        if isinstance(statuses, str):
+            statuses = [statuses]
+        keys = expression.get("key")
+        if isinstance(keys, str):
+            keys = [keys]
+        updated_from = (expression.get("updated") or {}).get("from")
+        return [
+            ticket
+            for ticket in self.tickets
+            if (keys is None or ticket.key in keys)
+            and (statuses is None or ticket.status in statuses)
+            and (updated_from is None or f"{ticket.updated_at:%Y-%m-%dT%H:%M:%S}" >= updated_from)
+        ]
+
+    def zip_urls(self, ticket: Ticket) -> list[str]:
+        if ticket.status not in {"open", "inReview"}:
+            return []
+        return [
+            f"{self.url}/zips/{ticket.key}_{ticket.review_id}{iteration}.zip"
+            for iteration in range(1, self.iterations + 1)
+        ]
+
+    def zip_bytes(self, name: str) -> bytes:
+        with self._lock:
+            if (data := self._zips.get(name)) is None:
+                data = self._zips[name] = make_zip(name, self.zip_size, self.seed)
+        return data
+
+
+def make_tickets(count: int, seed: int = 42) -> list[Ticket]:
+    rng = random.Random(seed)
+    tickets = []
+    for number in range(1, count + 1):
+        status_start_time = START + timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        course = rng.choice(COURSES)
+        student = rng.choice(STUDENTS)
+        login = f"student{rng.randrange(1000)}"
+        tickets.append(
+            Ticket(
+                key=f"PCR-{number}",
+                number=number,
+                status=rng.choices(STATUSES, STATUS_WEIGHTS)[0],
+                status_start_time=status_start_time,
+                updated_at=status_start_time + timedelta(seconds=rng.randrange(3600)),
+                summary=f"[{rng.randint(1, 12)}] {student} ({login}@yandex.ru)",
+                course=course,
+                cohort=str(rng.randint(1, 20)),
+                review_id=100_000 + number,
+                review_hash=hashlib.md5(f"{seed}-{number}".encode()).hexdigest(),
+            )
+        )
+    return tickets
+
+
+def make_zip(name: str, size: int, seed: int = 42) -> bytes:
+    """A zip of FILES_PER_ZIP files in a directory, `size` random bytes in total."""
+    rng = random.Random(f"{seed}-{name}")
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for index in range(FILES_PER_ZIP):
+            archive.writestr(f"homework/module_{index}.py", rng.randbytes(size // FILES_PER_ZIP))
+    return buffer.getvalue()
+
+
+def _issue_json(server: FakeServer, ticket: Ticket) -> dict[str, Any]:
+    revisor_url = (
+        f"https://praktikum-admin.yandex-team.ru/office/revisor-review/{ticket.review_id}/{ticket.review_hash}"
+    )
+    return {
+        "self": f"{server.url}/v2/issues/{ticket.key}",
+        "key": ticket.key,
+        "summary": ticket.summary,
+        "description": f"Ревью: =={revisor_url}",
+        "status": {"self": f"{server.url}/v2/statuses/{ticket.status}", "key": ticket.status},
+        "statusStartTime": ticket.status_start_time.strftime(TIMESTAMP_FORMAT),
+        "updatedAt": ticket.updated_at.strftime(TIMESTAMP_FORMAT),
+        "components": [{"self": f"{server.url}/v2/components/{ticket.course}", "name": ticket.course}],
+        "cohort": ticket.cohort,
+    }
+
+
+def _fields_json(server: FakeServer) -> list[dict[str, Any]]:
+    """The issue fields prpr reads, the client looks them up for their defaults."""
+    array_fields = {"components"}
+    return [
+        {
+            "self": f"{server.url}/v2/fields/{field}",
+            "id": field,
+            "key": field,
+            "schema": {"type": "array" if field in array_fields else "string"},
+        }
+        for field in (
+            "key",
+            "summary",
+            "description",
+            "status",
+            "statusStartTime",
+            "updatedAt",
+            "components",
+            "cohort",
+        )
+    ]
+
+
+def _changelog_json(server: FakeServer, ticket: Ticket) -> list[dict[str, Any]]:
+    """The ticket was reviewed, sent back to the student and reopened once before getting its current status."""
+    statuses = ["open", "inReview", "onTheSideOfUser", "open", "inReview", ticket.status]
+    if statuses[-1] == statuses[-2]:
+        statuses.pop()
+    started = ticket.status_start_time - timedelta(days=len(statuses))
+    return [
+        {
+            "self": f"{server.url}/v2/issues/{ticket.key}/changelog/{index}",
+            "updatedAt": (started + timedelta(days=index)).strftime(TIMESTAMP_FORMAT),
+            "fields": [
+                {
+                    "field": {"self": f"{server.url}/v2/fields/status", "id": "status"},
+                    "from": {"self": f"{server.url}/v2/statuses/{from_status}", "key": from_status},
+                    "to": {"self": f"{server.url}/v2/statuses/{to_status}", "key": to_status},
+                }
+            ],
+        }
+        for index, (from_status, to_status) in enumerate(zip(statuses, statuses[1:]), 1)
+    ]
+
+
+def _handler_for(server: FakeServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like the real servers
+
+        def do_POST(self):
+            self._handle(head=False)
+
+        def do_GET(self):
+            self._handle(head=False)
+
+        def do_HEAD(self):
+            self._handle(head=True)
+
+        def log_message(self, format, *args):
+            pass
+
+        def _handle(self, head: bool):
+            time.sleep(server.latency)
+            url = urlsplit(self.path)
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.command == "POST" and url.path == "/v2/issues/_search":
+                server.count("issues")
+                return self._search(parse_qs(url.query), json.loads(body or b"{}"))
+            if url.path.rstrip("/") == "/v2/fields":  # The client asks for the fields to resolve their names
+                server.count("fields")
+                return self._send_json(_fields_json(server))
+            if m := re.fullmatch(r"/v2/issues/(?P<key>[\w-]+)/changelog/?", url.path):
+                server.count("changelog")
+                if ticket := server.tickets_by_key.get(m["key"]):
+                    return self._send_json(_changelog_json(server, ticket))
+            if m := re.fullmatch(r"/revisor/(?P<id>\d+)/(?P<hash>\w+)", url.path):
+                server.count("revisor")
+                if ticket := server.tickets_by_key.get(f"PCR-{int(m['id']) - 100_000}"):
+                    iterations = [
+                        {"number": number, "homework_url": url}
+                        for number, url in enumerate(server.zip_urls(ticket), 1)
+                    ]
+                    return self._send_json({"id": int(m["id"]), "hash": m["hash"], "iterations": iterations})
+            if m := re.fullmatch(r"/zips/(?P<name>[\w-]+\.zip)", url.path):
+                server.count("zip")
+                data = server.zip_bytes(m["name"])
+                return self._send(data, "application/zip", etag=hashlib.md5(data).hexdigest(), head=head)
+            self._send(b"", "text/plain", status=HTTPStatus.NOT_FOUND)
+
+        def _search(self, query: dict[str, list[str]], data: dict[str, Any]):
+            per_page = int(query.get("perPage", [DEFAULT_PER_PAGE])[0])
+            page = int(query.get("page", ["1"])[0])
+            found = server.search(data.get("filter") or {})
+            links = {}
+            if page * per_page < len(found):
+                links["Link"] = f'<{server.url}/v2/issues/_search?perPage={per_page}&page={page + 1}>; rel="next"'
+            skipped = (page - 1) * per_page
+            issues = [_issue_json(server, ticket) for ticket in found[skipped:][:per_page]]
+            self._send_json(issues, headers=links)
+
+        def _send_json(self, value, headers: Optional[dict[str, str]] = None):
+            self._send(json.dumps(value).encode(), "application/json", headers=headers)
+
+        def _send(self, data: bytes, content_type: str, status=HTTPStatus.OK, etag=None, head=False, headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            if etag:
+                self.send_header("ETag", f'"{etag}"')
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if not head:
+                self.wfile.write(data)
+
+    return Handler
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--tickets", type=int, default=DEFAULT_TICKETS)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="seconds every request waits")
+    arg_parser.add_argument("--zip-size", type=int, default=DEFAULT_ZIP_SIZE, help="bytes")
+    arg_parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="zips per open ticket")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    args = arg_parser.parse_args()
+    server = FakeServer(args.tickets, args.latency, args.zip_size, args.iterations, port=args.port)
+    print(f"Serving {args.tickets} tickets at {server.url}, point ~/.prpr.yaml at it:")
+    print(json.dumps(server.config("path/to/downloaded/homeworks"), indent=4))
+    with server:
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
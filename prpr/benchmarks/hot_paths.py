@@ -0,0 +1,155 @@
+"""Micro-benchmarks of the hot paths on synthetic homeworks, compared to the stored baselines.
+
+python -m prpr.benchmarks.hot_paths [--count N] [--table-rows N] [--save] [--tolerance RATIO]
+
+Without --save every benchmark is compared to prpr/benchmarks/baselines.json and the run fails (exit code 1)
+if any of them got slower than `tolerance` times its baseline. --save stores the results as the new baselines.
+The baselines are only comparable on the same machine with the same --count and --table-rows."""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import platform
+import sys
+import timeit
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+from rich.console import Console
+
+from prpr.benchmarks.synthetic import DEFAULT_COUNT, make_homework_arguments, make_issue_records
+from prpr.filters import FilterMode, filter_homeworks
+from prpr.homework import Homework, StatusTransition
+from prpr.main import FetchedHomeworks, build_homework, configure_logger, select_homeworks, sort_homeworks
+from prpr.output import OutputFormat, stream_rows
+from prpr.table import print_issue_table
+
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+DEFAULT_TABLE_ROWS = 500  # rich renders well under a thousand rows a second, 100k would take minutes
+DEFAULT_TOLERANCE = 1.5  # Tens of milliseconds vary by a third between runs
+REPEAT = 5
+CONFIG = {"month_start": 16}
+ARGS = argparse.Namespace(  # prpr without arguments
+    mode=FilterMode.STANDARD, problems=None, no=None, student=None, cohorts=None, from_date=None, to_date=None
+)
+
+
+class Comparison(NamedTuple):
+    name: str
+    seconds: float
+    baseline: Optional[float]
+
+    @property
+    def ratio(self) -> Optional[float]:
+        return self.seconds / self.baseline if self.baseline else None
+
+
+def make_benchmarks(
+    count: int = DEFAULT_COUNT, table_rows: int = DEFAULT_TABLE_ROWS
+) -> dict[str, Callable[[], object]]:
+    """The benchmarks by name, each one is a call of a hot path over the same synthetic homeworks."""
+    arguments = make_homework_arguments(count)
+    homeworks = [Homework(**homework_arguments) for homework_arguments in arguments]
+    transitions = [homework_arguments["transitions"] for homework_arguments in arguments]
+    null_console = Console(file=io.StringIO(), width=200)
+    benchmarks: dict[str, Callable[[], object]] = {
+        "Homework.__init__": lambda: [Homework(**homework_arguments) for homework_arguments in arguments],
+        "StatusTransition.compute_iteration": lambda: list(map(StatusTransition.compute_iteration, transitions)),
+        "StatusTransition.compute_last_opened": lambda: list(map(StatusTransition.compute_last_opened, transitions)),
+    }
+    for mode in FilterMode:
+        benchmarks[f"filter_homeworks[{mode}]"] = _filter(homeworks, mode)
+    benchmarks["sort_homeworks"] = lambda: sort_homeworks(homeworks)
+    benchmarks.update(_checks(count))
+    benchmarks["print_issue_table"] = lambda: _print(homeworks[-table_rows:], null_console)
+    benchmarks["stream_rows[tsv]"] = lambda: stream_rows(homeworks, OutputFormat.TSV, file=io.StringIO())
+    return benchmarks
+
+
+def run(count: int = DEFAULT_COUNT, table_rows: int = DEFAULT_TABLE_ROWS, repeat: int = REPEAT) -> dict[str, float]:
+    """Best of `repeat` runs, in seconds, for every benchmark."""
+    return {
+        name: min(timeit.repeat(benchmark, number=1, repeat=repeat))
+        for name, benchmark in make_benchmarks(count, table_rows).items()
+    }
+
+
+def load_baselines(path: Path = BASELINES_PATH) -> dict:
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def save_baselines(results: dict[str, float], count: int, table_rows: int, path: Path = BASELINES_PATH) -> None:
+    baselines = {
+        "count": count,
+        "table_rows": table_rows,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seconds": {name: round(seconds, 6) for name, seconds in results.items()},
+    }
+    path.write_text(json.dumps(baselines, indent=2, ensure_ascii=False) + "\n")
+
+
+def compare(results: dict[str, float], baselines: dict, count: int, table_rows: int) -> list[Comparison]:
+    """Results next to their baselines, without baselines if those were measured on different data."""
+    comparable = baselines.get("count") == count and baselines.get("table_rows") == table_rows
+    seconds = baselines.get("seconds", {}) if comparable else {}
+    return [Comparison(name, result, seconds.get(name)) for name, result in results.items()]
+
+
+def regressions(comparisons: list[Comparison], tolerance: float = DEFAULT_TOLERANCE) -> list[Comparison]:
+    return [comparison for comparison in comparisons if comparison.ratio and comparison.ratio > tolerance]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="synthetic homeworks")
+    arg_parser.add_argument("--table-rows", type=int, default=DEFAULT_TABLE_ROWS, help="rows in the table printed")
+    arg_parser.add_argument("--save", action="store_true", help="store the results as the baselines")
+    arg_parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="slowdown to fail on")
+    args = arg_parser.parse_args()
+    configure_logger(verbose=0)
+
+    results = run(args.count, args.table_rows)
+    comparisons = compare(results, load_baselines(), args.count, args.table_rows)
+    for comparison in comparisons:
+        versus = f", {comparison.ratio:4.2f}x baseline" if comparison.ratio else ""
+        print(f"{comparison.name:>40}: {comparison.seconds * 1000:9.1f} ms{versus}")
+    if args.save:
+        save_baselines(results, args.count, args.table_rows)
+        print(f"Baselines saved to {BASELINES_PATH}.")
+    elif slower := regressions(comparisons, args.tolerance):
+        print(f"Slower than {args.tolerance}x baseline: {', '.join(comparison.name for comparison in slower)} 😿")
+        sys.exit(1)
+
+
+def _checks(count: int) -> dict[str, Callable[[], object]]:
+    """A check (after fetching the records) when no ticket changed since the previous one:
+    with all the homeworks built and filtered anew, and with the ones kept from the previous check."""
+    records, histories = make_issue_records(count)
+
+    def rebuilt():
+        homeworks = [build_homework(record, number, histories, CONFIG) for number, record in enumerate(records, 1)]
+        return select_homeworks(homeworks, ARGS, CONFIG)
+
+    fetched = FetchedHomeworks(CONFIG)
+    select_homeworks(fetched.update(records, histories), ARGS, CONFIG, fetched)
+    return {
+        "check[rebuilt]": rebuilt,
+        "check[kept]": lambda: select_homeworks(fetched.update(records, histories), ARGS, CONFIG, fetched),
+    }
+
+
+def _filter(homeworks: list[Homework], mode: FilterMode) -> Callable[[], list[Homework]]:
+    return lambda: filter_homeworks(homeworks, mode=mode, config=CONFIG)
+
+
+def _print(homeworks: list[Homework], console: Console) -> None:
+    console.file.seek(0)
+    console.file.truncate()
+    print_issue_table(homeworks, console=console)
+
+
+if __name__ == "__main__":
+    main()
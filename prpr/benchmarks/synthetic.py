@@ -0,0 +1,108 @@
+"""Synthetic homeworks that look like the real ones: summaries, descriptions with Revisor urls and status histories."""
+
+from __future__ import annotations
+
+import hashlib
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from prpr.homework import Homework, Status, StatusTransition
+from prpr.startrack_client import IssueRecord
+
+DEFAULT_COUNT = 100_000
+STATUSES = ("open", "inReview", "onTheSideOfUser", "resolved", "closed")
+STATUS_WEIGHTS = (1, 2, 2, 5, 10)
+COURSES = {"backend-developer": "", "python-developer-plus": "+"}
+FIRST_NAMES = ("Даниил", "Александр", "Николай", "Леонид", "Яков", "Тамара", "Евгений", "Игорь")
+LAST_NAMES = ("Хармс", "Введенский", "Олейников", "Липавский", "Друскин", "Мейер", "Шварц", "Бахтерев")
+DESCRIPTION = (
+    "Студент отправил работу на ревью.\n\n"
+    "Проект: {problem}, итерация {iteration}.\n"
+    "Ссылка на ревью: =={revisor_url}\n\n"
+    "Пожалуйста, проверьте работу в течение суток после взятия в работу."
+)
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def make_homework_arguments(
+    count: int = DEFAULT_COUNT, seed: int = 42, now: Optional[datetime] = None
+) -> list[dict[str, Any]]:
+    """The arguments of `count` Homework constructors, as fetch_homeworks passes them, over the last 400 days."""
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    arguments = []
+    for number in range(1, count + 1):
+        problem = rng.randint(1, 15)
+        course = rng.choice(tuple(COURSES))
+        back_cohort = f" (back_cohort_{rng.randint(1, 30)})" if rng.random() < 0.2 else ""
+        student = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} (student{rng.randrange(10_000)}@yandex.ru)"
+        status = rng.choices(STATUSES, STATUS_WEIGHTS)[0]
+        status_updated = now - timedelta(seconds=rng.randrange(400 * 24 * 3600), milliseconds=rng.randrange(1000))
+        review_id = 1_000_000 + number
+        revisor_url = (
+            "https://praktikum-admin.yandex-team.ru/office/revisor-review/"
+            f"{review_id}/{hashlib.md5(str(review_id).encode()).hexdigest()}"
+        )
+        transitions = make_transitions(rng, status, status_updated)
+        iteration = 1 + sum(1 for transition in transitions or () if transition.to == Status.OPEN)
+        arguments.append(
+            {
+                "issue_key": f"PCR-{number}",
+                "summary": f"[{problem}{back_cohort}] {student}",
+                "cohort": f"{rng.randint(1, 30)}{COURSES[course]}",
+                "status": status,
+                "status_updated": f"{status_updated:{TIMESTAMP_FORMAT}}.{status_updated.microsecond // 1000:03d}+0000",
+                "description": DESCRIPTION.format(problem=problem, iteration=iteration, revisor_url=revisor_url),
+                "number": number,
+                "course": course,
+                "transitions": transitions,
+            }
+        )
+    return arguments
+
+
+def make_transitions(rng: random.Random, status: str, status_updated: datetime) -> Optional[list[StatusTransition]]:
+    """0-3 rounds of review, the last one ends in the current status; only for open or in review tickets,
+    like the tracker client does."""
+    if status not in {"open", "inReview"}:
+        return None
+    review_round = [
+        (Status.OPEN, Status.IN_REVIEW),
+        (Status.IN_REVIEW, Status.ON_THE_SIDE_OF_USER),
+        (Status.ON_THE_SIDE_OF_USER, Status.OPEN),
+    ]
+    changes = review_round * rng.randint(0, 3)
+    if status == "inReview":
+        changes.append((Status.OPEN, Status.IN_REVIEW))
+    started = status_updated - timedelta(days=len(changes))
+    return [
+        StatusTransition(from_status, to_status, started + timedelta(days=index))
+        for index, (from_status, to_status) in enumerate(changes, 1)
+    ]
+
+
+def make_homeworks(count: int = DEFAULT_COUNT, seed: int = 42, now: Optional[datetime] = None) -> list[Homework]:
+    return [Homework(**arguments) for arguments in make_homework_arguments(count, seed, now)]
+
+
+def make_issue_records(
+    count: int = DEFAULT_COUNT, seed: int = 42, now: Optional[datetime] = None
+) -> tuple[list[IssueRecord], dict[str, Optional[list[StatusTransition]]]]:
+    """The same homeworks as the tracker client returns them to fetch_homeworks: records and status histories."""
+    records, histories = [], {}
+    for arguments in make_homework_arguments(count, seed, now):
+        records.append(
+            IssueRecord(
+                key=arguments["issue_key"],
+                summary=arguments["summary"],
+                cohort=arguments["cohort"],
+                components=[arguments["course"]],
+                status=arguments["status"],
+                status_start_time=arguments["status_updated"],
+                description=arguments["description"],
+                updated_at=arguments["status_updated"],
+            )
+        )
+        histories[arguments["issue_key"]] = arguments["transitions"]
+    return records, histories
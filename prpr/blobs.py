@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+import stat
+from pathlib import Path
+from typing import Optional, Tuple
+
+from loguru import logger
+
+BLOBS_DIRECTORY_NAME = ".blobs"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def configure_blob_store(download_config) -> Optional[BlobStore]:
+    if not download_config.get("dedup", False):
+        return None
+    return get_blob_store(download_config)
+
+
+def get_blob_store(download_config) -> Optional[BlobStore]:
+    if not (root_directory := download_config.get("directory")):
+        return None
+    return BlobStore(Path(root_directory).expanduser() / BLOBS_DIRECTORY_NAME)
+
+
+class BlobStore:
+    """Content-addressed storage for extracted files: identical files are hardlinks to the same blob.
+
+    Blobs are named by the SHA-256 of their contents and their mode bits, which all the links share:
+    an executable script and a plain file with the same contents are different blobs. Changing a file in place
+    changes it in every iteration directory sharing the blob.
+    A blob no longer linked from anywhere has a link count of 1 and is removed by `gc`."""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def add_tree(self, directory: Path) -> Tuple[int, int]:
+        """Replace the files in `directory` with links to blobs, return the number of files and bytes saved."""
+        deduplicated, saved = 0, 0
+        for path in sorted(directory.rglob("*")):
+            if path.is_symlink() or not path.is_file():
+                continue
+            try:
+                if self._add(path):
+                    deduplicated += 1
+                    saved += path.stat().st_size
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                logger.warning(f"{self.root} and {directory} are on different devices, skipping deduplication 😿")
+                break
+        logger.debug(f"Deduplicated {deduplicated} files ({saved} bytes) in {directory}.")
+        return deduplicated, saved
+
+    def _add(self, path: Path) -> bool:
+        """Link `path` to its blob, return True if the blob already existed."""
+        blob = self._blob_path(hash_file(path), path.stat().st_mode)
+        if blob.exists():
+            if not path.samefile(blob):
+                temporary_path = path.with_name(f".{path.name}.prpr-link")
+                os.link(blob, temporary_path)
+                os.replace(temporary_path, path)
+            return True
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        os.link(path, blob)
+        return False
+
+    def gc(self) -> Tuple[int, int]:
+        """Remove blobs which are not linked from any directory, return the number of blobs and bytes freed."""
+        removed, freed = 0, 0
+        if not self.root.exists():
+            return removed, freed
+        for blob in self.root.glob("*/*"):
+            blob_stat = blob.stat()
+            if blob_stat.st_nlink == 1:
+                blob.unlink()
+                removed += 1
+                freed += blob_stat.st_size
+        for subdirectory in self.root.iterdir():
+            if subdirectory.is_dir() and not any(subdirectory.iterdir()):
+                subdirectory.rmdir()
+        return removed, freed
+
+    def _blob_path(self, digest: str, mode: int) -> Path:
+        return self.root / digest[:2] / f"{digest[2:]}.{stat.S_IMODE(mode):o}"
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+from loguru import logger
+
+from prpr.homework import Status, StatusTransition
+from prpr.startrack_client import IssueRecord
+
+CACHE_KEY_NAME = "cache"
+CACHE_FILENAME = "issues.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    updated_at TEXT,
+    record TEXT NOT NULL,
+    transitions TEXT,
+    PRIMARY KEY (scope, key)
+);
+CREATE TABLE IF NOT EXISTS syncs (
+    scope TEXT NOT NULL PRIMARY KEY,
+    synced_at TEXT NOT NULL
+);
+"""
+
+
+def get_cache_directory() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "prpr"
+
+
+def open_issue_cache(config) -> Optional[IssueCache]:
+    if not config.get(CACHE_KEY_NAME, True):
+        logger.debug("Issue cache is disabled.")
+        return None
+    cache_directory = get_cache_directory()
+    cache_directory.mkdir(parents=True, exist_ok=True)
+    return IssueCache(cache_directory / CACHE_FILENAME)
+
+
+class IssueCache:
+    """Issues and their status histories as of the last run, grouped by scope (e.g. the assignee)."""
+
+    def __init__(self, path: Path):
+        logger.debug(f"Opening issue cache at {path}...")
+        self.path = path
+        self.connection = sqlite3.connect(str(path))
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def load(self, scope: str) -> Tuple[dict[str, IssueRecord], dict[str, Optional[list[StatusTransition]]]]:
+        records, histories = {}, {}
+        rows = self.connection.execute("SELECT key, record, transitions FROM issues WHERE scope = ?", (scope,))
+        for key, record, transitions in rows:
+            records[key] = IssueRecord(**json.loads(record))
+            histories[key] = _loads_transitions(transitions)
+        logger.debug(f"Loaded {len(records)} cached issues for {scope}.")
+        return records, histories
+
+    def watermark(self, scope: str) -> Optional[str]:
+        """When the last sync started; anything updated since then has to be fetched again.
+
+        Falls back to the latest `updatedAt` among cached issues for the caches stored without a sync time."""
+        row = self.connection.execute("SELECT synced_at FROM syncs WHERE scope = ?", (scope,)).fetchone()
+        if row:
+            return row[0]
+        (watermark,) = self.connection.execute(
+            "SELECT MAX(updated_at) FROM issues WHERE scope = ?", (scope,)
+        ).fetchone()
+        return watermark
+
+    def store(
+        self,
+        scope: str,
+        records: list[IssueRecord],
+        histories: dict[str, Optional[list[StatusTransition]]],
+        synced_at: Optional[str] = None,
+    ) -> None:
+        with self.connection:
+            if synced_at:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO syncs (scope, synced_at) VALUES (?, ?)", (scope, synced_at)
+                )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO issues (scope, key, updated_at, record, transitions) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        scope,
+                        record.key,
+                        record.updated_at,
+                        json.dumps(record.__dict__),
+                        _dumps_transitions(histories.get(record.key)),
+                    )
+                    for record in records
+                ],
+            )
+        logger.debug(f"Cached {len(records)} issues for {scope}.")
+
+    def delete(self, scope: str, keys: Iterable[str]) -> None:
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM issues WHERE scope = ? AND key = ?", [(scope, key) for key in keys]
+            )
+
+    def clear(self, scope: str) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM issues WHERE scope = ?", (scope,))
+            self.connection.execute("DELETE FROM syncs WHERE scope = ?", (scope,))
+
+
+class MemoryIssueCache:
+    """Same as IssueCache, but lives only as long as the process, e.g. for watch mode with the cache disabled."""
+
+    def __init__(self):
+        self.scopes: dict[str, Tuple[dict[str, IssueRecord], dict[str, Optional[list[StatusTransition]]]]] = {}
+        self.synced_at: dict[str, str] = {}
+
+    def load(self, scope: str) -> Tuple[dict[str, IssueRecord], dict[str, Optional[list[StatusTransition]]]]:
+        records, histories = self.scopes.get(scope, ({}, {}))
+        return dict(records), dict(histories)
+
+    def watermark(self, scope: str) -> Optional[str]:
+        if scope in self.synced_at:
+            return self.synced_at[scope]
+        records, _ = self.scopes.get(scope, ({}, {}))
+        return max((record.updated_at for record in records.values() if record.updated_at), default=None)
+
+    def store(
+        self,
+        scope: str,
+        records: list[IssueRecord],
+        histories: dict[str, Optional[list[StatusTransition]]],
+        synced_at: Optional[str] = None,
+    ) -> None:
+        if synced_at:
+            self.synced_at[scope] = synced_at
+        cached_records, cached_histories = self.scopes.setdefault(scope, ({}, {}))
+        for record in records:
+            cached_records[record.key] = record
+            cached_histories[record.key] = histories.get(record.key)
+
+    def delete(self, scope: str, keys: Iterable[str]) -> None:
+        cached_records, cached_histories = self.scopes.get(scope, ({}, {}))
+        for key in keys:
+            cached_records.pop(key, None)
+            cached_histories.pop(key, None)
+
+    def clear(self, scope: str) -> None:
+        self.scopes.pop(scope, None)
+        self.synced_at.pop(scope, None)
+
+
+def _dumps_transitions(transitions: Optional[list[StatusTransition]]) -> Optional[str]:
+    if transitions is None:
+        return None
+    return json.dumps(
+        [
+            {
+                "from": t.from_.name if t.from_ is not None else None,
+                "to": t.to.name,
+                "timestamp": t.timestamp.isoformat() if t.timestamp else None,
+            }
+            for t in transitions
+        ]
+    )
+
+
+def _loads_transitions(transitions: Optional[str]) -> Optional[list[StatusTransition]]:
+    if transitions is None:
+        return None
+    return [
+        StatusTransition(
+            Status[t["from"]] if t["from"] is not None else None,
+            Status[t["to"]],
+            datetime.fromisoformat(t["timestamp"]) if t["timestamp"] else None,
+        )
+        for t in json.loads(transitions)
+    ]
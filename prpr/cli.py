@@ -1,14 +1,25 @@
 import argparse
 import datetime as dt
+from pathlib import Path
 
-from prpr.download import DownloadMode
+from prpr.download_mode import DownloadMode
 from prpr.filters import FilterMode
+from prpr.output import OutputFormat
+
+DEFAULT_WATCH_INTERVAL = 60
 
 DOWNLOAD = "--download"
 POST_PROCESS = "--post-process"
 INTERACTIVE = "--interactive"
 
 
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive number")
+    return number
+
+
 def configure_arg_parser():
     arg_parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter)
     filters = arg_parser.add_argument_group(
@@ -18,6 +29,33 @@ def configure_arg_parser():
     configure_filter_arguments(filters)
 
     arg_parser.add_argument("-o", "--open", action="store_true", default=False, help="open homework pages in browser")
+    arg_parser.add_argument(
+        "-w",
+        "--watch",
+        nargs="?",
+        type=positive_int,
+        const=DEFAULT_WATCH_INTERVAL,
+        metavar="INTERVAL",
+        help=f"keep the table on screen, check for updates every INTERVAL seconds (default {DEFAULT_WATCH_INTERVAL})",
+    )
+    arg_parser.add_argument(
+        "--format",
+        type=OutputFormat.from_string,
+        choices=list(OutputFormat),
+        default=OutputFormat.TABLE,
+        help="""output format
+            table: a table, duh
+            tsv: tab-separated values with a header, a line per homework, printed as soon as it's ready
+            jsonl: a JSON object per line, keyed by the column names
+            plain: space-separated values, "-" for empty ones (for fzf, grep and the like)""",
+    )
+    arg_parser.add_argument(
+        "--stats",
+        action="store_true",
+        default=False,
+        help="""closed homeworks per payout month (see month_start), course, problem and iteration
+            only the chosen month with --mode closed-this-month or closed-previous-month""",
+    )
 
     download_options = arg_parser.add_argument_group(
         "download",
@@ -32,6 +70,8 @@ def configure_arg_parser():
     )
     process_options = arg_parser.add_argument_group("process")
     configure_process_arguments(process_options)
+    profile_options = arg_parser.add_argument_group("profile")
+    configure_profile_arguments(profile_options)
     return arg_parser
 
 
@@ -98,6 +138,12 @@ def configure_filter_arguments(filters):
         action="store_true",
         help="show unassigned (free) tickets (overrides -u/--user)",
     )
+    filters.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        default=False,
+        help="ignore the cached issues and fetch all of them again",
+    )
 
 
 def configure_download_arguments(download_options):
@@ -116,6 +162,18 @@ def configure_download_arguments(download_options):
             interactive-all: choose one interactively, repeat
             """,
     )
+    download_options.add_argument(
+        "--refresh",
+        help="download zips again if they changed on the server since they were downloaded, rerun cached steps",
+        action="store_true",
+        default=False,
+    )
+    download_options.add_argument(
+        "--gc",
+        help="remove deduplicated files no longer used by any homework (see download.dedup) and exit",
+        action="store_true",
+        default=False,
+    )
     download_options.add_argument(
         "--head",
         help="download with visible browser window (default is headless, i.e. the window is hidden)",
@@ -137,3 +195,18 @@ def configure_process_arguments(process_options):
         action="store_true",
         default=False,
     )
+
+
+def configure_profile_arguments(profile_options):
+    profile_options.add_argument(
+        "--profile",
+        help="print the time spent in every phase (tracker requests, filters, downloads, steps) when done",
+        action="store_true",
+        default=False,
+    )
+    profile_options.add_argument(
+        "--profile-trace",
+        metavar="FILE",
+        type=Path,
+        help="write the phases as a Chrome trace (JSON, for chrome://tracing or ui.perfetto.dev) to FILE",
+    )
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from datetime import datetime
+from functools import partial
+from itertools import compress
+from operator import attrgetter
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from prpr.date_utils import LOCAL_TIMEZONE
+from prpr.homework import Homework, Status
+
+
+class HomeworkColumns:
+    """Homeworks stored column by column: status codes, problems, numbers, cohorts and update times.
+
+    A filter is compiled into a chain of predicates: the first one is mapped over its whole column,
+    the next ones only over the rows that are still selected.
+    Homeworks are sorted by the indices (like Homework.order_key) without touching the objects.
+    A column is read from the homeworks when a query first scans it in full. A single query is about as fast
+    as filtering the homeworks directly, so the columns are kept between the checks (see main.FetchedHomeworks)
+    and only the rows of the changed homeworks are replaced."""
+
+    COLUMNS = ("status", "problem", "number", "cohort", "status_updated", "student")
+
+    def __init__(self, homeworks: Iterable[Homework]):
+        self.homeworks = list(homeworks)
+        self._columns: dict[str, list] = {}
+
+    def __len__(self) -> int:
+        return len(self.homeworks)
+
+    def replace(self, changed: dict[int, Homework]) -> None:
+        """Put the homeworks in place of the ones at the given positions, in `homeworks` and in the columns."""
+        for position, homework in changed.items():
+            self.homeworks[position] = homework
+            for name, column in self._columns.items():
+                column[position] = getattr(homework, name)
+
+    def column(self, name: str) -> list:
+        if (column := self._columns.get(name)) is None:
+            assert name in self.COLUMNS, f"Unexpected column {name} 😿"
+            column = self._columns[name] = list(map(attrgetter(name), self.homeworks))
+        return column
+
+    def where(
+        self,
+        *,
+        statuses: Optional[Iterable[Status]] = None,
+        problems: Optional[Iterable[int]] = None,
+        number: Optional[int] = None,
+        student: Optional[str] = None,
+        cohorts: Optional[Iterable[str]] = None,
+        updated_from: Optional[datetime] = None,
+        updated_to: Optional[datetime] = None,
+        within: Optional[list[int]] = None,
+    ) -> list[int]:
+        """The indices of the homeworks that match all the given conditions, in the original order.
+
+        `within` are the (sorted) indices to choose from, e.g. the ones found by an index."""
+        conditions: list[tuple[str, Callable[[Any], bool]]] = []  # The most selective first
+        if number is not None:
+            conditions.append(("number", number.__eq__))
+        if statuses is not None:
+            conditions.append(("status", frozenset(statuses).__contains__))
+        if problems is not None:
+            conditions.append(("problem", frozenset(problems).__contains__))
+        if cohorts is not None:
+            conditions.append(("cohort", frozenset(cohorts).__contains__))
+        if updated_from is not None:
+            # The update times are in LOCAL_TIMEZONE: compared to a bound in the same timezone
+            # they are as cheap as epoch floats, and converting them to floats would cost more
+            conditions.append(("status_updated", partial(_not_before, updated_from.astimezone(LOCAL_TIMEZONE))))
+        if updated_to is not None:
+            conditions.append(("status_updated", partial(_not_after, updated_to.astimezone(LOCAL_TIMEZONE))))
+        if student:
+            conditions.append(("student", partial(_contains_case_insensitive, student.lower())))
+        selected = range(len(self)) if within is None else within
+        for name, accept in conditions:
+            selected = list(compress(selected, map(accept, self._values(name, selected))))
+        return list(selected)
+
+    def argsort(self, indices: Optional[Iterable[int]] = None) -> list[int]:
+        """The indices ordered by status, then by status update time, i.e. by Homework.order_key."""
+        indices = list(range(len(self)) if indices is None else indices)
+        # Two stable sorts by single keys instead of one by tuples: no tuple is built per homework
+        statuses, updated = list(self._values("status", indices)), list(self._values("status_updated", indices))
+        order = sorted(range(len(indices)), key=updated.__getitem__)
+        order.sort(key=statuses.__getitem__)
+        return list(map(indices.__getitem__, order))
+
+    def take(self, indices: Iterable[int]) -> list[Homework]:
+        return list(map(self.homeworks.__getitem__, indices))
+
+    def _values(self, name: str, indices: Sequence[int]) -> Iterable:
+        """The column for all the rows, otherwise the values of the given rows (without building the column)."""
+        if len(indices) == len(self):
+            return self.column(name)
+        if name in self._columns:
+            return map(self._columns[name].__getitem__, indices)
+        return map(attrgetter(name), map(self.homeworks.__getitem__, indices))
+
+
+def _contains_case_insensitive(substring: str, string: str) -> bool:
+    return substring in string.lower()
+
+
+def _not_before(bound: datetime, updated: Optional[datetime]) -> bool:
+    return updated is not None and bound <= updated
+
+
+def _not_after(bound: datetime, updated: Optional[datetime]) -> bool:
+    return updated is not None and updated <= bound
@@ -1,10 +1,12 @@
 import datetime as dt
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import Optional, Tuple
 
 from dateutil.relativedelta import relativedelta
 
 LOCAL_TIMEZONE = datetime.now().astimezone().tzinfo
+UTC_TZ_SUFFIX = "+0000"
+ISO_UTC_TZ_SUFFIX = "+00:00"  # The only offset format datetime.fromisoformat accepts before Python 3.11
 
 
 def parse_datetime(datetime_string: Optional[str]) -> Optional[datetime]:
@@ -12,13 +14,10 @@ def parse_datetime(datetime_string: Optional[str]) -> Optional[datetime]:
     if datetime_string is None:
         return None
     # Note to self: dateutil can parse these dates.
-    utc_tz_suffix = "+0000"
-    if not datetime_string.endswith(utc_tz_suffix):
+    if not datetime_string.endswith(UTC_TZ_SUFFIX):
         raise ValueError(f"Unexpected datetime string format: {datetime_string} 😿")
-    datetime_wo_tz = datetime_string.removesuffix(utc_tz_suffix)
-    naive_utc_datetime = datetime.fromisoformat(datetime_wo_tz)
-    local_datetime = naive_utc_datetime.replace(tzinfo=timezone.utc).astimezone(tz=LOCAL_TIMEZONE)
-    return local_datetime
+    utc_datetime = datetime.fromisoformat(datetime_string.removesuffix(UTC_TZ_SUFFIX) + ISO_UTC_TZ_SUFFIX)
+    return utc_datetime.astimezone(LOCAL_TIMEZONE)
 
 
 def month_start_and_end(day: dt.date, month_start: int) -> Tuple[dt.date, dt.date]:
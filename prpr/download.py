@@ -1,76 +1,119 @@
 from __future__ import annotations
 
 import os
-import re
+import shutil
 import sys
 import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from enum import Enum, auto
 from pathlib import Path
-from typing import Iterable, Optional, Tuple
+from typing import IO, Callable, Iterable, Optional, Tuple, TypeVar
 
-import requests
 from loguru import logger
-from pyfiglet import Figlet
 from rich import print as rprint
 from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
 
+from prpr.download_mode import DownloadMode  # noqa: F401, re-exported for compatibility
 from prpr.homework import Homework
+from prpr.http_client import HttpClient, Manifest
+from prpr.profiling import span
+from prpr.revisor import API_URL, RevisorClient, extract_version_id, find_zip_urls
+from prpr.unzip import Extractor, UnsafeZipError
 
 PAGE_LOAD_TIMEOUT = 60
 DRIVER_TIMEOUT = 110
+DEFAULT_DOWNLOAD_WORKERS = 4
+DISCOVERY_API = "api"
+DEFAULT_DRIVER_MAX_USES = 50
 YOUR_DESCRIPTION_HERE = "your_description_here"
 
 HISTORY_TAB_XPATH = "//article[text()='История']"
 REVIEW_TAB_XPATH = "//article[text()='Код-ревью']"
 
+T = TypeVar("T")
 
-class DownloadMode(Enum):
-    ONE = auto()
-    ALL = auto()
-    # TODAY = auto() TODO: add customizable day end
-    INTERACTIVE = auto()
-    INTERACTIVE_ALL = auto()
 
-    def __str__(self):
-        return self.name.lower().replace("_", "-")
-
-    def __repr__(self):
-        return str(self)
-
-    @staticmethod
-    def from_string(mode: str) -> DownloadMode:
-        try:
-            return DownloadMode[mode.upper().replace("-", "_")]
-        except KeyError:
-            logger.error(f"Unexpected PostProcessMode mode: '{mode}' 😿")
-            return mode
-
-
-def download(homework: Homework, config, headless=False):
+def download(homework: Homework, config, headless=False, refresh=False):
     logger.debug(homework)
     download_config = config.get("download", {})
     logger.debug(f"{download_config=}")
 
     homework_directory = _get_homework_directory(homework, download_config)
 
-    driver = configure_driver(download_config, headless=headless)
-    urls = get_zip_urls(driver, homework.revisor_url)
+    http_client = HttpClient(download_config)
+    extractor = Extractor(download_config)
+    if not (urls := _get_zip_urls_without_browser(homework, _configure_revisor_client(download_config, http_client))):
+        driver = configure_driver(download_config, headless=headless)
+        urls = get_zip_urls(driver, homework.revisor_url)
 
     logger.debug(f"Got {len(urls)} urls:")
     results = []
     for iteration, url in enumerate(urls, 1):
         logger.debug(f"{iteration}: {url}")
-        results.append(_download_zip(url, homework_directory, iteration, homework))
+        results.append(_download_zip(url, homework_directory, iteration, homework, http_client, refresh, extractor))
     return results
 
 
+class DriverManager:
+    """Keeps one browser for the whole session instead of starting Firefox for every batch.
+
+    The browser is started on the first use, restarted after `download.browser.max_uses` uses (0 to never)
+    and after a crash, and quit by `quit` or on leaving the `with` block."""
+
+    def __init__(self, download_config, headless=True):
+        self.download_config = download_config
+        self.headless = headless
+        self.max_uses = download_config.get("browser", {}).get("max_uses", DEFAULT_DRIVER_MAX_USES)
+        self._driver = None
+        self._uses = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.quit()
+
+    def run(self, action: Callable[[webdriver.Remote], T]) -> T:
+        """Runs `action` with the browser, retries once with a fresh browser if the old one crashed."""
+        try:
+            return action(self._acquire())
+        except WebDriverException as e:
+            logger.warning(f"Browser failed ({e.__class__.__name__}), restarting it...")
+            self.quit()
+            return action(self._acquire())
+
+    def quit(self):
+        if self._driver is None:
+            return
+        driver, self._driver = self._driver, None
+        self._uses = 0
+        try:
+            driver.quit()
+        except WebDriverException:
+            logger.debug("Browser is already gone.")
+
+    def _acquire(self):
+        if self._driver is not None and self.max_uses and self._uses >= self.max_uses:
+            logger.debug(f"Browser was used {self._uses} times, restarting it...")
+            self.quit()
+        if self._driver is None:
+            self._driver = configure_driver(self.download_config, headless=self.headless)
+        self._uses += 1
+        return self._driver
+
+
 class BatchDownloader:
-    def __init__(self, config, headless=True):
+    def __init__(self, config, headless=True, refresh=False, driver_manager: Optional[DriverManager] = None):
         self.download_config = config.get("download", {})
-        self.driver = configure_driver(self.download_config, headless=headless)
-        pass
+        self.refresh = refresh
+        self.workers = self.download_config.get("workers", DEFAULT_DOWNLOAD_WORKERS)
+        self.http_client = HttpClient(self.download_config)
+        self.revisor = _configure_revisor_client(self.download_config, self.http_client)
+        self.extractor = Extractor(self.download_config)
+        # A shared browser outlives the batch, an own one is quit after it
+        self._owns_driver = driver_manager is None
+        self.driver_manager = driver_manager or DriverManager(self.download_config, headless=headless)
 
     def __enter__(self):
         return self
@@ -78,21 +121,86 @@ class BatchDownloader:
     def __exit__(self, exc_type, exc_val, exc_tb):
         pass
 
+    def _quit_driver(self):
+        if self._owns_driver:
+            self.driver_manager.quit()
+
+    def _get_zip_urls(self, homework: Homework) -> list[str]:
+        """The browser is started only if it's needed, i.e. when zip urls can't be found without it."""
+        with span("download.zip_urls", homework=homework.issue_key):
+            if urls := _get_zip_urls_without_browser(homework, self.revisor):
+                return urls
+            with span("download.browser", homework=homework.issue_key):
+                return self.driver_manager.run(lambda driver: _get_zip_urls(driver, homework.revisor_url))
+
     def download_batch(self, homeworks: Iterable[Homework], print_banner=True):
-        with self.driver as driver:
+        if self.workers > 1:
+            yield from self._download_batch_pipelined(homeworks, print_banner)
+            return
+        try:
             for homework in homeworks:
                 if print_banner:
                     _print_banner(homework)
                 logger.info(f"Downloading {homework}...")
                 homework_directory = _get_homework_directory(homework, self.download_config)
-                urls = _get_zip_urls(driver, homework.revisor_url)
+                urls = self._get_zip_urls(homework)
                 logger.debug(f"Got {len(urls)} urls:")
                 results = []
                 for iteration, url in enumerate(urls, 1):
                     logger.debug(f"{iteration}: {url}")
 
-                    results.append(_download_zip(url, homework_directory, iteration, homework))
+                    results.append(
+                        _download_zip(
+                            url,
+                            homework_directory,
+                            iteration,
+                            homework,
+                            self.http_client,
+                            self.refresh,
+                            self.extractor,
+                        )
+                    )
                 yield results
+        finally:
+            self._quit_driver()
+
+    def _download_batch_pipelined(self, homeworks: Iterable[Homework], print_banner=True):
+        """Same as download_batch, but the stages overlap.
+
+        Zip urls are discovered homework after homework in a thread of their own, the zips are fetched
+        by a pool of `workers` threads and unzipped by one more thread as soon as they arrive.
+        The results are still yielded in the order of homeworks."""
+        homeworks = list(homeworks)
+        logger.debug(f"Downloading {len(homeworks)} homeworks with {self.workers} workers...")
+        browser = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prpr-browser")
+        fetchers = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prpr-fetch")
+        extractor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prpr-unzip")
+
+        def discover(homework: Homework) -> list[Future]:
+            homework_directory = _get_homework_directory(homework, self.download_config)
+            urls = self._get_zip_urls(homework)
+            logger.debug(f"Got {len(urls)} urls for {homework}.")
+            extracted = []
+            for iteration, url in enumerate(urls, 1):
+                fetched = fetchers.submit(_fetch_zip, url, homework_directory, self.http_client, self.refresh)
+                extracted.append(
+                    extractor.submit(
+                        _extract_fetched_zip, fetched, homework_directory, iteration, homework, self.extractor
+                    )
+                )
+            return extracted
+
+        try:
+            discovered = [browser.submit(discover, homework) for homework in homeworks]
+            for homework, extracted in zip(homeworks, discovered):
+                if print_banner:
+                    _print_banner(homework)
+                logger.info(f"Downloading {homework}...")
+                yield [future.result() for future in extracted.result()]
+        finally:
+            for executor in (browser, fetchers, extractor):
+                executor.shutdown(wait=True, cancel_futures=True)
+            self._quit_driver()
 
 
 def _get_homework_directory(homework: Homework, download_config) -> Path:
@@ -140,19 +248,57 @@ def _extract_filename(url: str) -> str:
     return url.rsplit("/")[-1]
 
 
-def _download_zip(url: str, homework_directory: Path, iteration: int, homework: Homework) -> DownloadedResult:
+def _download_zip(
+    url: str,
+    homework_directory: Path,
+    iteration: int,
+    homework: Homework,
+    http_client: HttpClient,
+    refresh=False,
+    extractor: Optional[Extractor] = None,
+) -> DownloadedResult:
+    zip_full_path, changed = _fetch_zip(url, homework_directory, http_client, refresh)
+    return _extract_zip(zip_full_path, homework_directory, iteration, homework, changed, extractor)
+
+
+def _fetch_zip(url: str, homework_directory: Path, http_client: HttpClient, refresh=False) -> Tuple[Path, bool]:
+    """Return the path of the zip and True if it was (re)downloaded."""
     filename = _extract_filename(url)
     logger.debug(f"{url=} -> {filename=}")
 
     zip_full_path = homework_directory / filename
-    if zip_full_path.exists():  # TODO: add force download
-        logger.info(f"{str(zip_full_path)} exists, skipping.")
-    else:
-        r = requests.get(url, allow_redirects=True)  # TODO: add retries
-        with open(zip_full_path, "wb") as f:
-            f.write(r.content)
-        logger.info(f"Written to {zip_full_path}.")
-    iteration_directory, version_id = _unzip_homework_file(zip_full_path, iteration, homework)
+    if zip_full_path.exists() and Manifest.load(zip_full_path) is None and zipfile.is_zipfile(zip_full_path):
+        logger.debug(f"{zip_full_path} was downloaded before manifests, assuming it's complete.")
+        http_client.adopt(url, zip_full_path)
+    with span("download.fetch_zip", url=url) as fetching:
+        changed = http_client.fetch(url, zip_full_path, refresh=refresh)
+        if changed:
+            fetching.add(items=1, bytes=zip_full_path.stat().st_size)
+    return zip_full_path, changed
+
+
+def _extract_fetched_zip(
+    fetched: Future,
+    homework_directory: Path,
+    iteration: int,
+    homework: Homework,
+    extractor: Optional[Extractor] = None,
+) -> DownloadedResult:
+    zip_full_path, changed = fetched.result()
+    return _extract_zip(zip_full_path, homework_directory, iteration, homework, changed, extractor)
+
+
+def _extract_zip(
+    zip_full_path: Path,
+    homework_directory: Path,
+    iteration: int,
+    homework: Homework,
+    changed=False,
+    extractor: Optional[Extractor] = None,
+) -> DownloadedResult:
+    iteration_directory, version_id = _unzip_homework_file(
+        zip_full_path, iteration, homework, force=changed, extractor=extractor
+    )
     return DownloadedResult(
         zipfile=zip_full_path,
         iteration_directory=iteration_directory,
@@ -184,6 +330,27 @@ def _configure_firefox_driver(browser_settings, headless=False):
     return webdriver.Firefox(fp, service_log_path=os.path.devnull, options=firefox_options)
 
 
+def _configure_revisor_client(download_config, http_client: HttpClient) -> Optional[RevisorClient]:
+    discovery = download_config.get("discovery", DISCOVERY_API)
+    logger.debug(f"Zip urls discovery = {discovery}.")
+    if discovery != DISCOVERY_API:
+        return None
+    if not download_config.get(API_URL):
+        logger.debug("No download.api_url, zip urls are found with the browser.")
+        return None
+    return RevisorClient(download_config, http_client.session)
+
+
+def _get_zip_urls_without_browser(homework: Homework, revisor: Optional[RevisorClient]) -> list[str]:
+    if revisor is None:
+        return []
+    if urls := revisor.get_zip_urls(homework.revisor_url):
+        logger.debug(f"Got {len(urls)} urls for {homework} without browser.")
+        return urls
+    logger.info(f"Failed to get zip urls for {homework} without browser, falling back to browser...")
+    return []
+
+
 def get_zip_urls(driver, revisor_url: str) -> list[str]:
     logger.debug(f"Fetching from {revisor_url}...")
     with driver:
@@ -212,34 +379,43 @@ def _get_zip_urls(driver, revisor_url: str) -> list[str]:
 
 
 def _extract_zip_urls(page_source: str, revisor_url: str) -> Optional[str]:
-    if ms := re.findall(r"\"homework_url\":\s?\"(?P<url>[\w\\\-\_:\u002F\.]+\.zip)\"", page_source):
-        urls = {m.replace(r"\u002F", "/") for m in ms}
-        return sorted(urls, key=_extract_version_id)
+    if urls := find_zip_urls(page_source):
+        return urls
     logger.error("Failed to extract zip urls from {} 😿", revisor_url)
     return []
 
 
-def _unzip_homework_file(homework_zip: Path, iteration: int, homework: Homework) -> Tuple[Path, str]:
+def _unzip_homework_file(
+    homework_zip: Path, iteration: int, homework: Homework, force=False, extractor: Optional[Extractor] = None
+) -> Tuple[Path, str]:
     assert homework_zip.suffix == ".zip", f"Unexpected extension {homework_zip.suffix} for {homework_zip} 😿"
     homework_directory = homework_zip.parent
-    version_id = _extract_version_id(homework_zip.name)
+    version_id = extract_version_id(homework_zip.name)
     iteration_directory = homework_directory / f"it_{iteration:02d}_{version_id}"
+    if iteration_directory.exists() and force:
+        logger.info(f"{homework_zip} changed, removing stale {iteration_directory}...")
+        shutil.rmtree(iteration_directory)
+    extractor = extractor or Extractor({})
     if iteration_directory.exists():
         logger.info(f"Target {iteration_directory} exists")
+    elif extractor.settings(homework.course).lazy:
+        rprint(f"Fetched [bold]{homework_zip.absolute()}[/bold] for [bold]{homework}[/bold], not extracting it.")
     else:
-        zipfile.ZipFile(homework_zip).extractall(path=iteration_directory)
+        try:
+            with span("download.unzip", zip=homework_zip.name) as extracting:
+                extracting.add(items=extractor.extract(homework_zip, iteration_directory, homework.course))
+                extracting.add(bytes=homework_zip.stat().st_size)
+        except UnsafeZipError as e:
+            logger.error(f"Not extracting: {e}")
+            shutil.rmtree(iteration_directory, ignore_errors=True)
+            return iteration_directory, version_id
         rprint(f"Fetched [bold]{iteration_directory.absolute()}[/bold] for [bold]{homework}[/bold].")
     return iteration_directory, version_id
 
 
-def _extract_version_id(homework_zip_filename: str) -> str:
-    if m := re.search(r".*?_(?P<id>\d+).zip", homework_zip_filename):
-        group_dict = m.groupdict()
-        logger.debug("{} {} {}", homework_zip_filename, group_dict, group_dict["id"])
-        return group_dict["id"]
-
-
 def _print_banner(homework):
+    from pyfiglet import Figlet  # The banners only, it takes a while to load the fonts
+
     f = Figlet(font="slant")
     print(f.renderText(f"{homework.second_name_slug} {homework.problem}.{homework.iteration}"))
     print(homework.issue_url)
@@ -256,6 +432,20 @@ class DownloadedResult:
     iteration: int
     id: str
 
+    @property
+    def extracted(self) -> bool:
+        """False if the zip was not extracted, e.g. in lazy mode; its members can still be read with open_member."""
+        return self.iteration_directory.exists()
+
+    def member_names(self) -> list[str]:
+        with zipfile.ZipFile(self.zipfile) as archive:
+            return archive.namelist()
+
+    def open_member(self, name: str) -> IO[bytes]:
+        """Read a file of the iteration straight from the zip."""
+        with zipfile.ZipFile(self.zipfile) as archive:
+            return archive.open(name)  # The member keeps the underlying file open until it's closed
+
     @property
     def zipfile_relative_to_homework_directory(self):
         return self.zipfile.relative_to(self.homework_directory)
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from enum import Enum, auto
+
+from loguru import logger
+
+
+class DownloadMode(Enum):
+    ONE = auto()
+    ALL = auto()
+    # TODAY = auto() TODO: add customizable day end
+    INTERACTIVE = auto()
+    INTERACTIVE_ALL = auto()
+
+    def __str__(self):
+        return self.name.lower().replace("_", "-")
+
+    def __repr__(self):
+        return str(self)
+
+    @staticmethod
+    def from_string(mode: str) -> DownloadMode:
+        try:
+            return DownloadMode[mode.upper().replace("-", "_")]
+        except KeyError:
+            logger.error(f"Unexpected PostProcessMode mode: '{mode}' 😿")
+            return mode
@@ -2,15 +2,18 @@ from __future__ import annotations
 
 import datetime as dt
 from enum import Enum, auto
-from typing import Any, Iterable, Optional, Union
+from typing import Any, Optional, Tuple, Union
 
 from dateutil.relativedelta import relativedelta
 from loguru import logger
 
+from prpr.columns import HomeworkColumns
 from prpr.date_utils import month_start_and_end
 from prpr.homework import CLOSED_STATUSES, OPEN_STATUSES, Homework, Status
+from prpr.index import HomeworkIndex
 
 DEFAULT_MONTH_START = 16
+QUERY_PUSHDOWN_KEY_NAME = "query_pushdown"
 
 
 class FilterMode(Enum):
@@ -36,6 +39,44 @@ class FilterMode(Enum):
             return mode
 
 
+MONTH_MODES = (FilterMode.CLOSED_THIS_MONTH, FilterMode.CLOSED_PREVIOUS_MONTH)
+STATUSES_BY_MODE = {
+    FilterMode.STANDARD: {Status.IN_REVIEW, Status.OPEN, Status.ON_THE_SIDE_OF_USER},
+    FilterMode.OPEN: OPEN_STATUSES,
+    FilterMode.CLOSED: CLOSED_STATUSES,
+    FilterMode.CLOSED_THIS_MONTH: CLOSED_STATUSES,
+    FilterMode.CLOSED_PREVIOUS_MONTH: CLOSED_STATUSES,
+}
+
+
+def plan_query(
+    *,
+    mode: FilterMode,
+    config: dict[str, Union[str, int, dict[str, Any]]],
+    from_date: Optional[dt.date] = None,
+    to_date: Optional[dt.date] = None,
+) -> dict[str, Any]:
+    """Translate filters into a tracker filter expression to be added to the issue query.
+
+    Only the constraints the tracker can check exactly or conservatively are pushed down:
+    statuses for the mode and the lower date bound (a status can't start after the last update).
+    filter_homeworks still has to be applied to the result: it is the residual filter for everything else,
+    i.e. the upper date bound, problems (parsed from summaries) and cohorts (suffixed by course).
+    NB: in standard mode tickets with statuses unknown to prpr are not fetched.
+    """
+    expression = {}
+    if statuses := STATUSES_BY_MODE.get(mode):
+        expression["status"] = sorted(status.key for status in statuses)
+    if mode in MONTH_MODES:
+        from_date, to_date = chosen_month(mode, config)
+    if from_date:
+        # The local midnight, like the residual filter has it, with an explicit offset: a bare date isn't local
+        updated_from = dt.datetime.combine(from_date, dt.time.min).astimezone().astimezone(dt.timezone.utc)
+        expression["updated"] = {"from": f"{updated_from:%Y-%m-%dT%H:%M:%S.000+0000}"}
+    logger.debug(f"Pushing down {expression} for {mode=}, {from_date=}, {to_date=}.")
+    return expression
+
+
 def filter_homeworks(
     homeworks: list[Homework],
     *,
@@ -48,51 +89,79 @@ def filter_homeworks(
     from_date: Optional[dt.date] = None,
     to_date: Optional[dt.date] = None,
 ) -> list[Homework]:
+    columns = HomeworkColumns(homeworks)
+    indices = select_homework_indices(
+        columns,
+        mode=mode,
+        config=config,
+        problems=problems,
+        no=no,
+        student=student,
+        cohorts=cohorts,
+        from_date=from_date,
+        to_date=to_date,
+    )
+    return columns.take(indices)
+
+
+def select_homework_indices(
+    columns: HomeworkColumns,
+    *,
+    mode: FilterMode,
+    config: dict[str, Union[str, int, dict[str, Any]]],
+    problems: Optional[list[int]] = None,
+    no: Optional[int] = None,
+    student: Optional[str] = None,
+    cohorts: Optional[str] = None,
+    from_date: Optional[dt.date] = None,
+    to_date: Optional[dt.date] = None,
+    index: Optional[HomeworkIndex] = None,
+) -> list[int]:
+    """Same as filter_homeworks, but returns the indices of the matching homeworks in `columns`.
+
+    If `index` (synced with the same homeworks) is given, it answers everything but the date filters."""
     # TODO: return description as well to be used in the table title
     if no:
-        result = [h for h in homeworks if h.number == no]
+        result = index.lookup(number=no) if index else columns.where(number=no)
         if not result:
             logger.error(f"Homework with no {no} was not found 😿")
             exit(1)
         return result
 
     if mode == FilterMode.STANDARD:
-        result = _filter_homeworks_by_status(homeworks, CLOSED_STATUSES, invert=True)
+        statuses = set(Status) - CLOSED_STATUSES
     elif mode == FilterMode.ALL:
-        result = homeworks
+        statuses = None
     elif mode == FilterMode.OPEN:
-        result = _filter_homeworks_by_status(homeworks, OPEN_STATUSES)
+        statuses = OPEN_STATUSES
     elif mode == FilterMode.CLOSED:
-        result = _filter_homeworks_by_status(homeworks, CLOSED_STATUSES)
-    elif mode in (FilterMode.CLOSED_THIS_MONTH, FilterMode.CLOSED_PREVIOUS_MONTH):
+        statuses = CLOSED_STATUSES
+    elif mode in MONTH_MODES:
         if from_date or to_date:
             logger.warning(f"date filters are ignored for mode {mode} ⚠️")
-        result = _filter_homeworks_by_status(homeworks, CLOSED_STATUSES)
-        month_start = config.get("month_start", DEFAULT_MONTH_START)
-        day_in_month = dt.date.today()
-        if mode == FilterMode.CLOSED_PREVIOUS_MONTH:
-            day_in_month = day_in_month + relativedelta(months=-1)
-        from_date, to_date = month_start_and_end(day_in_month, month_start=month_start)
+        statuses = CLOSED_STATUSES
+        from_date, to_date = chosen_month(mode, config)
         logger.info(f"Chosen 'month' is {from_date:%Y-%m-%d} -- {to_date:%Y-%m-%d}.")
     else:
         logger.error(f"{mode=}")
+        statuses = None
 
-    if problems:
-        result = [h for h in result if h.problem in problems]
-    if student:
-        result = [h for h in result if student.lower() in h.student.lower()]
-    if cohorts:
-        result = [h for h in result if h.cohort in cohorts]
-    if from_date:
-        from_date = dt.datetime.combine(from_date, dt.time.min).astimezone()
-        result = [h for h in result if from_date <= h.status_updated]
-    if to_date:
-        to_date = dt.datetime.combine(to_date, dt.time.max).astimezone()
-        result = [h for h in result if h.status_updated <= to_date]
-    return result
-
-
-def _filter_homeworks_by_status(homeworks: Iterable[Homework], statuses: set[Status], invert: bool = False):
-    if not invert:
-        return [h for h in homeworks if h.status in statuses]
-    return [h for h in homeworks if h.status not in statuses]
+    conditions = dict(statuses=statuses, problems=problems or None, student=student, cohorts=cohorts or None)
+    within = None
+    if index:
+        within = index.lookup(**conditions)
+        conditions = {}
+    return columns.where(
+        **conditions,
+        updated_from=from_date and dt.datetime.combine(from_date, dt.time.min).astimezone(),
+        updated_to=to_date and dt.datetime.combine(to_date, dt.time.max).astimezone(),
+        within=within,
+    )
+
+
+def chosen_month(mode: FilterMode, config) -> Tuple[dt.date, dt.date]:
+    month_start = config.get("month_start", DEFAULT_MONTH_START)
+    day_in_month = dt.date.today()
+    if mode == FilterMode.CLOSED_PREVIOUS_MONTH:
+        day_in_month = day_in_month + relativedelta(months=-1)
+    return month_start_and_end(day_in_month, month_start=month_start)
@@ -1,16 +1,18 @@
 from __future__ import annotations
 
 import re
+import threading
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import IntEnum
 from typing import Optional, Tuple
 
 from loguru import logger
-from transliterate import slugify
 
 from prpr.date_utils import LOCAL_TIMEZONE, parse_datetime
 
+_SLUGIFY_LOCK = threading.Lock()
+
 
 class Status(IntEnum):
     UNKNOWN = -1
@@ -20,35 +22,70 @@ class Status(IntEnum):
     RESOLVED = 3
     CLOSED = 4
 
-    # If a new status is added, update Homework.pretty_status accordingly
+    # If a new status is added, update PRETTY_STATUSES accordingly
 
     @staticmethod  # can't have class variables in Enums
     def from_string(status: str) -> Status:
-        status_map = {
-            "inReview": Status.IN_REVIEW,
-            "open": Status.OPEN,
-            "onTheSideOfUser": Status.ON_THE_SIDE_OF_USER,
-            "resolved": Status.RESOLVED,
-            "closed": Status.CLOSED,
-        }
-        assert len(Status) - 1 == len(status_map), "status_map is probably missing some keys."
+        assert len(Status) - 1 == len(STATUS_KEYS), "STATUS_KEYS is probably missing some keys."
         try:
-            return status_map[status]
+            return STATUS_KEYS[status]
         except KeyError:
             logger.error(f"Unexpected status: {status}.")
             return Status.UNKNOWN
 
+    @property
+    def key(self) -> str:
+        """The tracker key of the status, e.g. "inReview"."""
+        return {status: key for key, status in STATUS_KEYS.items()}[self]
+
+
+STATUS_KEYS = {
+    "inReview": Status.IN_REVIEW,
+    "open": Status.OPEN,
+    "onTheSideOfUser": Status.ON_THE_SIDE_OF_USER,
+    "resolved": Status.RESOLVED,
+    "closed": Status.CLOSED,
+}
+
 
 OPEN_STATUSES = {Status.OPEN, Status.IN_REVIEW}
 CLOSED_STATUSES = {Status.CLOSED, Status.RESOLVED}
 
 
 class Homework:
+    """A review ticket.
+
+    Everything that doesn't depend on the current time is computed once, in the constructor;
+    the rest takes a `now` snapshot, so that a table is rendered against a single point in time."""
+
     SECONDS_PER_MINUTE = 60
     SECONDS_PER_HOUR = 3600
     DEADLINE_FORMAT = "%A, %H:%M"  # TODO: move these to settings
     UPDATED_FORMAT = "%m-%d (%A), %H:%M"
     UPDATED_LONG_AGO_FORMAT = "%m-%d"
+    REVISOR_URL_PATTERN = re.compile(
+        r"==(?P<url>https://pra(c|k)ti(k|c)um-admin\.yandex-team\.ru/office/revisor-review/(\d+)/(\w+))\b"
+    )
+    SUMMARY_PATTERN = re.compile(r"\[(?P<problem>\d+)( \(back_cohort_(?P<cohort>\d+)\))?\] (?P<student>.*)")
+
+    __slots__ = (
+        "number",
+        "status_updated",
+        "description",
+        "problem",
+        "student",
+        "cohort",
+        "status",
+        "issue_key",
+        "course",
+        "_iteration",
+        "last_opened",
+        "deadline",
+        "deadline_string",
+        "issue_url",
+        "_revisor_url",
+        "_second_name_slug",
+    )
 
     def __init__(
         self,
@@ -56,7 +93,7 @@ class Homework:
         summary: str,  # e.g. "[1] Даниил Хармс (yuvachev@yandex.ru)"
         cohort: str,  # e.g. "16", "1+"
         status: str,  # e.g. "open"
-        status_updated: str,  # e.g. "2020-09-23T22:14:37.658+0000"
+        status_updated: Optional[str],  # e.g. "2020-09-23T22:14:37.658+0000"
         description: str,
         number: int,  # the ordinal number in of all one's tickets sorted by issue key
         course: str,  # e.g. "backend-developer"
@@ -74,6 +111,11 @@ class Homework:
         self.course = course
         self._iteration: Optional[int] = StatusTransition.compute_iteration(transitions)
         self.last_opened: Optional[datetime] = StatusTransition.compute_last_opened(transitions)
+        self.deadline: Optional[datetime] = self._compute_deadline(self.status_updated, self.status, self.last_opened)
+        self.deadline_string: Optional[str] = self.deadline and f"{self.deadline:{self.DEADLINE_FORMAT}}"
+        self.issue_url = f"https://st.yandex-team.ru/{issue_key}"
+        self._revisor_url: Optional[str] = self._extract_revisor_url(description)
+        self._second_name_slug: Optional[str] = None  # Transliterated on demand, it's only needed for downloads
 
     @property
     def iteration(self):
@@ -84,16 +126,6 @@ class Homework:
         # We could retrieve iterations here, lazily. I don't want to inject the client instance though.
         # Suggestions are welcome.
 
-    @property
-    def deadline(self) -> Optional[datetime]:
-        return self._compute_deadline(self.status_updated, self.status, self.last_opened)
-
-    @property
-    def deadline_string(self) -> Optional[str]:
-        if self.deadline is None:
-            return None
-        return f"{self.deadline:{self.DEADLINE_FORMAT}}"
-
     @property
     def resolved(self) -> bool:
         return self.status in CLOSED_STATUSES
@@ -104,56 +136,63 @@ class Homework:
 
     @property
     def updated_string(self) -> Optional[str]:
+        return self.updated_string_at(_now())
+
+    def updated_string_at(self, now: datetime) -> Optional[str]:
         if self.status_updated is None or self.deadline:
             return None
-        age = datetime.now(LOCAL_TIMEZONE) - self.status_updated
+        age = now - self.status_updated
         if age > timedelta(days=7):
             return f"{self.status_updated:{self.UPDATED_LONG_AGO_FORMAT}} ({age.days} days ago)"
         return f"{self.status_updated:{self.UPDATED_FORMAT}}"
 
-    @property
-    def _left_seconds(self) -> Optional[int]:
+    def _left_seconds_at(self, now: datetime) -> Optional[int]:
         """Seconds to deadline. Negative for missed deadlines"""
         if self.deadline is None:
             return None
-        td = self.deadline - datetime.now(LOCAL_TIMEZONE)
+        td = self.deadline - now
         return int(td.total_seconds())
 
     @property
     def _left_hours_and_minutes(self) -> Optional[Tuple[int, int, bool]]:
+        return self._left_hours_and_minutes_at(_now())
+
+    def _left_hours_and_minutes_at(self, now: datetime) -> Optional[Tuple[int, int, bool]]:
         """Return hours, minutes and True if deadline is missed, False otherwise"""
-        if self.deadline is None:
+        if (total_seconds := self._left_seconds_at(now)) is None:
             return None
-        total_seconds = self._left_seconds
         hours, seconds = divmod(abs(total_seconds), self.SECONDS_PER_HOUR)
         minutes = seconds // self.SECONDS_PER_MINUTE
         return hours, minutes, total_seconds < 0
 
     @property
     def left(self) -> Optional[str]:
+        return self.left_at(_now())
+
+    def left_at(self, now: datetime) -> Optional[str]:
         """E.g. "1:03"."""
-        if self.deadline is None:
+        if (left := self._left_hours_and_minutes_at(now)) is None:
             return None
-        hours, minutes, missed = self._left_hours_and_minutes
+        hours, minutes, missed = left
         if missed:
             return f"-{hours:d}:{minutes:02d}"
         return f"{hours:d}:{minutes:02d}"
 
     @property
     def deadline_missed(self):
-        return self._left_seconds is not None and self._left_seconds < 0
+        return self.deadline_missed_at(_now())
+
+    def deadline_missed_at(self, now: datetime) -> bool:
+        return (left_seconds := self._left_seconds_at(now)) is not None and left_seconds < 0
 
     @property
     def pretty_status(self) -> str:
-        if self.deadline_missed and self.status == Status.OPEN:
+        return self.pretty_status_at(_now())
+
+    def pretty_status_at(self, now: datetime) -> str:
+        if self.status == Status.OPEN and self.deadline_missed_at(now):
             return "🙀"
-        return {
-            Status.IN_REVIEW: "🔎",
-            Status.OPEN: "🔧",
-            Status.ON_THE_SIDE_OF_USER: "🎓",
-            Status.RESOLVED: "✔️",
-            Status.CLOSED: "✔️",
-        }.get(self.status, "⁉️")
+        return PRETTY_STATUSES.get(self.status, "⁉️")
 
     @staticmethod
     def _compute_deadline(
@@ -171,16 +210,12 @@ class Homework:
             problem = f"{self.problem}"
         return f"{self.issue_key}, no {self.number}: {problem} {self.student} ({self.status.name})"
 
-    @staticmethod
-    def _extract_problem_and_student(summary) -> Tuple[int, str]:
-        if m := re.match(r"\[(?P<problem>\d+)( \(back_cohort_(?P<cohort>\d+)\))?\] (?P<student>.*)", summary):
+    @classmethod
+    def _extract_problem_and_student(cls, summary) -> Tuple[int, str]:
+        if m := cls.SUMMARY_PATTERN.match(summary):
             return int(m.group("problem")), m.group("student")
         raise ValueError(f"Couldn't parse summary '{summary}' 😿")
 
-    @property
-    def issue_url(self) -> str:
-        return f"https://st.yandex-team.ru/{self.issue_key}"
-
     @staticmethod
     def to_issue_key_number(key: str) -> int:
         """E.g. "PCR-69105" -> 69105."""
@@ -191,23 +226,32 @@ class Homework:
     def issue_key_number(self) -> int:
         return self.to_issue_key_number(self.issue_key)
 
-    @property
-    def revisor_url(self) -> str:
-        if m := re.search(
-            r"==(?P<url>https://pra(c|k)ti(k|c)um-admin\.yandex-team\.ru/office/revisor-review/(\d+)/(\w+))\b",
-            self.description,
-        ):
+    @classmethod
+    def _extract_revisor_url(cls, description: Optional[str]) -> Optional[str]:
+        if m := cls.REVISOR_URL_PATTERN.search(description or ""):
             return m.group("url")
-        logger.warning(f"Failed to extract Revisor url from '{self.description}' 😿")
         return None
 
+    @property
+    def revisor_url(self) -> str:
+        if self._revisor_url is None:
+            logger.warning(f"Failed to extract Revisor url from '{self.description}' 😿")
+        return self._revisor_url
+
     @staticmethod
     def order_key(homework: Homework) -> Tuple[int, datetime]:
         return homework.status, homework.status_updated
 
     @property
     def second_name_slug(self):
-        return slugify(self.student.rsplit(maxsplit=3)[-2].lower(), "ru")
+        if self._second_name_slug is None:
+            from transliterate import slugify  # Only downloads need it
+
+            # transliterate registers its language packs on the first call, other threads calling it meanwhile
+            # see only a part of them (e.g. the banner and the pipelined downloads of the same homework)
+            with _SLUGIFY_LOCK:
+                self._second_name_slug = slugify(self.student.rsplit(maxsplit=3)[-2].lower(), "ru")
+        return self._second_name_slug
 
     def __eq__(self, o: object) -> bool:
         if self is o:
@@ -219,6 +263,19 @@ class Homework:
     # __hash__ should probably be overridden as well
 
 
+PRETTY_STATUSES = {  # If a new status is added, update this accordingly
+    Status.IN_REVIEW: "🔎",
+    Status.OPEN: "🔧",
+    Status.ON_THE_SIDE_OF_USER: "🎓",
+    Status.RESOLVED: "✔️",
+    Status.CLOSED: "✔️",
+}
+
+
+def _now() -> datetime:
+    return datetime.now(LOCAL_TIMEZONE)
+
+
 @dataclass
 class StatusTransition:
     from_: Optional[Status]
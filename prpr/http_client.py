@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5  # seconds, doubled after every failed attempt
+DEFAULT_POOL_SIZE = 10
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+CHUNK_SIZE = 1024 * 1024
+REQUEST_TIMEOUT = 60
+PARTIAL_SUFFIX = ".part"
+MANIFEST_SUFFIX = ".json"
+
+
+class IncompleteDownload(requests.ConnectionError):
+    pass
+
+
+@dataclass
+class Manifest:
+    """What was downloaded to a file, kept next to it in a sidecar file."""
+
+    url: str
+    size: Optional[int]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    complete: bool = False
+
+    @staticmethod
+    def path_for(path: Path) -> Path:
+        return path.with_name(path.name + MANIFEST_SUFFIX)
+
+    @staticmethod
+    def load(path: Path) -> Optional[Manifest]:
+        manifest_path = Manifest.path_for(path)
+        if not manifest_path.exists():
+            return None
+        try:
+            with open(manifest_path) as f:
+                return Manifest(**json.load(f))
+        except (ValueError, TypeError):
+            logger.warning(f"Failed to read {manifest_path}, ignoring it 😿")
+            return None
+
+    def save(self, path: Path) -> None:
+        with open(Manifest.path_for(path), "w") as f:
+            json.dump(asdict(self), f)
+
+    def matches(self, path: Path) -> bool:
+        """Whether `path` is the complete file described by the manifest."""
+        return self.complete and path.exists() and (self.size is None or path.stat().st_size == self.size)
+
+
+class HttpClient:
+    """A session shared by all downloads: keeps connections alive and retries failed requests."""
+
+    def __init__(self, download_config):
+        self.retries = download_config.get("retries", DEFAULT_RETRIES)
+        self.backoff_factor = download_config.get("backoff_factor", DEFAULT_BACKOFF_FACTOR)
+        pool_size = max(DEFAULT_POOL_SIZE, download_config.get("workers", 0))
+        logger.debug(f"HTTP client: retries = {self.retries}, backoff = {self.backoff_factor}, pool = {pool_size}.")
+        # GET and HEAD are retried by default; the keyword to list the methods was renamed in urllib3 1.26
+        retry = Retry(total=self.retries, backoff_factor=self.backoff_factor, status_forcelist=RETRY_STATUSES)
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def fetch(self, url: str, path: Path, refresh=False) -> bool:
+        """Make sure `path` holds the complete contents of `url`, return True if it was (re)downloaded.
+
+        An existing file is kept if its manifest says it's complete; with `refresh` it's also
+        checked against the server and downloaded again if the server copy changed."""
+        manifest = Manifest.load(path)
+        if path.exists():
+            if manifest is None or not manifest.matches(path):
+                logger.warning(f"{path} is incomplete, downloading again...")
+            elif not refresh:
+                logger.info(f"{path} exists, skipping.")
+                return False
+            elif not self._changed(url, manifest):
+                logger.info(f"{path} is up to date, skipping.")
+                return False
+            else:
+                logger.info(f"{url} changed since it was downloaded, downloading again...")
+            self._partial_path(path).unlink(missing_ok=True)
+        size = self.download(url, path)
+        logger.info(f"Written {size} bytes to {path}.")
+        return True
+
+    def adopt(self, url: str, path: Path) -> None:
+        """Record an existing complete file as downloaded from `url`, e.g. one downloaded before manifests."""
+        Manifest(url=url, size=path.stat().st_size, complete=True).save(path)
+
+    def download(self, url: str, path: Path) -> int:
+        """Stream `url` to `path` in chunks, return the size of the file.
+
+        The data goes to a partial file next to `path` which is renamed only when complete,
+        so `path` either doesn't exist or is whole. If the connection drops, the download
+        is resumed from where it stopped, provided the server supports ranges and the file hasn't changed.
+
+        Failed requests are retried by the session (see `Retry`), only the drops mid-stream are retried here."""
+        for attempt in range(self.retries + 1):
+            try:
+                return self._download(url, path)
+            except IncompleteDownload as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff_factor * 2**attempt
+                logger.warning(f"Failed to download {url} ({e}), retrying in {delay:.1f} s...")
+                time.sleep(delay)
+
+    def _download(self, url: str, path: Path) -> int:
+        partial_path = self._partial_path(path)
+        manifest = Manifest.load(path)
+        offset = partial_path.stat().st_size if partial_path.exists() else 0
+        headers = {}
+        if offset and manifest and manifest.url == url and manifest.etag:
+            logger.debug(f"Resuming {url} from {offset} bytes...")
+            headers = {"Range": f"bytes={offset}-", "If-Range": manifest.etag}
+        with self.session.get(url, headers=headers, allow_redirects=True, stream=True, timeout=REQUEST_TIMEOUT) as r:
+            if r.status_code == requests.codes.range_not_satisfiable:
+                partial_path.unlink()
+                raise IncompleteDownload(f"Failed to resume {url}, starting over")
+            r.raise_for_status()
+            if r.status_code != requests.codes.partial_content:
+                offset = 0
+            content_length = r.headers.get("Content-Length")
+            manifest = Manifest(
+                url=url,
+                size=offset + int(content_length) if content_length is not None else None,
+                etag=r.headers.get("ETag"),
+                last_modified=r.headers.get("Last-Modified"),
+            )
+            manifest.save(path)
+            with open(partial_path, "ab" if offset else "wb") as f:
+                try:
+                    for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+                except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                    raise IncompleteDownload(f"Connection dropped while downloading {url}: {e}") from e
+        size = partial_path.stat().st_size
+        if manifest.size is not None and size != manifest.size:
+            raise IncompleteDownload(f"Got {size} bytes of {manifest.size} for {url}")
+        os.replace(partial_path, path)
+        manifest.complete = True
+        manifest.save(path)
+        return size
+
+    def _changed(self, url: str, manifest: Manifest) -> bool:
+        response = self.session.head(url, allow_redirects=True, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        if (etag := response.headers.get("ETag")) and manifest.etag:
+            return etag != manifest.etag
+        if (content_length := response.headers.get("Content-Length")) and manifest.size is not None:
+            if int(content_length) != manifest.size:
+                return True
+        if (last_modified := response.headers.get("Last-Modified")) and manifest.last_modified:
+            return last_modified != manifest.last_modified
+        return not (manifest.etag or manifest.last_modified)  # Can't tell, better safe than sorry
+
+    @staticmethod
+    def _partial_path(path: Path) -> Path:
+        return path.with_name(path.name + PARTIAL_SUFFIX)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Iterable, NamedTuple, Optional
+
+from prpr.homework import Homework, Status
+
+TRIGRAM_LENGTH = 3
+
+
+class IndexedFields(NamedTuple):
+    status: Status
+    problem: int
+    number: int
+    cohort: str
+    student: str
+
+
+class HomeworkIndex:
+    """Secondary indexes over homeworks: hash indexes on status, problem, number, cohort and student,
+    and a trigram index on the (lowercased) distinct students, i.e. names and emails.
+
+    The index outlives a list of homeworks: `sync` re-indexes only the homeworks whose indexed fields changed,
+    but still compares all of them; `replace` touches only the given ones (see main.FetchedHomeworks),
+    so that the same filters can be applied again cheaply on every refresh."""
+
+    def __init__(self, homeworks: Iterable[Homework] = ()):
+        self._fields: dict[str, IndexedFields] = {}
+        self._positions: dict[str, int] = {}
+        self._hashes: dict[str, defaultdict[object, set[str]]] = {
+            field: defaultdict(set) for field in IndexedFields._fields
+        }
+        self._trigrams: defaultdict[str, set[str]] = defaultdict(set)  # Trigram -> students
+        self.sync(homeworks)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def sync(self, homeworks: Iterable[Homework]) -> int:
+        """Index the homeworks as they are now, return the number of (re-)indexed ones.
+
+        Positions in the query results refer to this sequence of homeworks."""
+        positions = {}
+        changed = 0
+        for position, homework in enumerate(homeworks):
+            positions[homework.issue_key] = position
+            changed += self._reindex(homework)
+        for key in self._positions.keys() - positions.keys():
+            self._remove(key)
+        self._positions = positions
+        return changed
+
+    def replace(self, changed: dict[int, Homework]) -> int:
+        """Re-index the homeworks that took the given positions of the same tickets, return how many changed."""
+        reindexed = 0
+        for position, homework in changed.items():
+            assert self._positions.get(homework.issue_key) == position, f"{homework.issue_key} moved, sync instead 😿"
+            reindexed += self._reindex(homework)
+        return reindexed
+
+    def lookup(
+        self,
+        *,
+        statuses: Optional[Iterable[Status]] = None,
+        problems: Optional[Iterable[int]] = None,
+        number: Optional[int] = None,
+        student: Optional[str] = None,
+        cohorts: Optional[Iterable[str]] = None,
+    ) -> Optional[list[int]]:
+        """The sorted positions of the homeworks matching all the given conditions, None without conditions."""
+        candidates: Optional[set[str]] = None
+        for field, values in (
+            ("number", None if number is None else [number]),
+            ("problem", problems),
+            ("cohort", cohorts),
+            ("status", statuses),
+        ):
+            if values is not None:
+                index = self._hashes[field]
+                matching = set().union(*(index.get(value, ()) for value in values))
+                candidates = matching if candidates is None else candidates & matching
+        if student:
+            candidates = self._match_student(student.lower(), candidates)
+        if candidates is None:
+            return None
+        return sorted(self._positions[key] for key in candidates)
+
+    def _match_student(self, substring: str, candidates: Optional[set[str]]) -> set[str]:
+        students: Iterable[str] = self._hashes["student"].keys()
+        if len(substring) >= TRIGRAM_LENGTH:
+            students = set.intersection(*(self._trigrams.get(trigram, set()) for trigram in _trigrams(substring)))
+        # Trigrams only narrow the search: "abc bca" has all the trigrams of "abca", but doesn't contain it
+        index = self._hashes["student"]
+        matching = set().union(*(index[student] for student in students if substring in student.lower()))
+        return matching if candidates is None else candidates & matching
+
+    def _reindex(self, homework: Homework) -> bool:
+        fields = (homework.status, homework.problem, homework.number, homework.cohort, homework.student)
+        if self._fields.get(homework.issue_key) == fields:
+            return False
+        self._remove(homework.issue_key)
+        self._add(homework.issue_key, IndexedFields(*fields))
+        return True
+
+    def _add(self, key: str, fields: IndexedFields) -> None:
+        self._fields[key] = fields
+        if fields.student not in self._hashes["student"]:
+            for trigram in _trigrams(fields.student.lower()):
+                self._trigrams[trigram].add(fields.student)
+        for field, index in self._hashes.items():
+            index[getattr(fields, field)].add(key)
+
+    def _remove(self, key: str) -> None:
+        if (fields := self._fields.pop(key, None)) is None:
+            return
+        for field, index in self._hashes.items():
+            _discard(index, getattr(fields, field), key)
+        if fields.student not in self._hashes["student"]:
+            for trigram in _trigrams(fields.student.lower()):
+                _discard(self._trigrams, trigram, fields.student)
+
+
+def _trigrams(string: str) -> set[str]:
+    return set(map("".join, zip(*(string[shift:] for shift in range(TRIGRAM_LENGTH)))))
+
+
+def _discard(index: dict, value, key: str) -> None:
+    keys = index[value]
+    keys.discard(key)
+    if not keys:
+        del index[value]
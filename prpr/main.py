@@ -3,20 +3,35 @@ from __future__ import annotations
 
 import sys
 import webbrowser
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
-from typing import Union
+from typing import TYPE_CHECKING, Optional, Union
 
-import questionary
 from loguru import logger
 
+from prpr.blobs import get_blob_store
 from prpr.cli import DOWNLOAD, INTERACTIVE, POST_PROCESS, configure_arg_parser
+from prpr.columns import HomeworkColumns
 from prpr.config import get_config
-from prpr.download import BatchDownloader, DownloadMode
-from prpr.filters import filter_homeworks
+from prpr.download_mode import DownloadMode
+from prpr.filters import (
+    DEFAULT_MONTH_START,
+    MONTH_MODES,
+    QUERY_PUSHDOWN_KEY_NAME,
+    chosen_month,
+    plan_query,
+    select_homework_indices,
+)
 from prpr.homework import Homework
-from prpr.post_process import post_process_homework
-from prpr.startrack_client import get_startack_client
-from prpr.table import DISPLAYED_TAIL_LENGTH, print_issue_table
+from prpr.index import HomeworkIndex
+from prpr.output import OutputFormat, print_homeworks
+from prpr.profiling import PROFILER, report_profile, span
+from prpr.table import DISPLAYED_TAIL_LENGTH
+
+if TYPE_CHECKING:
+    from prpr.download import BatchDownloader
+    from prpr.startrack_client import IssueRecord
 
 
 class InteractiveCommand(Enum):
@@ -31,14 +46,14 @@ def get_cohort(cohort, components, config):
     if not components:
         return cohort
 
-    first_component = components[0]
-    component_name = first_component.name
+    component_name = components[0]
     suffix_mapper = config.get(COMPONENT_SUFFIXES, {})
     return cohort + suffix_mapper.get(component_name, "")
 
 
 def sort_homeworks(homeworks: list[Homework]) -> list[Homework]:
-    return sorted(homeworks, key=Homework.order_key)
+    columns = HomeworkColumns(homeworks)
+    return columns.take(columns.argsort())
 
 
 def choose_to_download(to_download: list[Homework]) -> Union[list[Homework], InteractiveCommand]:
@@ -47,6 +62,8 @@ def choose_to_download(to_download: list[Homework]) -> Union[list[Homework], Int
     if len(to_download) == 1:
         logger.debug("Just one homework to be choose from, choosing it.")
         return to_download
+    import questionary  # Only the interactive modes need it
+
     hw_strings = [str(hw) for hw in to_download]
     check_again_string = InteractiveCommand.CHECK_AGAIN.value
     chosen_title = questionary.select(
@@ -64,9 +81,27 @@ def main():
 
     configure_logger(args.verbose)
     logger.debug(f"{args=}")
+    if args.profile or args.profile_trace:
+        PROFILER.enable()
+    try:
+        run(args)
+    finally:
+        if PROFILER.enabled:
+            report_profile(args.profile, args.profile_trace)
+
 
+def run(args):
     config = get_config()
+    if args.gc:
+        collect_garbage(config)
+        return
+    from prpr.cache import MemoryIssueCache, open_issue_cache
+    from prpr.rollups import open_payout_rollups
+    from prpr.startrack_client import get_startack_client
+
     client = get_startack_client(config)
+    cache = open_issue_cache(config)
+    rollups = open_payout_rollups(config)
 
     user = args.user
     work_owner = f"{user}'s" if user else "My"
@@ -79,25 +114,257 @@ def main():
 
     should_run = True
     last_processed = None
-    while should_run:
-        issues = client.get_issues(user=user)
-        logger.debug(f"Got {len(issues)} homeworks.")
-        homeworks = [
-            Homework(
-                issue_key=issue.key,
-                summary=issue.summary,
-                cohort=get_cohort(issue.cohort, issue.components, config),
-                status=issue.status.key,
-                status_updated=issue.statusStartTime,
-                description=issue.description,
-                number=number,
-                course=extract_course(issue),
-                transitions=client.get_status_history(issue),
+    pushdown = None
+    fetched = FetchedHomeworks(config)  # Kept between the checks, updated only for the changed tickets
+    if config.get(QUERY_PUSHDOWN_KEY_NAME, False):
+        pushdown = plan_query(mode=args.mode, config=config, from_date=args.from_date, to_date=args.to_date)
+
+    if args.stats:
+        print_stats(client, config, user, cache, rollups, args, title=f"{work_owner} Praktikum Payouts")
+        return
+
+    if args.watch:
+        if args.download or args.open:
+            logger.warning("{} and --open are ignored in watch mode.", DOWNLOAD)
+        if args.format != OutputFormat.TABLE:
+            logger.warning("--format is ignored in watch mode, it's always a table.")
+        from prpr.watch import watch
+
+        watch_cache = cache or MemoryIssueCache()
+        watch(
+            fetch=lambda refresh: fetch_homeworks(
+                client, config, user, watch_cache, refresh, pushdown, rollups, fetched
+            ),
+            select=lambda homeworks: select_homeworks(homeworks, args, config, fetched),
+            interval=args.watch,
+            refresh=args.refresh_cache,
+            title=table_title,
+        )
+        return
+
+    refresh_cache = args.refresh_cache
+    # The browser (if it's needed at all) is kept between the checks of `--download interactive-all`
+    driver_manager = None
+    try:
+        while should_run:
+            homeworks = fetch_homeworks(client, config, user, cache, refresh_cache, pushdown, rollups, fetched)
+            refresh_cache = False  # Once is enough, the following checks are incremental
+            sorted_homeworks = select_homeworks(homeworks, args, config, fetched)
+            print_homeworks(
+                sorted_homeworks,
+                args.format,
+                last=DISPLAYED_TAIL_LENGTH,
+                last_processed=last_processed,
+                title=table_title,
+            )
+            if not args.download and args.open:
+                open_pages_for_first(sorted_homeworks)
+            if not args.download:
+                if args.post_process:
+                    logger.warning("{} is ignored without {} at the moment.", POST_PROCESS, DOWNLOAD)
+                if args.interactive:
+                    logger.warning("{} is ignored without {} at the moment", INTERACTIVE, DOWNLOAD)
+                should_run = False
+            else:
+                if open_or_in_review := [hw for hw in sorted_homeworks if hw.open_or_in_review]:
+                    if args.interactive:
+                        logger.warning(
+                            "--interactive is deprecated and to be removed, use `--download interactive` instead."
+                        )
+                        to_download = choose_to_download(open_or_in_review)
+                        if to_download == InteractiveCommand.CHECK_AGAIN:
+                            should_run = args.download
+                            continue
+                        if to_download:
+                            assert len(to_download) == 1
+                            last_processed = to_download[0]
+                    elif args.download == DownloadMode.ALL:
+                        to_download = open_or_in_review
+                    elif args.download == DownloadMode.ONE:
+                        to_download = open_or_in_review[:1]
+                    elif args.download == DownloadMode.INTERACTIVE or args.download == DownloadMode.INTERACTIVE_ALL:
+                        # TODO: deprecate --interactive
+                        to_download = choose_to_download(open_or_in_review)
+                        if to_download == InteractiveCommand.CHECK_AGAIN:
+                            should_run = True
+                            continue
+                        if to_download:
+                            last_processed = to_download[0]
+                    else:
+                        raise ValueError(f"Unexpected download mode: {args.download} 😿")
+                    if not to_download:
+                        logger.warning("Nothing to download.")
+                        should_run = False
+                        continue
+                    hw_noun = "homeworks" if len(to_download) > 1 else "homework"
+                    logger.info("Downloading {} {}...", len(to_download), hw_noun)
+                    # Selenium & co are loaded only here
+                    from prpr.download import BatchDownloader, DriverManager
+
+                    if driver_manager is None:
+                        driver_manager = DriverManager(config.get("download", {}), headless=not args.head)
+                    with BatchDownloader(config, refresh=args.refresh, driver_manager=driver_manager) as downloader:
+                        print_banner = len(open_or_in_review) > 1 and args.download in {
+                            DownloadMode.ALL,
+                            DownloadMode.INTERACTIVE_ALL,
+                        }
+                        download_and_process(downloader, to_download, args, config, print_banner=print_banner)
+                    should_run = args.download == DownloadMode.INTERACTIVE_ALL and len(open_or_in_review) >= 2
+                else:
+                    logger.warning(
+                        "There's nothing to download. Consider relaxing the filters if that's not what you expect."
+                    )
+                    should_run = False
+                    continue
+    finally:
+        if driver_manager:
+            driver_manager.quit()
+
+
+def download_and_process(downloader: BatchDownloader, to_download: list[Homework], args, config, print_banner=False):
+    """Post-processes every homework in the background while the next one is downloaded.
+
+    The homeworks are reported (the output of the steps is printed, the pages are opened) in order."""
+    from prpr.post_process import post_process_homework
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="prpr-process") as processor:
+        processing: deque[tuple[Homework, Optional[Future]]] = deque()
+        for results, homework in zip(downloader.download_batch(to_download, print_banner=print_banner), to_download):
+            if args.post_process and results:
+                logger.info(f"Post-processing {homework}...")
+                processing.append(
+                    (
+                        homework,
+                        processor.submit(post_process_homework, results, homework, config, False, args.refresh),
+                    )
+                )
+            else:
+                processing.append((homework, None))
+            while processing and (processing[0][1] is None or processing[0][1].done()):
+                _report_processed(*processing.popleft(), args)
+        while processing:
+            _report_processed(*processing.popleft(), args)
+
+
+def _report_processed(homework: Homework, processed: Optional[Future], args):
+    if processed:
+        for step_name, step_process in processed.result() or []:
+            logger.info(f"{homework}: {step_name} exited with {step_process.returncode}.")
+            print(step_process.stdout)
+    if args.open:
+        _open_pages_for_homework(homework)
+
+
+def fetch_homeworks(
+    client, config, user=None, cache=None, refresh_cache=False, pushdown=None, rollups=None, fetched=None
+) -> list[Homework]:
+    """With `fetched` (the homeworks fetched before) the homeworks of the unchanged tickets are reused."""
+    with span("tracker.get_issue_records") as fetching:
+        records, status_histories = client.get_issue_records(
+            user=user, cache=cache, refresh=refresh_cache, pushdown=pushdown
+        )
+        fetching.add(items=len(records))
+    logger.debug(f"Got {len(records)} homeworks.")
+    with span("homeworks.build") as building:
+        building.add(items=len(records))
+        if fetched is not None:
+            homeworks = fetched.update(records, status_histories)
+        else:
+            homeworks = [
+                build_homework(record, number, status_histories, config) for number, record in enumerate(records, 1)
+            ]
+    if rollups:
+        with span("rollups.update") as updating:
+            updating.add(items=len(homeworks))
+            month_start = config.get("month_start", DEFAULT_MONTH_START)
+            # Only the complete (not pushed down) lists can seal the months that are over
+            rollups.update(user, homeworks, month_start, complete=pushdown is None)
+    return homeworks
+
+
+def build_homework(record: IssueRecord, number: int, status_histories, config) -> Homework:
+    return Homework(
+        issue_key=record.key,
+        summary=record.summary,
+        cohort=get_cohort(record.cohort, record.components, config),
+        status=record.status,
+        status_updated=record.status_start_time,
+        description=record.description,
+        number=number,
+        course=extract_course(record),
+        transitions=status_histories.get(record.key),
+    )
+
+
+class FetchedHomeworks:
+    """The homeworks of the last check along with their columns and index, kept between the checks.
+
+    If the same tickets come again (the usual refresh), only the homeworks of the tickets updated since are
+    rebuilt, and only their rows of the columns and their index entries are replaced. Otherwise (a ticket came
+    or went) the columns are rebuilt and the index is synced with all the homeworks."""
+
+    def __init__(self, config):
+        self.config = config
+        self.records: list[IssueRecord] = []
+        self.columns = HomeworkColumns([])
+        self.index = HomeworkIndex()
+
+    @property
+    def homeworks(self) -> list[Homework]:
+        return self.columns.homeworks
+
+    def update(self, records: list[IssueRecord], status_histories) -> list[Homework]:
+        config = self.config
+        if [record.key for record in records] != [record.key for record in self.records]:
+            self.columns = HomeworkColumns(
+                build_homework(record, number, status_histories, config) for number, record in enumerate(records, 1)
             )
-            for number, issue in enumerate(issues, 1)
-        ]
-        filtered_homeworks = filter_homeworks(
-            homeworks,
+            logger.debug(f"Re-indexed {self.index.sync(self.homeworks)} homeworks.")
+        else:
+            changed = {
+                position: build_homework(record, position + 1, status_histories, config)
+                for position, (record, known) in enumerate(zip(records, self.records))
+                if record.updated_at != known.updated_at
+            }
+            logger.debug(f"{len(changed)} of {len(records)} homeworks changed.")
+            self.columns.replace(changed)
+            logger.debug(f"Re-indexed {self.index.replace(changed)} homeworks.")
+        self.records = records
+        return self.homeworks
+
+
+def print_stats(client, config, user, cache, rollups, args, title: Optional[str] = None) -> None:
+    """Bring the payout rollups up to date with the (incrementally) fetched homeworks and print them."""
+    if not rollups:
+        logger.error("--stats needs the cache, it's disabled in the config 😿")
+        return
+    from prpr.rollups import print_payout_stats
+
+    fetch_homeworks(client, config, user, cache, args.refresh_cache, rollups=rollups)
+    month = chosen_month(args.mode, config)[0] if args.mode in MONTH_MODES else None
+    print_payout_stats(
+        rollups.rollups(user, month),
+        rollups.sealed_months(user),
+        config.get("month_start", DEFAULT_MONTH_START),
+        title=title,
+    )
+
+
+def select_homeworks(
+    homeworks: list[Homework],
+    args,
+    config,
+    fetched: Optional[FetchedHomeworks] = None,
+) -> list[Homework]:
+    """With `fetched` (that fetched the `homeworks`) its columns and index are used."""
+    with span("homeworks.filter") as filtering:
+        filtering.add(items=len(homeworks))
+        if fetched is not None and fetched.homeworks is homeworks:
+            columns, index = fetched.columns, fetched.index
+        else:
+            columns, index = HomeworkColumns(homeworks), None
+        selected = select_homework_indices(
+            columns,
             mode=args.mode,
             config=config,
             problems=args.problems,
@@ -106,79 +373,23 @@ def main():
             cohorts=args.cohorts,
             from_date=args.from_date,
             to_date=args.to_date,
+            index=index,
         )
-        sorted_homeworks = sort_homeworks(filtered_homeworks)
-        print_issue_table(
-            sorted_homeworks, last=DISPLAYED_TAIL_LENGTH, last_processed=last_processed, title=table_title,
-        )
-        if not args.download and args.open:
-            open_pages_for_first(sorted_homeworks)
-        if not args.download:
-            if args.post_process:
-                logger.warning("{} is ignored without {} at the moment.", POST_PROCESS, DOWNLOAD)
-            if args.interactive:
-                logger.warning("{} is ignored without {} at the moment", INTERACTIVE, DOWNLOAD)
-            should_run = False
-        else:
-            if open_or_in_review := [hw for hw in sorted_homeworks if hw.open_or_in_review]:
-                if args.interactive:
-                    logger.warning(
-                        "--interactive is deprecated and to be removed, use `--download interactive` instead."
-                    )
-                    to_download = choose_to_download(open_or_in_review)
-                    if to_download == InteractiveCommand.CHECK_AGAIN:
-                        should_run = args.download
-                        continue
-                    if to_download:
-                        assert len(to_download) == 1
-                        last_processed = to_download[0]
-                elif args.download == DownloadMode.ALL:
-                    to_download = open_or_in_review
-                elif args.download == DownloadMode.ONE:
-                    to_download = open_or_in_review[:1]
-                elif args.download == DownloadMode.INTERACTIVE or args.download == DownloadMode.INTERACTIVE_ALL:
-                    # TODO: deprecate --interactive
-                    to_download = choose_to_download(open_or_in_review)
-                    if to_download == InteractiveCommand.CHECK_AGAIN:
-                        should_run = True
-                        continue
-                    if to_download:
-                        last_processed = to_download[0]
-                else:
-                    raise ValueError(f"Unexpected download mode: {args.download} 😿")
-                if not to_download:
-                    logger.warning("Nothing to download.")
-                    should_run = False
-                    continue
-                hw_noun = "homeworks" if len(to_download) > 1 else "homework"
-                logger.info("Downloading {} {}...", len(to_download), hw_noun)
-                with BatchDownloader(config, headless=not args.head) as downloader:
-                    print_banner = len(open_or_in_review) > 1 and args.download in {
-                        DownloadMode.ALL,
-                        DownloadMode.INTERACTIVE_ALL,
-                    }
-                    for results, homework in zip(
-                        downloader.download_batch(to_download, print_banner=print_banner),
-                        to_download,
-                    ):
-                        if args.post_process and results:
-                            logger.info(f"Post-processing {homework}...")
-                            post_process_homework(results, homework, config=config)
-                        if args.open:
-                            _open_pages_for_homework(homework)
-                should_run = args.download == DownloadMode.INTERACTIVE_ALL and len(open_or_in_review) >= 2
-            else:
-                logger.warning(
-                    "There's nothing to download. Consider relaxing the filters if that's not what you expect."
-                )
-                should_run = False
-                continue
+        return columns.take(columns.argsort(selected))
+
+
+def collect_garbage(config) -> None:
+    if not (blob_store := get_blob_store(config.get("download", {}))):
+        logger.error("Download directory not set in .prpr 😿")
+        return
+    removed, freed = blob_store.gc()
+    print(f"Removed {removed} unused blobs, {freed / 1024 / 1024:.1f} MiB freed.")
 
 
-def extract_course(issue):
-    if components := issue.components:
-        return components[0].name
-    logger.warning(f"{issue.key} doesn't have components 😿")
+def extract_course(record: IssueRecord):
+    if components := record.components:
+        return components[0]
+    logger.warning(f"{record.key} doesn't have components 😿")
     return "unknown_course"
 
 
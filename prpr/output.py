@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+import sys
+from datetime import datetime
+from enum import Enum, auto
+from itertools import islice
+from typing import IO, Iterable, Optional
+
+from loguru import logger
+
+from prpr.date_utils import LOCAL_TIMEZONE
+from prpr.homework import Homework
+from prpr.profiling import profiled
+from prpr.table import COLUMN_NAMES, print_issue_table, row_columns
+
+
+class OutputFormat(Enum):
+    TABLE = auto()
+    TSV = auto()
+    JSONL = auto()
+    PLAIN = auto()
+
+    def __str__(self):
+        return self.name.lower().replace("_", "-")
+
+    def __repr__(self):
+        return str(self)
+
+    @staticmethod
+    def from_string(output_format: str) -> OutputFormat:
+        try:
+            return OutputFormat[output_format.upper().replace("-", "_")]
+        except KeyError:
+            logger.error(f"Unexpected output format: '{output_format}' 😿")
+            return output_format
+
+
+def print_homeworks(
+    homeworks: list[Homework],
+    output_format: OutputFormat = OutputFormat.TABLE,
+    last=None,
+    last_processed=None,
+    title: Optional[str] = None,
+    file: Optional[IO[str]] = None,
+) -> None:
+    """Print the homeworks as a table, or stream them one line per homework in the other formats."""
+    if output_format == OutputFormat.TABLE:
+        print_issue_table(homeworks, last=last, last_processed=last_processed, title=title)
+    else:
+        stream_rows(homeworks, output_format, last=last, file=file)
+
+
+@profiled("output.stream")
+def stream_rows(
+    homeworks: list[Homework], output_format: OutputFormat, last=None, file: Optional[IO[str]] = None
+) -> None:
+    """Write every homework as soon as its row is ready, without laying out a table: same columns, no styles.
+
+    tsv has a header line, jsonl has an object per homework keyed by the column names,
+    plain separates the cells by spaces, replacing empty ones with "-" (for fzf, grep, cut and the like)."""
+    if not homeworks:
+        logger.warning("No homeworks for chosen filter combination.")
+        return
+    file = file or sys.stdout
+    now = datetime.now(LOCAL_TIMEZONE)  # The same for all rows
+    tail = islice(homeworks, max(0, len(homeworks) - last), None) if last else homeworks
+    rows = (row_columns(table_number, homework, now) for table_number, homework in enumerate(tail, 1))
+    if output_format == OutputFormat.TSV:
+        file.write("\t".join(COLUMN_NAMES) + "\n")
+        lines = ("\t".join(_clean(cell) for cell in row) for row in rows)
+    elif output_format == OutputFormat.JSONL:
+        lines = (json.dumps(dict(zip(COLUMN_NAMES, row)), ensure_ascii=False) for row in rows)
+    elif output_format == OutputFormat.PLAIN:
+        lines = (" ".join(_clean(cell) or "-" for cell in row) for row in rows)
+    else:
+        raise ValueError(f"Unexpected output format: {output_format} 😿")
+    _write_lines(lines, file)
+
+
+def _write_lines(lines: Iterable[str], file: IO[str]) -> None:
+    for line in lines:
+        file.write(line)
+        file.write("\n")
+
+
+def _clean(cell: Optional[str]) -> str:
+    """A cell on one line: tabs and line breaks would break the rows apart."""
+    if not cell:
+        return ""
+    return cell.replace("\t", " ").replace("\n", " ")
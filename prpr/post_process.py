@@ -1,20 +1,51 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import subprocess
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Optional, Union
 
 from loguru import logger
 
+from prpr.blobs import hash_file
 from prpr.download import DownloadedResult
 from prpr.homework import Homework
+from prpr.profiling import span
+from prpr.unzip import ExtractSettings
 
 DEFAULT = "default"
 PROCESS = "process"
 RUNNER = "runner"
 COURSES = "courses"
 PROBLEMS = "problems"
+WORKERS = "workers"
+COMMAND = "command"
+NEEDS = "needs"
+CACHE = "cache"
+STEP_CACHE_DIRECTORY_NAME = ".prpr-steps"
 
 PREV_KEYS = {"{it_prev}", "{it_prev_}", "{it_prev_zip}", "{it_prev_zip_}"}
+DIRECTORY_KEYS = {"{it_last}", "{it_last_}", "{it_prev}", "{it_prev_}"}
+
+
+@dataclass
+class Step:
+    name: str
+    batch_name: str
+    command_template: str
+    needs: list[int] = field(default_factory=list)  # Indices of the steps to wait for
+
+
+@dataclass
+class Invocation:
+    command: str
+    diff: bool
+    last: DownloadedResult
+    prev: Optional[DownloadedResult]
 
 
 def post_process_homework(
@@ -22,36 +53,220 @@ def post_process_homework(
     homework: Optional[Homework] = None,
     config=None,
     print_step_output=True,
-):
+    refresh=False,
+) -> list[tuple[str, subprocess.CompletedProcess]]:
+    """Returns the names and the processes of the steps that were run (or replayed from the cache), in order.
+
+    With `refresh` all the steps are run again, the step cache is only updated."""
     if not (process_config := config.get(PROCESS, {})):
         logger.error("Aaaaa")  # TODO
-        return
+        return []
     runner = process_config.get(RUNNER, ["bash", "-c"])
+    batches = []
     if default_processing := process_config.get(DEFAULT, {}):
-        run_steps(default_processing, runner, results, DEFAULT, print_step_output)
+        batches.append((DEFAULT, default_processing))
     if homework and (course_config := process_config.get(COURSES, {}).get(homework.course)):
-        default_course_processing = course_config.get(DEFAULT, {})
-        run_steps(default_course_processing, runner, results, f"{homework.course}.{DEFAULT}", print_step_output)
+        batches.append((f"{homework.course}.{DEFAULT}", course_config.get(DEFAULT, {})))
         if problem_processing := course_config.get(PROBLEMS, {}).get(pr := homework.problem):
-            run_steps(problem_processing, runner, results, f"{homework.course}.{PROBLEMS}.{pr}", print_step_output)
-
-
-def run_steps(steps_batch, runner, results, steps_batch_name, print_step_output):
-    logger.info("Running steps from {}...", steps_batch_name)
-    for step_name, command_template in steps_batch["steps"].items():
-        result_last = results[-1]
-        command = _interpolate(command_template, result_last)
-        if diff := any(key in command_template for key in PREV_KEYS):
-            if len(results) >= 2:
-                result_prev = results[-2]
-                command = _interpolate_previous(command, result_prev)
+            batches.append((f"{homework.course}.{PROBLEMS}.{pr}", problem_processing))
+    steps = collect_steps(batches)
+    step_cache = None
+    if process_config.get(CACHE, True):
+        extract_settings = ExtractSettings.for_course(config.get("download", {}), homework and homework.course)
+        step_cache = StepCache(results[-1].homework_directory, extract_settings)
+    return run_steps(
+        steps,
+        runner,
+        results,
+        print_step_output,
+        workers=process_config.get(WORKERS, 1),
+        step_cache=step_cache,
+        refresh=refresh,
+    )
+
+
+def collect_steps(batches: list[tuple[str, dict]]) -> list[Step]:
+    """Merges the batches into one dependency graph.
+
+    A step is either a command template or `{command: ..., needs: [...]}`. A needed step is looked up
+    in the same batch first, then in the batches before it."""
+    steps = []
+    declared_needs = []
+    for batch_name, steps_batch in batches:
+        logger.info("Collecting steps from {}...", batch_name)
+        for step_name, step_config in (steps_batch.get("steps") or {}).items():
+            if isinstance(step_config, dict):
+                command_template = step_config[COMMAND]
+                needs = step_config.get(NEEDS, [])
             else:
-                logger.info(f"Skipping {step_name} for first iteration.")
-                continue
+                command_template, needs = step_config, []
+            steps.append(Step(step_name, batch_name, command_template))
+            declared_needs.append([needs] if isinstance(needs, str) else list(needs))
+    for index, step in enumerate(steps):
+        step.needs = [_find_needed_step(steps, index, need) for need in declared_needs[index]]
+    _check_acyclic(steps)
+    return steps
+
+
+def _find_needed_step(steps: list[Step], index: int, need: str) -> int:
+    step = steps[index]
+    same_batch = [i for i, s in enumerate(steps) if s.name == need and s.batch_name == step.batch_name]
+    earlier = [i for i, s in enumerate(steps[:index]) if s.name == need]
+    if candidates := same_batch or earlier:
+        return candidates[-1]
+    logger.error(f"Step {step.batch_name}.{step.name} needs {need}, but there's no such step 😿")
+    sys.exit(1)
+
+
+def _check_acyclic(steps: list[Step]) -> None:
+    finished = set()
+    while len(finished) < len(steps):
+        ready = {i for i, step in enumerate(steps) if i not in finished and set(step.needs) <= finished}
+        if not ready:
+            cycle = [f"{steps[i].batch_name}.{steps[i].name}" for i in range(len(steps)) if i not in finished]
+            logger.error(f"Steps {cycle} need each other 😿")
+            sys.exit(1)
+        finished |= ready
+
+
+class StepCache:
+    """The output of the steps that succeeded for the homework before.
+
+    A step is keyed on the runner, the interpolated command, the zips it's run for, what's extracted from them
+    and the keys of the steps it needs, so it's run again only if any of them changed. Failed steps are not
+    stored: they may have failed because of the environment (a missing command, a database down)."""
+
+    def __init__(self, homework_directory: Path, extract_settings: Optional[ExtractSettings] = None):
+        self.directory = homework_directory / STEP_CACHE_DIRECTORY_NAME
+        self.extracted = None  # The extract settings that change the tree the steps see
+        if extract_settings:
+            self.extracted = {"include": extract_settings.include, "exclude": extract_settings.exclude}
+        self._zip_hashes = {}
+
+    def keys(self, steps: list[Step], invocations: list[Optional[Invocation]], runner) -> list[Optional[str]]:
+        keys = [None] * len(steps)
+
+        def key(index: int) -> str:
+            if keys[index] is None:
+                invocation = invocations[index]
+                inputs = {"runner": runner, "needs": [key(need) for need in steps[index].needs]}
+                if invocation:
+                    inputs["command"] = invocation.command
+                    inputs["zips"] = [self._hash_zip(r.zipfile) for r in (invocation.last, invocation.prev) if r]
+                    inputs["extracted"] = self.extracted
+                keys[index] = hashlib.sha256(json.dumps(inputs).encode()).hexdigest()
+            return keys[index]
+
+        return [key(index) for index in range(len(steps))]
+
+    def load(self, key: str) -> Optional[subprocess.CompletedProcess]:
+        try:
+            cached = json.loads((self.directory / f"{key}.json").read_text())
+        except (OSError, ValueError):
+            return None
+        return subprocess.CompletedProcess(cached["args"], cached["returncode"], stdout=cached["stdout"])
+
+    def store(self, key: str, step_process: subprocess.CompletedProcess) -> None:
+        self.directory.mkdir(exist_ok=True)
+        cached = {"args": step_process.args, "returncode": step_process.returncode, "stdout": step_process.stdout}
+        (self.directory / f"{key}.json").write_text(json.dumps(cached))
+
+    def _hash_zip(self, path: Path) -> Optional[str]:
+        # The zip, not the extracted tree: the steps themselves leave caches and reports in the tree
+        if path not in self._zip_hashes:
+            self._zip_hashes[path] = hash_file(path) if path.exists() else None
+        return self._zip_hashes[path]
+
+
+def run_steps(
+    steps: list[Step],
+    runner,
+    results,
+    print_step_output=True,
+    workers: int = 1,
+    step_cache: Optional[StepCache] = None,
+    refresh=False,
+) -> list[tuple[str, subprocess.CompletedProcess]]:
+    """Runs the steps as soon as the steps they need are finished, at most `workers` at a time (one after another
+    by default). A step is skipped if a step it needs failed. The output is reported in the order of the steps.
+
+    With `step_cache` the steps whose inputs didn't change and that succeeded are not run, their stored output
+    is reported instead (unless `refresh`)."""
+    invocations = [_prepare(step, results) for step in steps]
+    keys = step_cache.keys(steps, invocations, runner) if step_cache else [None] * len(steps)
+    processes: list[Optional[subprocess.CompletedProcess]] = [None] * len(steps)
+    pending = {index: set(step.needs) for index, step in enumerate(steps)}
+    finished = set()
+    failed = set()  # Including the ones skipped because of a failed need
+    running = {}
+    reported = 0
+    # The steps are subprocesses already, so the threads only wait for them
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prpr-step") as executor:
+        while pending or running:
+            ready = [index for index, needs in pending.items() if needs <= finished]
+            for index in ready:
+                del pending[index]
+                if (invocation := invocations[index]) is None:
+                    finished.add(index)
+                    continue
+                if failed_needs := [steps[need].name for need in steps[index].needs if need in failed]:
+                    logger.warning(f"Skipping {steps[index].name}: {', '.join(failed_needs)} failed 😿")
+                    failed.add(index)
+                    finished.add(index)
+                    continue
+                if step_cache and not refresh and (cached := step_cache.load(keys[index])):
+                    logger.info(f"{steps[index].name} is up to date, reusing its output.")
+                    processes[index] = cached
+                    finished.add(index)
+                    continue
+                logger.info(f"Running {steps[index].name}...")
+                logger.debug(f"{steps[index].name}: {invocation.command}")
+                running[executor.submit(_run_command, runner, invocation.command, steps[index].name)] = index
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    processes[index] = future.result()
+                    finished.add(index)
+                    if processes[index].returncode != 0:
+                        failed.add(index)
+                    elif step_cache:
+                        step_cache.store(keys[index], processes[index])
+            while reported < len(steps) and reported in finished:
+                if (step_process := processes[reported]) is not None:
+                    if print_step_output:
+                        print(step_process.stdout)
+                    invocation = invocations[reported]
+                    _save_step_output_to_file(
+                        invocation.diff, invocation.last, invocation.prev, steps[reported].name, step_process
+                    )
+                reported += 1
+    return [(step.name, step_process) for step, step_process in zip(steps, processes) if step_process is not None]
+
+
+def _prepare(step: Step, results: list[DownloadedResult]) -> Optional[Invocation]:
+    """The command to run for the step, None if the step is skipped."""
+    result_last = results[-1]
+    command = _interpolate(step.command_template, result_last)
+    if diff := any(key in step.command_template for key in PREV_KEYS):
+        if len(results) >= 2:
+            result_prev = results[-2]
+            command = _interpolate_previous(command, result_prev)
         else:
-            result_prev = None
-        logger.info(f"Running {step_name}...")
-        logger.debug(f"{step_name}: {command}")
+            logger.info(f"Skipping {step.name} for first iteration.")
+            return None
+    else:
+        result_prev = None
+    if any(key in step.command_template for key in DIRECTORY_KEYS) and not all(
+        result.extracted for result in (result_last, result_prev) if result
+    ):
+        logger.warning(f"Skipping {step.name}: the iteration is not extracted.")
+        return None
+    return Invocation(command, diff, result_last, result_prev)
+
+
+def _run_command(runner, command: str, name: Optional[str] = None) -> subprocess.CompletedProcess:
+    with span("process.run_step", step=name, command=command) as running:
         step_process = subprocess.run(
             runner + [command],
             stdout=subprocess.PIPE,
@@ -59,9 +274,8 @@ def run_steps(steps_batch, runner, results, steps_batch_name, print_step_output)
             check=False,
             text=True,
         )
-        if print_step_output:
-            print(step_process.stdout)
-        _save_step_output_to_file(diff, result_last, result_prev, step_name, step_process)
+        running.add(bytes=len(step_process.stdout or ""))
+    return step_process
 
 
 def _save_step_output_to_file(
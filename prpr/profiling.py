@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+from functools import wraps
+from math import ceil
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, NamedTuple, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Span:
+    """A timed phase: a call to the tracker, a download, a post-processing step, etc.
+
+    `add` counts what the phase went through, e.g. issues in a page or bytes downloaded."""
+
+    __slots__ = ("name", "attributes", "thread", "start", "duration", "items", "bytes", "_profiler")
+
+    def __init__(self, profiler: Profiler, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.thread = threading.current_thread()
+        self.start = self.duration = 0.0
+        self.items = self.bytes = 0
+        self._profiler = profiler
+
+    def add(self, items: int = 0, bytes: int = 0) -> None:
+        self.items += items
+        self.bytes += bytes
+
+    def __enter__(self) -> Span:
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.duration = perf_counter() - self.start
+        self._profiler.record(self)
+
+
+class _NullSpan:
+    """What `span` returns while profiling is disabled: nothing is measured, nothing is kept."""
+
+    def add(self, items: int = 0, bytes: int = 0) -> None:
+        pass
+
+    def __enter__(self) -> _NullSpan:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class PhaseSummary(NamedTuple):
+    name: str
+    calls: int
+    total: float
+    p50: float
+    p95: float
+    items: int
+    bytes: int
+
+
+class Profiler:
+    """Collects the spans of the phases of a run from all the threads.
+
+    Disabled by default, so that the instrumentation costs next to nothing unless `--profile` is given.
+    Spans can be nested (e.g. a download and the browser inside it), their times are not subtracted."""
+
+    def __init__(self):
+        self.enabled = False
+        self._spans: list[Span] = []
+        self._lock = threading.Lock()
+        self._origin = perf_counter()
+
+    def enable(self) -> None:
+        self.enabled = True
+        self._origin = perf_counter()
+
+    def span(self, name: str, **attributes) -> Span | _NullSpan:
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, attributes)
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def summarize(self) -> list[PhaseSummary]:
+        """Per phase, in the order the phases were first finished."""
+        phases: dict[str, list[Span]] = {}
+        with self._lock:
+            for span in self._spans:
+                phases.setdefault(span.name, []).append(span)
+        summaries = []
+        for name, spans in phases.items():
+            durations = sorted(span.duration for span in spans)
+            summaries.append(
+                PhaseSummary(
+                    name=name,
+                    calls=len(spans),
+                    total=sum(durations),
+                    p50=_percentile(durations, 50),
+                    p95=_percentile(durations, 95),
+                    items=sum(span.items for span in spans),
+                    bytes=sum(span.bytes for span in spans),
+                )
+            )
+        return summaries
+
+    def print_summary(self) -> None:
+        from rich.console import Console
+        from rich.table import Table
+
+        table = Table(title="prpr profile", title_justify="left")
+        for column in ("Phase", "Calls", "Total, s", "p50, ms", "p95, ms", "Items", "Bytes"):
+            table.add_column(column, justify="left" if column == "Phase" else "right")
+        for phase in self.summarize():
+            table.add_row(
+                phase.name,
+                str(phase.calls),
+                f"{phase.total:.3f}",
+                f"{phase.p50 * 1000:.1f}",
+                f"{phase.p95 * 1000:.1f}",
+                str(phase.items or ""),
+                _format_bytes(phase.bytes),
+            )
+        Console(stderr=True).print(table)
+
+    def trace_events(self) -> list[dict]:
+        """The spans as Chrome trace events (see chrome://tracing or https://ui.perfetto.dev)."""
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self._spans)
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": thread.ident, "args": {"name": thread.name}}
+            for thread in {span.thread for span in spans}
+        ]
+        for span in sorted(spans, key=lambda span: span.start):
+            args = {
+                key: value if isinstance(value, (int, float)) else str(value) for key, value in span.attributes.items()
+            }
+            if span.items:
+                args["items"] = span.items
+            if span.bytes:
+                args["bytes"] = span.bytes
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.name.split(".", 1)[0],
+                    "ph": "X",
+                    "ts": round((span.start - self._origin) * 1e6),
+                    "dur": round(span.duration * 1e6),
+                    "pid": pid,
+                    "tid": span.thread.ident,
+                    "args": args,
+                }
+            )
+        return events
+
+    def write_trace(self, path: Path) -> None:
+        path.write_text(json.dumps({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}))
+
+
+PROFILER = Profiler()
+
+
+def span(name: str, **attributes) -> Span | _NullSpan:
+    """Time a phase: `with span("download.fetch_zip", url=url) as fetch: ...; fetch.add(bytes=size)`."""
+    return PROFILER.span(name, **attributes)
+
+
+def profiled(name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Time every call of the decorated function as a phase."""
+
+    def decorator(function: Callable[..., T]) -> Callable[..., T]:
+        @wraps(function)
+        def wrapper(*args, **kwargs) -> T:
+            with PROFILER.span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def report_profile(print_summary: bool, trace_path: Optional[Path] = None) -> None:
+    if print_summary:
+        PROFILER.print_summary()
+    if trace_path:
+        PROFILER.write_trace(trace_path)
+        print(f"Profile trace written to {trace_path}.", file=sys.stderr)
+
+
+def _percentile(sorted_values: list[float], percent: int) -> float:
+    """Nearest-rank percentile."""
+    return sorted_values[max(0, ceil(len(sorted_values) * percent / 100) - 1)]
+
+
+def _format_bytes(size: int) -> str:
+    if not size:
+        return ""
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
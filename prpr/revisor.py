@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import re
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Iterator, Optional
+
+import requests
+from loguru import logger
+
+REVISOR_URL_PATTERN = (
+    r"https://pra(c|k)ti(k|c)um-admin\.yandex-team\.ru/office/revisor-review/(?P<id>\d+)/(?P<hash>\w+)"
+)
+HOMEWORK_URL_KEY = "homework_url"
+API_URL = "api_url"
+ZIP_URL_PATTERN = r"\"homework_url\":\s?\"(?P<url>[\w\\\-\_:\u002F\.]+\.zip)\""
+COOKIES_FILENAME = "cookies.sqlite"
+COOKIE_DOMAIN = "yandex-team.ru"
+REQUEST_TIMEOUT = 60
+
+
+class RevisorClient:
+    """Finds zip urls of a homework over plain HTTP, authenticated with the cookies of the Firefox profile.
+
+    The url to request is `download.api_url` with {revisor_url}, {review_id} and {review_hash} substituted.
+    It should answer with JSON, the zip urls are the "homework_url" values found anywhere in it.
+    There's no default: the Revisor page itself shows the zips only after a click, so it needs the browser."""
+
+    def __init__(self, download_config, session: Optional[requests.Session] = None):
+        self.api_url_template = download_config[API_URL]
+        self.session = session or requests.Session()
+        profile_path = download_config.get("browser", {}).get("profile_path")
+        if profile_path:
+            self.session.cookies.update(load_firefox_cookies(Path(profile_path).expanduser()))
+
+    def get_zip_urls(self, revisor_url: str) -> list[str]:
+        """Return zip urls or an empty list if anything goes wrong, so that the caller can fall back to the browser."""
+        if not (m := re.match(REVISOR_URL_PATTERN, revisor_url or "")):
+            logger.debug(f"Unexpected Revisor url {revisor_url}.")
+            return []
+        api_url = self.api_url_template.format(revisor_url=revisor_url, review_id=m["id"], review_hash=m["hash"])
+        logger.debug(f"Fetching zip urls from {api_url}...")
+        try:
+            response = self.session.get(api_url, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            review = response.json()
+        except ValueError:  # Before RequestException: newer requests raise an error that is both
+            logger.debug(f"{api_url} answered with something other than JSON.")
+            return []
+        except requests.RequestException as e:
+            logger.debug(f"Failed to fetch {api_url}: {e}.")
+            return []
+        return sorted(set(_find_homework_urls(review)), key=extract_version_id)
+
+
+def _find_homework_urls(value) -> Iterator[str]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == HOMEWORK_URL_KEY and isinstance(item, str) and item.endswith(".zip"):
+                yield item
+            else:
+                yield from _find_homework_urls(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _find_homework_urls(item)
+
+
+def find_zip_urls(text: str) -> list[str]:
+    """Return sorted zip urls mentioned in a Revisor page."""
+    ms = re.findall(ZIP_URL_PATTERN, text)
+    urls = {m.replace(r"\u002F", "/") for m in ms}
+    return sorted(urls, key=extract_version_id)
+
+
+def extract_version_id(homework_zip_filename: str) -> Optional[str]:
+    if m := re.search(r".*?_(?P<id>\d+).zip", homework_zip_filename):
+        group_dict = m.groupdict()
+        logger.debug("{} {} {}", homework_zip_filename, group_dict, group_dict["id"])
+        return group_dict["id"]
+
+
+def load_firefox_cookies(profile_path: Path) -> requests.cookies.RequestsCookieJar:
+    jar = requests.cookies.RequestsCookieJar()
+    cookies_path = profile_path / COOKIES_FILENAME
+    if not cookies_path.exists():
+        logger.warning(f"{cookies_path} not found, Revisor requests won't be authenticated 😿")
+        return jar
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        # Firefox keeps the database locked while running, so a copy is read (along with the write-ahead log).
+        for path in profile_path.glob(f"{COOKIES_FILENAME}*"):
+            shutil.copy(path, temporary_directory)
+        connection = sqlite3.connect(str(Path(temporary_directory) / COOKIES_FILENAME))
+        try:
+            rows = connection.execute(
+                "SELECT name, value, host, path, isSecure FROM moz_cookies WHERE host LIKE ?",
+                (f"%{COOKIE_DOMAIN}",),
+            ).fetchall()
+        finally:
+            connection.close()
+    for name, value, host, path, is_secure in rows:
+        jar.set(name, value, domain=host, path=path, secure=bool(is_secure))
+    logger.debug(f"Loaded {len(rows)} cookies from {cookies_path}.")
+    return jar
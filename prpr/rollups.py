@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import datetime as dt
+import sqlite3
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+from loguru import logger
+from rich import box
+from rich.console import Console
+from rich.table import Table
+
+from prpr.cache import CACHE_KEY_NAME, get_cache_directory
+from prpr.date_utils import LOCAL_TIMEZONE, month_start_and_end
+from prpr.homework import CLOSED_STATUSES, Homework
+
+ROLLUPS_FILENAME = "rollups.sqlite3"
+MY_SCOPE = "me()"  # The assignee of the tickets when no user is given, as in the tracker filter
+UNKNOWN_ITERATION = 0  # Closed tickets come without status histories, the iteration is known only if seen open
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    course TEXT NOT NULL,
+    problem INTEGER NOT NULL,
+    iteration INTEGER NOT NULL,
+    month TEXT,  -- The start of the payout "month" the ticket was closed in, NULL while it's not closed
+    PRIMARY KEY (scope, key)
+);
+CREATE TABLE IF NOT EXISTS months (
+    scope TEXT NOT NULL,
+    month TEXT NOT NULL,
+    PRIMARY KEY (scope, month)
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    scope TEXT NOT NULL,
+    month TEXT NOT NULL,
+    course TEXT NOT NULL,
+    problem INTEGER NOT NULL,
+    iteration INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (scope, month, course, problem, iteration)
+);
+"""
+
+
+class TicketRow(NamedTuple):
+    course: str
+    problem: int
+    iteration: int
+    month: Optional[str]
+
+
+class RollupRow(NamedTuple):
+    month: str
+    course: str
+    problem: int
+    iteration: int
+    count: int
+
+
+def open_payout_rollups(config) -> Optional[PayoutRollups]:
+    if not config.get(CACHE_KEY_NAME, True):
+        logger.debug("Payout rollups are disabled along with the cache.")
+        return None
+    cache_directory = get_cache_directory()
+    cache_directory.mkdir(parents=True, exist_ok=True)
+    return PayoutRollups(cache_directory / ROLLUPS_FILENAME)
+
+
+class PayoutRollups:
+    """Closed homeworks counted per payout "month" (see month_start), course, problem and iteration.
+
+    The counts are kept up to date as tickets close: only the months whose tickets changed are recounted.
+    A month is sealed once it's over and the tickets were fetched in full (without query pushdown):
+    its counts are final, tickets closing or reopening later don't change them."""
+
+    def __init__(self, path: Path):
+        logger.debug(f"Opening payout rollups at {path}...")
+        self.path = path
+        self.connection = sqlite3.connect(str(path))
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def update(
+        self,
+        user: Optional[str],
+        homeworks: Iterable[Homework],
+        month_start: int,
+        complete: bool = True,
+        today: Optional[dt.date] = None,
+    ) -> int:
+        """Take the current state of the homeworks into account, return the number of months recounted.
+
+        `complete` means that all the tickets of the scope are among the homeworks, so the months that are over
+        can be sealed."""
+        scope = user or MY_SCOPE
+        today = today or dt.date.today()
+        known = {
+            key: TicketRow(*row)
+            for key, *row in self.connection.execute(
+                "SELECT key, course, problem, iteration, month FROM tickets WHERE scope = ?", (scope,)
+            )
+        }
+        sealed = self.sealed_months(user)
+        changed, dirty_months = [], set()
+        for homework in homeworks:
+            old = known.get(homework.issue_key)
+            month = None
+            if homework.status in CLOSED_STATUSES and homework.status_updated:
+                month = f"{month_start_and_end(homework.status_updated.date(), month_start)[0]:%Y-%m-%d}"
+            if old and old.month != month and (old.month in sealed or month in sealed):
+                logger.debug(f"{homework.issue_key} belongs to the sealed month {old.month or month}, not moved.")
+                month = old.month
+            iteration = homework.iteration or (old.iteration if old else UNKNOWN_ITERATION)
+            new = TicketRow(homework.course, homework.problem, iteration, month)
+            if new != old:
+                changed.append((scope, homework.issue_key, *new))
+                dirty_months.update(row.month for row in (old, new) if row and row.month)
+        dirty_months -= sealed
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO tickets (scope, key, course, problem, iteration, month) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                changed,
+            )
+            for month in dirty_months:
+                self._recount(scope, month)
+            if complete:
+                self._seal_finished_months(scope, today, month_start)
+        logger.debug(f"{len(changed)} tickets changed, {len(dirty_months)} payout months recounted for {scope}.")
+        return len(dirty_months)
+
+    def sealed_months(self, user: Optional[str]) -> set[str]:
+        rows = self.connection.execute("SELECT month FROM months WHERE scope = ?", (user or MY_SCOPE,))
+        return {month for (month,) in rows}
+
+    def rollups(self, user: Optional[str], month: Optional[dt.date] = None) -> list[RollupRow]:
+        """The counts of the month (by its start), of all the months without one, newest month first."""
+        query = "SELECT month, course, problem, iteration, count FROM rollups WHERE scope = ?"
+        parameters: tuple = (user or MY_SCOPE,)
+        if month:
+            query += " AND month = ?"
+            parameters += (f"{month:%Y-%m-%d}",)
+        query += " ORDER BY month DESC, course, problem, iteration"
+        return [RollupRow(*row) for row in self.connection.execute(query, parameters)]
+
+    def _recount(self, scope: str, month: str) -> None:
+        self.connection.execute("DELETE FROM rollups WHERE scope = ? AND month = ?", (scope, month))
+        self.connection.execute(
+            """
+            INSERT INTO rollups (scope, month, course, problem, iteration, count)
+            SELECT scope, month, course, problem, iteration, COUNT(*) FROM tickets
+            WHERE scope = ? AND month = ?
+            GROUP BY course, problem, iteration
+            """,
+            (scope, month),
+        )
+
+    def _seal_finished_months(self, scope: str, today: dt.date, month_start: int) -> None:
+        current_month = f"{month_start_and_end(today, month_start)[0]:%Y-%m-%d}"
+        self.connection.execute(
+            """
+            INSERT OR IGNORE INTO months (scope, month)
+            SELECT DISTINCT scope, month FROM rollups WHERE scope = ? AND month < ?
+            """,
+            (scope, current_month),
+        )
+
+
+def print_payout_stats(rows: list[RollupRow], sealed: set[str], month_start: int, title: Optional[str] = None):
+    """A section per month, newest first: its total, then the counts by course, problem and iteration."""
+    if not rows:
+        logger.warning("No closed homeworks counted for the chosen months.")
+        return
+    totals: dict[str, int] = {}
+    for row in rows:
+        totals[row.month] = totals.get(row.month, 0) + row.count
+    table = Table(title=title, box=box.MINIMAL_HEAVY_HEAD)
+    table.add_column("month")
+    table.add_column("course")
+    table.add_column("pr", justify="right")
+    table.add_column("i", justify="right")
+    table.add_column("count", justify="right")
+    for i, row in enumerate(rows):
+        if i == 0 or row.month != rows[i - 1].month:
+            start, end = month_start_and_end(dt.date.fromisoformat(row.month), month_start)
+            label = f"{start:%Y-%m-%d} – {end:%Y-%m-%d} {'🔒' if row.month in sealed else '⏳'}"
+            table.add_row(label, "", "", "", str(totals[row.month]), style="bold")
+        iteration = str(row.iteration) if row.iteration != UNKNOWN_ITERATION else "?"
+        last_of_month = i + 1 < len(rows) and rows[i + 1].month != row.month
+        table.add_row("", row.course, str(row.problem), iteration, str(row.count), end_section=last_of_month)
+    now = dt.datetime.now(LOCAL_TIMEZONE)
+    table.caption = f"🔒 sealed, ⏳ in progress, ? closed before seen open; as of {now:%Y-%m-%d %H:%M}"
+    Console().print(table)
@@ -1,4 +1,11 @@
-from typing import Optional
+from __future__ import annotations
+
+import json
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import chain, islice
+from typing import Any, Iterable, Iterator, Optional, Tuple
 
 from loguru import logger
 from yandex_tracker_client import TrackerClient
@@ -6,36 +13,200 @@ from yandex_tracker_client.exceptions import TrackerClientError
 from yandex_tracker_client.objects import Resource
 
 from prpr.date_utils import parse_datetime
-from prpr.homework import Homework, Status, StatusTransition
+from prpr.homework import CLOSED_STATUSES, Homework, Status, StatusTransition
+from prpr.profiling import span
 
 YANDEX_ORG_ID = 0
 STARTREK_TOKEN_KEY_NAME = "startrek_token"
+STARTREK_BASE_URL_KEY_NAME = "startrek_base_url"
+DEFAULT_STARTREK_BASE_URL = "https://st-api.yandex-team.ru"
+CHANGELOG_CONCURRENCY_KEY_NAME = "changelog_concurrency"
+DEFAULT_CHANGELOG_CONCURRENCY = 8
+ISSUES_PER_PAGE = 50
+ISSUES_ORDER = ["+key"]
+SYNC_SAFETY_MARGIN = timedelta(minutes=5)  # For the clock skew between here and the tracker
+WATERMARK_FORMAT = "%Y-%m-%dT%H:%M:%S.000+0000"  # As `updatedAt`
+
+
+@dataclass
+class IssueRecord:
+    """The fields of a tracker issue prpr needs to build a Homework, detached from the client."""
+
+    key: str  # e.g. "PCR-12345"
+    summary: str
+    cohort: Optional[str]
+    components: list[str]  # component names, the first one is the course
+    status: str  # e.g. "open"
+    status_start_time: Optional[str]  # e.g. "2020-09-23T22:14:37.658+0000"
+    description: Optional[str]
+    updated_at: Optional[str]
+
+    @staticmethod
+    def from_issue(issue) -> IssueRecord:
+        return IssueRecord(
+            key=issue.key,
+            summary=issue.summary,
+            cohort=issue.cohort,
+            components=[component.name for component in issue.components or []],
+            status=issue.status.key,
+            status_start_time=issue.statusStartTime,
+            description=issue.description,
+            updated_at=issue.updatedAt,
+        )
 
 
 class PraktikTrackerClient(TrackerClient):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, changelog_concurrency: int = DEFAULT_CHANGELOG_CONCURRENCY, **kwargs):
         super().__init__(*args, **kwargs)
         self.token = kwargs["token"]
+        self.changelog_concurrency = max(1, changelog_concurrency)
 
-    def _get_filter_expression(self, user: Optional[str] = None):
+    def _get_filter_expression(self, user: Optional[str] = None, pushdown: Optional[dict[str, Any]] = None):
         return {
             "queue": "PCR",
             "assignee": user or "me()",
+            **(pushdown or {}),
         }
 
-    def get_issues(self, user: Optional[str] = None):
-        logger.debug("Fetching issues...")
-        issues = self.issues.find(filter=self._get_filter_expression(user))
+    def get_issues(
+        self,
+        user: Optional[str] = None,
+        updated_from: Optional[str] = None,
+        pushdown: Optional[dict[str, Any]] = None,
+    ):
+        issues = chain.from_iterable(self.iter_issues(user, updated_from=updated_from, pushdown=pushdown))
         sorted_issues = sorted(issues, key=by_issue_key)
         return sorted_issues
 
+    def iter_issues(
+        self,
+        user: Optional[str] = None,
+        updated_from: Optional[str] = None,
+        pushdown: Optional[dict[str, Any]] = None,
+        per_page: int = ISSUES_PER_PAGE,
+    ) -> Iterator[list]:
+        """Yield pages of issues ordered by key as they arrive, the next page is requested only when needed."""
+        logger.debug("Fetching issues...")
+        filter_expression = self._get_filter_expression(user, pushdown)
+        if updated_from:
+            logger.debug(f"Fetching only issues updated since {updated_from}...")
+            filter_expression["updated"] = {"from": updated_from}
+        issues = iter(self.issues.find(filter=filter_expression, order=ISSUES_ORDER, per_page=per_page))
+        while True:
+            with span("tracker.get_issues") as fetching:  # The page is requested while it's taken
+                page = list(islice(issues, per_page))
+                fetching.add(items=len(page))
+            if not page:
+                return
+            logger.debug(f"Got a page of {len(page)} issues.")
+            yield page
+
+    def get_issue_records(
+        self,
+        user: Optional[str] = None,
+        cache=None,
+        refresh=False,
+        pushdown: Optional[dict[str, Any]] = None,
+    ) -> Tuple[list[IssueRecord], dict[str, Optional[list[StatusTransition]]]]:
+        """Return issue records sorted by issue key and their status histories.
+
+        With a cache only the issues updated since the last run started are fetched (along with their changelogs),
+        the rest comes from the cache. The cached issues that are not closed are checked to be still assigned,
+        the ones reassigned or taken by someone else are dropped.
+        `refresh` drops the cached issues and fetches everything again.
+
+        `pushdown` narrows down the initial query (see filters.plan_query). Updates are fetched without it,
+        so that issues leaving the pushed down statuses are updated as well."""
+        if cache is None:
+            records, histories = self._fetch_changed_records(self.iter_issues(user, pushdown=pushdown), {})
+            return sorted(records, key=by_issue_key), histories
+
+        scope = self._get_filter_expression(user)["assignee"]
+        if pushdown:
+            scope = f"{scope} {json.dumps(pushdown, sort_keys=True)}"
+        if refresh:
+            logger.debug(f"Dropping cached issues for {scope}...")
+            cache.clear(scope)
+        records, histories = cache.load(scope)
+        # Issues changing while the pages load may get `updatedAt` below the latest one fetched, hence the start time
+        synced_at = f"{datetime.now(timezone.utc) - SYNC_SAFETY_MARGIN:{WATERMARK_FORMAT}}"
+        if watermark := cache.watermark(scope):
+            pages = self.iter_issues(user, updated_from=watermark)
+        else:
+            pages = self.iter_issues(user, pushdown=pushdown)
+        changed_records, changed_histories = self._fetch_changed_records(pages, records)
+        cache.store(scope, changed_records, changed_histories, synced_at=synced_at)
+        records.update((record.key, record) for record in changed_records)
+        histories.update(changed_histories)
+        if watermark:
+            changed_keys = {record.key for record in changed_records}
+            active_keys = [
+                key
+                for key, record in records.items()
+                if key not in changed_keys and Status.from_string(record.status) not in CLOSED_STATUSES
+            ]
+            if gone_keys := set(active_keys) - self.get_assigned_keys(user, active_keys):
+                logger.debug(f"Dropping {len(gone_keys)} issues no longer assigned to {scope}: {sorted(gone_keys)}")
+                cache.delete(scope, gone_keys)
+                for key in gone_keys:
+                    records.pop(key)
+                    histories.pop(key, None)
+        sorted_records = sorted(records.values(), key=by_issue_key)
+        return sorted_records, histories
+
+    def get_assigned_keys(self, user: Optional[str], keys: list[str]) -> set[str]:
+        """Those of the `keys` that are still assigned to the user (or me)."""
+        if not keys:
+            return set()
+        filter_expression = {**self._get_filter_expression(user), "key": sorted(keys)}
+        with span("tracker.get_assigned_keys") as checking:
+            issues = self.issues.find(filter=filter_expression, order=ISSUES_ORDER, per_page=ISSUES_PER_PAGE)
+            assigned_keys = {issue.key for issue in issues}
+            checking.add(items=len(keys))
+        return assigned_keys
+
+    def _fetch_changed_records(
+        self, pages: Iterable[list], known_records: dict[str, IssueRecord]
+    ) -> Tuple[list[IssueRecord], dict[str, Optional[list[StatusTransition]]]]:
+        """Make records of new and changed issues, their changelogs are fetched while the next pages load."""
+        changed_records, futures = [], {}
+        fetched_count = 0
+        with ThreadPoolExecutor(max_workers=self.changelog_concurrency) as executor:
+            for page in pages:
+                fetched_count += len(page)
+                changed = [
+                    issue
+                    for issue in page
+                    if issue.key not in known_records or known_records[issue.key].updated_at != issue.updatedAt
+                ]
+                changed_records.extend(IssueRecord.from_issue(issue) for issue in changed)
+                futures.update(self._submit_status_histories(executor, changed))
+            histories = {key: future.result() for key, future in futures.items()}
+        logger.debug(f"{len(changed_records)} of {fetched_count} fetched issues are new or changed.")
+        return changed_records, histories
+
+    def get_status_histories(self, issues: Iterable) -> dict[str, Optional[list[StatusTransition]]]:
+        """Fetch status histories for several issues at once, keyed by issue key.
+
+        Changelogs are requested concurrently, at most `changelog_concurrency` at a time."""
+        issues = list(issues)
+        logger.debug(f"Fetching status histories for {len(issues)} issues, {self.changelog_concurrency} at a time...")
+        with ThreadPoolExecutor(max_workers=self.changelog_concurrency) as executor:
+            futures = self._submit_status_histories(executor, issues)
+            return {key: future.result() for key, future in futures.items()}
+
+    def _submit_status_histories(self, executor: Executor, issues: Iterable) -> dict[str, Future]:
+        return {issue.key: executor.submit(self.get_status_history, issue) for issue in issues}
+
     def get_status_history(self, issue) -> Optional[list[StatusTransition]]:
         issue_key, issue_status = issue.key, issue.status.key
         if issue_status not in {"open", "inReview"}:  # TODO: make configurable
             return None
         logger.debug(f"Fetching status history for {issue_key}")
         try:
-            changes = issue.changelog.get_all()
+            with span("tracker.get_status_history", issue=issue_key) as fetching:
+                changes = list(issue.changelog.get_all())
+                fetching.add(items=len(changes))
         except TrackerClientError:
             logger.exception("Failed to fetch status history for {} 😿", issue_key)
             return []
@@ -66,7 +237,13 @@ def get_startack_client(config) -> PraktikTrackerClient:
         logger.error(f"{STARTREK_TOKEN_KEY_NAME} top-level key not found in config 😿")
         exit(1)
     token = config[STARTREK_TOKEN_KEY_NAME]
-    return PraktikTrackerClient(org_id=YANDEX_ORG_ID, base_url="https://st-api.yandex-team.ru", token=token)
+    changelog_concurrency = config.get(CHANGELOG_CONCURRENCY_KEY_NAME, DEFAULT_CHANGELOG_CONCURRENCY)
+    return PraktikTrackerClient(
+        org_id=YANDEX_ORG_ID,
+        base_url=config.get(STARTREK_BASE_URL_KEY_NAME, DEFAULT_STARTREK_BASE_URL),
+        token=token,
+        changelog_concurrency=changelog_concurrency,
+    )
 
 
 def by_issue_key(issue) -> int:
@@ -6,47 +6,68 @@ from rich import box
 from rich.console import Console
 from rich.table import Table
 
+from prpr.date_utils import LOCAL_TIMEZONE
 from prpr.homework import Homework, Status
+from prpr.profiling import profiled
 
 DISPLAYED_TAIL_LENGTH = None
+COLUMN_NAMES = ("#", "ticket", "no", "pr", "i", "student", "co", "st", "deadline", "left", "updated")
 
 
-def print_issue_table(homeworks: list[Homework], last=None, last_processed=None, title: Optional[str] = None):
+@profiled("table.print")
+def print_issue_table(
+    homeworks: list[Homework],
+    last=None,
+    last_processed=None,
+    title: Optional[str] = None,
+    console: Optional[Console] = None,
+):
     if not homeworks:
         logger.warning("No homeworks for chosen filter combination.")
         return
+    table = build_issue_table(homeworks, last=last, last_processed=last_processed, title=title)
+    console = console or Console()
+    console.print(table)
+
+
+def build_issue_table(homeworks: list[Homework], last=None, last_processed=None, title: Optional[str] = None) -> Table:
     table = setup_table(homeworks, title)
+    now = datetime.now(LOCAL_TIMEZONE)  # The same for all rows
 
     start_from = -last if last else last
     for table_number, homework in enumerate(homeworks[start_from:], 1):
-        row_columns = (  # TODO: Move to Homework
-            str(table_number),
-            homework.issue_url,
-            str(homework.number),
-            str(homework.problem),
-            homework.iteration and str(homework.iteration),
-            homework.student,
-            homework.cohort,
-            homework.pretty_status,
-            homework.deadline_string,
-            homework.left,
-            homework.updated_string,
-        )
         table.add_row(
-            *row_columns,
-            style=compute_style(homework, last_processed=last_processed),
+            *row_columns(table_number, homework, now),
+            style=compute_style(homework, last_processed=last_processed, now=now),
         )
+    return table
 
-    console = Console()
-    console.print(table)
+
+def row_columns(table_number: int, homework: Homework, now: datetime) -> tuple[Optional[str], ...]:
+    """The cells of a homework row, in the order of COLUMN_NAMES."""
+    return (  # TODO: Move to Homework
+        str(table_number),
+        homework.issue_url,
+        str(homework.number),
+        str(homework.problem),
+        homework.iteration and str(homework.iteration),
+        homework.student,
+        homework.cohort,
+        homework.pretty_status_at(now),
+        homework.deadline_string,
+        homework.left_at(now),
+        homework.updated_string_at(now),
+    )
 
 
-def compute_style(homework: Homework, last_processed=None):  # TODO: consider moving to Homework
+# TODO: consider moving to Homework
+def compute_style(homework: Homework, last_processed=None, now: Optional[datetime] = None):
+    now = now or datetime.now(LOCAL_TIMEZONE)
     if homework == last_processed:
         return "dim"
-    if homework.deadline_missed:
+    if homework.deadline_missed_at(now):
         return "red"  # TODO: Move to dotfile
-    if homework.deadline and homework.deadline.date() == datetime.now().date():
+    if homework.deadline and homework.deadline.date() == now.date():
         return "bold"
     if homework.status == Status.ON_THE_SIDE_OF_USER:
         return "dim"
@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+
+from prpr.benchmarks import hot_paths
+from prpr.benchmarks.synthetic import make_homework_arguments, make_homeworks
+from prpr.homework import Status
+
+NOW = datetime(2026, 10, 18, 12, tzinfo=timezone.utc)
+
+
+def test_synthetic_homeworks_look_real():
+    homeworks = make_homeworks(500, now=NOW)
+    assert make_homeworks(500, now=NOW)[-1].student == homeworks[-1].student  # Same seed, same homeworks
+    assert {homework.status for homework in homeworks} == set(Status) - {Status.UNKNOWN}
+    assert all(homework.revisor_url for homework in homeworks)
+    assert all(homework.status_updated <= NOW for homework in homeworks)
+    in_review = [homework for homework in homeworks if homework.status == Status.IN_REVIEW]
+    reopened = [homework for homework in in_review if homework.iteration]  # The first iteration isn't counted
+    assert reopened and all(homework.last_opened for homework in reopened)
+
+
+def test_hot_paths_are_compared_to_baselines(tmp_path):
+    results = hot_paths.run(count=200, table_rows=20, repeat=1)
+    assert len(results) == len(hot_paths.make_benchmarks(count=10, table_rows=1))
+
+    path = tmp_path / "baselines.json"
+    hot_paths.save_baselines(results, count=200, table_rows=20, path=path)
+    baselines = hot_paths.load_baselines(path)
+    slower = {name: seconds * 2 if name == "sort_homeworks" else seconds for name, seconds in results.items()}
+    comparisons = hot_paths.compare(slower, baselines, count=200, table_rows=20)
+    assert [comparison.name for comparison in hot_paths.regressions(comparisons)] == ["sort_homeworks"]
+    assert not hot_paths.regressions(hot_paths.compare(slower, baselines, count=100, table_rows=20))
+
+
+def test_synthetic_arguments_are_fetch_homeworks_like():
+    (arguments,) = make_homework_arguments(1, now=NOW)
+    assert arguments["issue_key"] == "PCR-1"
+    assert arguments["status_updated"].endswith("+0000")
@@ -0,0 +1,50 @@
+import pytest
+
+from prpr.blobs import BlobStore
+
+
+def _tree(root, files):
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return root
+
+
+@pytest.fixture()
+def store(tmp_path):
+    return BlobStore(tmp_path / ".blobs")
+
+
+def test_add_tree(store, tmp_path):
+    first = _tree(tmp_path / "it_01", {"manage.py": "django", "app/views.py": "v1"})
+    second = _tree(tmp_path / "it_02", {"manage.py": "django", "app/views.py": "v2"})
+    assert store.add_tree(first) == (0, 0)
+    assert store.add_tree(second) == (1, len("django"))
+    assert (first / "manage.py").samefile(second / "manage.py")
+    assert not (first / "app/views.py").samefile(second / "app/views.py")
+    assert (second / "app/views.py").read_text() == "v2"
+    assert len(list(store.root.glob("*/*"))) == 3
+
+
+def test_gc(store, tmp_path):
+    first = _tree(tmp_path / "it_01", {"manage.py": "django", "views.py": "v1"})
+    second = _tree(tmp_path / "it_02", {"manage.py": "django"})
+    store.add_tree(first)
+    store.add_tree(second)
+    (first / "views.py").unlink()
+    (first / "manage.py").unlink()
+    assert store.gc() == (1, len("v1"))
+    assert store.gc() == (0, 0)
+    assert (second / "manage.py").read_text() == "django"
+    assert len(list(store.root.glob("*/*"))) == 1
+
+
+def test_add_tree_keeps_modes(store, tmp_path):
+    first = _tree(tmp_path / "it_01", {"gradlew": "#!/bin/sh", "notes.txt": "#!/bin/sh"})
+    (first / "gradlew").chmod(0o755)
+    (first / "notes.txt").chmod(0o644)
+    assert store.add_tree(first) == (0, 0)
+    assert (first / "gradlew").stat().st_mode & 0o777 == 0o755
+    assert (first / "notes.txt").stat().st_mode & 0o777 == 0o644
+    assert not (first / "gradlew").samefile(first / "notes.txt")
@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+from freezegun import freeze_time
+from loguru import logger
+
+from prpr.cache import IssueCache, MemoryIssueCache
+from prpr.homework import Status, StatusTransition
+from prpr.startrack_client import IssueRecord, PraktikTrackerClient
+
+TIMESTAMP = datetime(2021, 5, 11, 5, 13, tzinfo=timezone(timedelta(hours=3)))
+
+
+def _record(key, updated_at="2021-05-11T02:13:00.000+0000"):
+    return IssueRecord(
+        key=key,
+        summary="[1] Даниил Хармс (yuvachev@yandex.ru)",
+        cohort="16",
+        components=["backend-developer"],
+        status="open",
+        status_start_time="2021-05-11T02:13:00.000+0000",
+        description="",
+        updated_at=updated_at,
+    )
+
+
+def _issue(record):
+    issue = mock.Mock(**{name: getattr(record, name) for name in ("key", "summary", "cohort", "description")})
+    issue.components = [mock.Mock()]
+    issue.components[0].name = record.components[0]
+    issue.status.key = record.status
+    issue.statusStartTime = record.status_start_time
+    issue.updatedAt = record.updated_at
+    return issue
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    with IssueCache(tmp_path / "issues.sqlite3") as cache:
+        yield cache
+
+
+def test_store_and_load(cache):
+    transitions = [
+        StatusTransition(None, Status.OPEN, TIMESTAMP),
+        StatusTransition(Status.OPEN, Status.IN_REVIEW, TIMESTAMP),
+    ]
+    cache.store("me()", [_record("PCR-1"), _record("PCR-2")], {"PCR-1": transitions, "PCR-2": None})
+    records, histories = cache.load("me()")
+    assert records == {"PCR-1": _record("PCR-1"), "PCR-2": _record("PCR-2")}
+    assert histories == {"PCR-1": transitions, "PCR-2": None}
+    assert cache.load("someone") == ({}, {})
+
+
+def test_watermark(cache):
+    assert cache.watermark("me()") is None
+    cache.store(
+        "me()",
+        [_record("PCR-1", "2021-05-11T02:13:00.000+0000"), _record("PCR-2", "2021-06-01T00:00:00.000+0000")],
+        {},
+    )
+    assert cache.watermark("me()") == "2021-06-01T00:00:00.000+0000"
+
+
+def test_watermark_is_sync_time(cache):
+    cache.store(
+        "me()", [_record("PCR-1", "2021-06-01T00:00:00.000+0000")], {}, synced_at="2021-05-20T00:00:00.000+0000"
+    )
+    assert cache.watermark("me()") == "2021-05-20T00:00:00.000+0000"
+    cache.clear("me()")
+    assert cache.watermark("me()") is None
+
+
+@freeze_time("2021-06-02T10:00:00+00:00")
+def test_get_issue_records_fetches_only_changed(cache):
+    logger.disable("prpr.startrack_client")
+    client = PraktikTrackerClient(token="fake-token", org_id="fake-org-id")
+    cache.store("me()", [_record("PCR-2"), _record("PCR-3")], {"PCR-2": [], "PCR-3": []})
+    changed = _record("PCR-3", updated_at="2021-06-01T00:00:00.000+0000")
+    pages = [[_issue(_record("PCR-2")), _issue(changed)], [_issue(_record("PCR-1"))]]
+    histories = {"PCR-3": None, "PCR-1": []}
+    with mock.patch.object(client, "iter_issues", return_value=iter(pages)) as iter_issues, mock.patch.object(
+        client, "get_status_history", side_effect=lambda issue: histories[issue.key]
+    ) as get_status_history, mock.patch.object(client, "get_assigned_keys", return_value={"PCR-2"}):
+        records, histories = client.get_issue_records(cache=cache)
+    logger.enable("prpr.startrack_client")
+
+    iter_issues.assert_called_once_with(None, updated_from="2021-05-11T02:13:00.000+0000")
+    assert sorted(call.args[0].key for call in get_status_history.call_args_list) == ["PCR-1", "PCR-3"]
+    assert [record.key for record in records] == ["PCR-1", "PCR-2", "PCR-3"]
+    assert records[2] == changed
+    assert histories == {"PCR-1": [], "PCR-2": [], "PCR-3": None}
+    assert cache.watermark("me()") == "2021-06-02T09:55:00.000+0000"  # The start of the sync, with a margin
+
+
+@freeze_time("2021-06-02T10:00:00+00:00")
+def test_get_issue_records_drops_reassigned(cache):
+    logger.disable("prpr.startrack_client")
+    client = PraktikTrackerClient(token="fake-token", org_id="fake-org-id")
+    closed = IssueRecord(**{**_record("PCR-3").__dict__, "status": "closed"})
+    cache.store("me()", [_record("PCR-1"), _record("PCR-2"), closed], {"PCR-1": [], "PCR-2": [], "PCR-3": None})
+    with mock.patch.object(client, "iter_issues", return_value=iter([])), mock.patch.object(
+        client, "get_assigned_keys", return_value={"PCR-1"}
+    ) as get_assigned_keys:
+        records, histories = client.get_issue_records(cache=cache)
+    logger.enable("prpr.startrack_client")
+
+    get_assigned_keys.assert_called_once_with(None, ["PCR-1", "PCR-2"])  # Closed ones are not checked
+    assert [record.key for record in records] == ["PCR-1", "PCR-3"]
+    assert histories == {"PCR-1": [], "PCR-3": None}
+    assert list(cache.load("me()")[0]) == ["PCR-1", "PCR-3"]
+
+
+@freeze_time("2021-06-02T10:00:00+00:00")
+def test_get_issue_records_pushes_down_only_initial_query(cache):
+    logger.disable("prpr.startrack_client")
+    client = PraktikTrackerClient(token="fake-token", org_id="fake-org-id")
+    pushdown = {"status": ["inReview", "open"]}
+    with mock.patch.object(
+        client, "iter_issues", side_effect=lambda *args, **kwargs: iter([[_issue(_record("PCR-1"))]])
+    ) as iter_issues, mock.patch.object(client, "get_status_history", return_value=None), mock.patch.object(
+        client, "get_assigned_keys", return_value={"PCR-1"}
+    ):
+        client.get_issue_records(cache=cache, pushdown=pushdown)
+        client.get_issue_records(cache=cache, pushdown=pushdown)
+    logger.enable("prpr.startrack_client")
+
+    assert iter_issues.call_args_list == [
+        mock.call(None, pushdown=pushdown),
+        mock.call(None, updated_from="2021-06-02T09:55:00.000+0000"),
+    ]
+    assert cache.load("me()") == ({}, {})
+
+
+def test_memory_cache():
+    cache = MemoryIssueCache()
+    assert cache.watermark("me()") is None
+    cache.store("me()", [_record("PCR-1", "2021-05-11T02:13:00.000+0000")], {"PCR-1": []})
+    cache.store("me()", [_record("PCR-2", "2021-06-01T00:00:00.000+0000")], {})
+    assert cache.watermark("me()") == "2021-06-01T00:00:00.000+0000"
+    records, histories = cache.load("me()")
+    assert list(records) == ["PCR-1", "PCR-2"]
+    assert histories == {"PCR-1": [], "PCR-2": None}
+    cache.delete("me()", ["PCR-2"])
+    assert list(cache.load("me()")[0]) == ["PCR-1"]
+    cache.clear("me()")
+    assert cache.load("me()") == ({}, {})
@@ -0,0 +1,80 @@
+import datetime as dt
+import random
+
+import pytest
+
+from prpr.columns import HomeworkColumns
+from prpr.filters import FilterMode, filter_homeworks
+from prpr.homework import CLOSED_STATUSES, Homework
+
+STATUSES = ("open", "inReview", "onTheSideOfUser", "resolved", "closed")
+STUDENTS = ("Даниил Хармс (yuvachev@yandex.ru)", "Александр Введенский (vvedensky@yandex.ru)")
+
+
+@pytest.fixture()
+def homeworks():
+    rng = random.Random(42)
+    return [
+        Homework(
+            f"PCR-{number}",
+            f"[{rng.randint(1, 5)}] {rng.choice(STUDENTS)}",
+            rng.choice(("1", "2", "1+")),
+            rng.choice(STATUSES),
+            f"2021-05-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:13:00.000+0000",
+            "",
+            number,
+            "backend-developer",
+        )
+        for number in range(1, 201)
+    ]
+
+
+@pytest.mark.parametrize(
+    "filters",
+    (
+        {"mode": FilterMode.ALL},
+        {"mode": FilterMode.STANDARD, "problems": [1, 3]},
+        {"mode": FilterMode.CLOSED, "student": "хармс", "cohorts": ["1+"]},
+        {"mode": FilterMode.OPEN, "from_date": dt.date(2021, 5, 10), "to_date": dt.date(2021, 5, 20)},
+        {"mode": FilterMode.ALL, "no": 17},
+    ),
+)
+def test_filter_homeworks_matches_scans(filters, homeworks):
+    expected = homeworks
+    if no := filters.get("no"):
+        expected = [h for h in expected if h.number == no]
+    if filters["mode"] == FilterMode.STANDARD:
+        expected = [h for h in expected if h.status not in CLOSED_STATUSES]
+    elif filters["mode"] == FilterMode.CLOSED:
+        expected = [h for h in expected if h.status in CLOSED_STATUSES]
+    elif filters["mode"] == FilterMode.OPEN:
+        expected = [h for h in expected if h.open_or_in_review]
+    if problems := filters.get("problems"):
+        expected = [h for h in expected if h.problem in problems]
+    if student := filters.get("student"):
+        expected = [h for h in expected if student.lower() in h.student.lower()]
+    if cohorts := filters.get("cohorts"):
+        expected = [h for h in expected if h.cohort in cohorts]
+    if from_date := filters.get("from_date"):
+        from_date = dt.datetime.combine(from_date, dt.time.min).astimezone()
+        expected = [h for h in expected if from_date <= h.status_updated]
+    if to_date := filters.get("to_date"):
+        to_date = dt.datetime.combine(to_date, dt.time.max).astimezone()
+        expected = [h for h in expected if h.status_updated <= to_date]
+    assert expected
+    assert filter_homeworks(homeworks, config={}, **filters) == expected
+
+
+def test_argsort_matches_order_key(homeworks):
+    columns = HomeworkColumns(homeworks)
+    assert columns.take(columns.argsort()) == sorted(homeworks, key=Homework.order_key)
+
+
+@pytest.mark.parametrize(
+    "bounds", ({"updated_from": dt.datetime(2030, 1, 1)}, {"updated_to": dt.datetime(2030, 1, 1)})
+)
+def test_undated_homeworks_are_out_of_any_date_range(bounds):
+    undated = Homework("PCR-1000", "[1] Даниил Хармс (yuvachev@yandex.ru)", "1", "open", None, "", 1000, "backend")
+    assert undated.status_updated is None
+    assert HomeworkColumns([undated]).where(**bounds) == []
+    assert filter_homeworks([undated], mode=FilterMode.ALL, config={}, from_date=dt.date(2030, 1, 1)) == []
@@ -2,7 +2,9 @@ import datetime as dt
 
 import pytest
 
-from prpr.date_utils import month_start_and_end
+from prpr import date_utils
+from prpr.benchmarks.dates import make_timestamps, reference_parse_datetime
+from prpr.date_utils import LOCAL_TIMEZONE, month_start_and_end, parse_datetime
 
 
 @pytest.mark.parametrize(
@@ -16,3 +18,25 @@ from prpr.date_utils import month_start_and_end
 )
 def test_month_start_and_end(day, month_start, expected_start_and_end):
     assert month_start_and_end(day, month_start) == expected_start_and_end
+
+
+def test_parse_datetime_matches_reference():
+    timestamps = make_timestamps(1000) + [None, "2021-01-01T00:00:00.000+0000", "2020-02-29T23:59:59.999+0000"]
+    parsed = [parse_datetime(s) for s in timestamps]
+    assert parsed == [reference_parse_datetime(s) for s in timestamps]
+    assert all(moment is None or moment.tzinfo is LOCAL_TIMEZONE for moment in parsed)
+
+
+@pytest.mark.parametrize("offset", (dt.timedelta(hours=3), dt.timedelta(hours=-9, minutes=-30)))
+def test_parse_datetime_in_other_timezones(offset, monkeypatch):
+    local_timezone = dt.timezone(offset)
+    monkeypatch.setattr(date_utils, "LOCAL_TIMEZONE", local_timezone)
+    parsed = parse_datetime("2020-02-29T23:59:59.999+0000")
+    assert parsed.utcoffset() == offset
+    assert parsed == dt.datetime(2020, 2, 29, 23, 59, 59, 999000, tzinfo=dt.timezone.utc)
+    assert parsed.replace(tzinfo=None) == dt.datetime(2020, 2, 29, 23, 59, 59, 999000) + offset
+
+
+def test_parse_rejects_other_timezones():
+    with pytest.raises(ValueError):
+        parse_datetime("2021-01-01T00:00:00.000+0300")
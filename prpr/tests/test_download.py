@@ -0,0 +1,135 @@
+import time
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from prpr.download import BatchDownloader, DriverManager, _configure_revisor_client, _extract_zip
+from prpr.homework import Homework
+from prpr.http_client import HttpClient
+from prpr.unzip import Extractor
+
+
+def _homework(key, problem):
+    return Homework(
+        key,
+        f"[{problem}] Даниил Хармс (yuvachev@yandex.ru)",
+        "1",
+        "open",
+        "2021-05-11T02:13:00.000+0000",
+        "",
+        1,
+        "backend-developer",
+    )
+
+
+@pytest.fixture()
+def homeworks():
+    return [_homework("PCR-1", 1), _homework("PCR-2", 2), _homework("PCR-3", 3)]
+
+
+def _fetch_zip(url, homework_directory, http_client, refresh=False):
+    time.sleep(0.05 if url.endswith("_1.zip") else 0)  # the first zips arrive last
+    return homework_directory / url, True
+
+
+def _unzip_homework_file(homework_zip, iteration, homework, force=False, extractor=None):
+    return homework_zip.with_suffix(""), str(iteration)
+
+
+@pytest.mark.parametrize("workers", (1, 4))
+@mock.patch("prpr.download._unzip_homework_file", side_effect=_unzip_homework_file)
+@mock.patch("prpr.download._fetch_zip", side_effect=_fetch_zip)
+@mock.patch("prpr.download._get_zip_urls", side_effect=lambda driver, url: ["a_1.zip", "a_2.zip"])
+@mock.patch("prpr.download._get_homework_directory", side_effect=lambda homework, config: Path(homework.issue_key))
+@mock.patch("prpr.download._configure_revisor_client", return_value=None)
+@mock.patch("prpr.download.configure_driver")
+def test_download_batch_keeps_order(_, __, ___, ____, _____, ______, workers, homeworks):
+    downloader = BatchDownloader({"download": {"workers": workers}})
+    batches = list(downloader.download_batch(homeworks, print_banner=False))
+    assert [[result.zipfile for result in batch] for batch in batches] == [
+        [Path(hw.issue_key) / "a_1.zip", Path(hw.issue_key) / "a_2.zip"] for hw in homeworks
+    ]
+    assert [[result.iteration for result in batch] for batch in batches] == [[1, 2]] * 3
+
+
+@mock.patch("prpr.download._fetch_zip", side_effect=_fetch_zip)
+@mock.patch("prpr.download._unzip_homework_file", side_effect=_unzip_homework_file)
+@mock.patch("prpr.download._get_homework_directory", side_effect=lambda homework, config: Path(homework.issue_key))
+@mock.patch("prpr.download.configure_driver")
+def test_download_batch_without_browser(configure_driver, _, __, ___, homeworks):
+    downloader = BatchDownloader({"download": {"workers": 1, "api_url": "https://example.com/reviews/{review_id}"}})
+    with mock.patch.object(downloader.revisor, "get_zip_urls", return_value=["a_1.zip"]):
+        batches = list(downloader.download_batch(homeworks, print_banner=False))
+    assert len(batches) == 3
+    configure_driver.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "download_config,api",
+    (
+        ({}, False),  # The Revisor page needs a click, so the browser is the default
+        ({"api_url": "https://example.com/reviews/{review_id}"}, True),
+        ({"api_url": "https://example.com/reviews/{review_id}", "discovery": "browser"}, False),
+    ),
+)
+def test_zip_urls_api_is_opt_in(download_config, api):
+    assert (_configure_revisor_client(download_config, HttpClient(download_config)) is not None) == api
+
+
+@mock.patch("prpr.download.configure_driver")
+def test_driver_manager_reuses_and_recycles_driver(configure_driver):
+    configure_driver.side_effect = lambda config, headless: mock.Mock(name=f"driver{configure_driver.call_count}")
+    with DriverManager({"browser": {"max_uses": 2}}) as manager:
+        drivers = [manager.run(lambda driver: driver) for _ in range(3)]
+    assert drivers[0] is drivers[1]
+    assert drivers[2] is not drivers[0]
+    drivers[0].quit.assert_called_once()
+    drivers[2].quit.assert_called_once()
+
+
+@mock.patch("prpr.download.configure_driver")
+def test_driver_manager_restarts_crashed_driver(configure_driver):
+    crashed, fresh = mock.Mock(), mock.Mock()
+    configure_driver.side_effect = [crashed, fresh]
+    manager = DriverManager({})
+
+    def action(driver):
+        if driver is crashed:
+            raise WebDriverException("Browsing context has been discarded")
+        return ["a_1.zip"]
+
+    assert manager.run(action) == ["a_1.zip"]
+    crashed.quit.assert_called_once()
+    assert manager.run(lambda driver: driver) is fresh
+
+
+@mock.patch("prpr.download._fetch_zip", side_effect=_fetch_zip)
+@mock.patch("prpr.download._unzip_homework_file", side_effect=_unzip_homework_file)
+@mock.patch("prpr.download._get_zip_urls", side_effect=lambda driver, url: ["a_1.zip"])
+@mock.patch("prpr.download._get_homework_directory", side_effect=lambda homework, config: Path(homework.issue_key))
+@mock.patch("prpr.download._configure_revisor_client", return_value=None)
+@mock.patch("prpr.download.configure_driver")
+def test_shared_driver_outlives_batches(configure_driver, _, __, ___, ____, _____, homeworks):
+    driver_manager = DriverManager({})
+    for homework in homeworks:
+        downloader = BatchDownloader({"download": {"workers": 1}}, driver_manager=driver_manager)
+        list(downloader.download_batch([homework], print_banner=False))
+    configure_driver.assert_called_once()
+    configure_driver.return_value.quit.assert_not_called()
+    driver_manager.quit()
+    configure_driver.return_value.quit.assert_called_once()
+
+
+def test_extract_zip_lazily(tmp_path):
+    homework_zip = tmp_path / "hw_123.zip"
+    with zipfile.ZipFile(homework_zip, "w") as archive:
+        archive.writestr("project/manage.py", "import django")
+    extractor = Extractor({"extract": {"lazy": True}})
+    result = _extract_zip(homework_zip, tmp_path, 1, _homework("PCR-1", 1), extractor=extractor)
+    assert not result.extracted
+    assert result.member_names() == ["project/manage.py"]
+    with result.open_member("project/manage.py") as f:
+        assert f.read() == b"import django"
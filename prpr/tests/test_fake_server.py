@@ -0,0 +1,45 @@
+from unittest import mock
+
+import pytest
+
+from prpr.benchmarks.fake_server import FakeServer
+from prpr.download import BatchDownloader
+from prpr.main import fetch_homeworks
+from prpr.startrack_client import get_startack_client
+
+
+@pytest.fixture(scope="module")
+def server():
+    with FakeServer(tickets=120, zip_size=1024) as server:
+        yield server
+
+
+def test_tracker_client_pages_issues_and_changelogs(server, tmp_path):
+    server.reset_counts()
+    config = server.config(str(tmp_path))
+    homeworks = fetch_homeworks(get_startack_client(config), config)
+
+    assert [homework.issue_key for homework in homeworks] == [f"PCR-{number}" for number in range(1, 121)]
+    open_or_in_review = [homework for homework in homeworks if homework.open_or_in_review]
+    assert all(homework.last_opened for homework in open_or_in_review)
+    requests = server.reset_counts()
+    assert requests["issues"] == 3  # 50 issues per page
+    assert requests["changelog"] == len(open_or_in_review)
+
+
+@mock.patch("prpr.download.configure_driver")
+def test_download_without_browser(configure_driver, server, tmp_path):
+    config = server.config(str(tmp_path))
+    homeworks = fetch_homeworks(get_startack_client(config), config)
+    homework = next(homework for homework in homeworks if homework.open_or_in_review)
+    with BatchDownloader(config) as downloader:
+        (results,) = downloader.download_batch([homework], print_banner=False)
+
+    configure_driver.assert_not_called()
+    assert [result.iteration for result in results] == [1, 2]
+    assert all(len(list(result.iteration_directory.rglob("*.py"))) == 8 for result in results)
+
+
+def test_tracker_client_checks_assigned_keys(server, tmp_path):
+    client = get_startack_client(server.config(str(tmp_path)))
+    assert client.get_assigned_keys(None, ["PCR-3", "PCR-1", "PCR-100500"]) == {"PCR-1", "PCR-3"}
@@ -1,9 +1,25 @@
+import datetime as dt
+import time
+
 import pytest
 
-from prpr.filters import filter_homeworks, FilterMode
+from prpr.filters import filter_homeworks, FilterMode, plan_query
 from prpr.homework import Homework
 
 
+@pytest.fixture()
+def set_timezone(monkeypatch):
+    """Set the local timezone (as in `astimezone()`), restored after the test."""
+
+    def set_timezone(timezone):
+        monkeypatch.setenv("TZ", timezone)
+        time.tzset()
+
+    yield set_timezone
+    monkeypatch.undo()
+    time.tzset()
+
+
 @pytest.fixture()
 def homeworks():
     return [
@@ -34,3 +50,46 @@ def test_students_search(search_string, count, homeworks):
 
     result = filter_homeworks(homeworks, mode=FilterMode.ALL, config={}, student=search_string)
     assert len(result) == count
+
+
+@pytest.mark.freeze_time("2021-05-26")
+@pytest.mark.parametrize("mode,from_date,expected", (
+    (FilterMode.ALL, None, {}),
+    (FilterMode.ALL, dt.date(2021, 5, 1), {"updated": {"from": "2021-05-01T00:00:00.000+0000"}}),
+    (FilterMode.STANDARD, None, {"status": ["inReview", "onTheSideOfUser", "open"]}),
+    (FilterMode.OPEN, None, {"status": ["inReview", "open"]}),
+    (FilterMode.CLOSED, None, {"status": ["closed", "resolved"]}),
+    (
+        FilterMode.CLOSED_THIS_MONTH,
+        None,
+        {"status": ["closed", "resolved"], "updated": {"from": "2021-05-16T00:00:00.000+0000"}},
+    ),
+    (
+        FilterMode.CLOSED_PREVIOUS_MONTH,
+        None,
+        {"status": ["closed", "resolved"], "updated": {"from": "2021-04-16T00:00:00.000+0000"}},
+    ),
+))
+def test_plan_query(mode, from_date, expected, set_timezone):
+    set_timezone("UTC")
+    assert plan_query(mode=mode, config={"month_start": 16}, from_date=from_date) == expected
+
+
+@pytest.mark.freeze_time("2021-05-26")
+def test_plan_query_keeps_local_start_of_month(set_timezone):
+    set_timezone("Europe/Moscow")
+    closed_after_local_midnight = Homework(
+        "PCR-12345",
+        "[1] Даниил Хармс (yuvachev@yandex.ru)",
+        "1",
+        "closed",
+        "2021-05-15T22:30:00.000+0000",  # 01:30 on May 16 in Moscow
+        "",
+        1,
+        "backend-developer",
+    )
+    config = {"month_start": 16}
+    expression = plan_query(mode=FilterMode.CLOSED_THIS_MONTH, config=config)
+    assert expression["updated"] == {"from": "2021-05-15T21:00:00.000+0000"}
+    assert expression["updated"]["from"] <= "2021-05-15T22:30:00.000+0000"  # Fetched...
+    assert filter_homeworks([closed_after_local_midnight], mode=FilterMode.CLOSED_THIS_MONTH, config=config)  # Kept
@@ -56,3 +56,29 @@ def test_left(status_updated, expected):
         "backend-developer",
     )
     assert homework.left == expected
+
+
+def test_derived_fields_are_computed_once():
+    homework = Homework(
+        "PCR-12345",
+        "[1] Даниил Хармс (yuvachev@yandex.ru)",
+        "1+",
+        "inReview",
+        "2021-05-11T02:13:00.000+0000",
+        "Ревизор: ==https://praktikum-admin.yandex-team.ru/office/revisor-review/123/abc",
+        1,
+        "backend-developer",
+    )
+    assert not hasattr(homework, "__dict__")
+    assert homework.revisor_url == "https://praktikum-admin.yandex-team.ru/office/revisor-review/123/abc"
+    assert homework.issue_url == "https://st.yandex-team.ru/PCR-12345"
+    assert homework.deadline == datetime(2021, 5, 12, 2, 13, tzinfo=timezone.utc)
+    assert homework.second_name_slug == "harms"
+    before, after = homework.deadline - timedelta(minutes=5), homework.deadline + timedelta(minutes=5)
+    assert (homework.left_at(before), homework.deadline_missed_at(before)) == ("0:05", False)
+    assert (homework.left_at(after), homework.deadline_missed_at(after)) == ("-0:05", True)
+
+
+def test_missing_description():
+    homework = Homework("PCR-1", "[1] A B (a@b)", "1", "open", "2020-09-23T22:14:37.658+0000", None, 1, "c")
+    assert homework.revisor_url is None
@@ -0,0 +1,110 @@
+from unittest import mock
+
+import pytest
+import requests
+
+from prpr.http_client import HttpClient, IncompleteDownload, Manifest
+
+URL = "https://example.com/hw_1.zip"
+
+
+def _response(*chunks, status_code=200, headers=None):
+    response = mock.MagicMock(status_code=status_code, headers=headers or {})
+    response.__enter__.return_value = response
+
+    def iter_content(chunk_size):
+        for chunk in chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    response.iter_content.side_effect = iter_content
+    return response
+
+
+@pytest.fixture()
+def client():
+    return HttpClient({"retries": 2, "backoff_factor": 0})
+
+
+@pytest.fixture()
+def path(tmp_path):
+    return tmp_path / "hw_1.zip"
+
+
+def test_download(client, path):
+    response = _response(b"PK", b"data", headers={"Content-Length": "6", "ETag": '"v1"'})
+    with mock.patch.object(client.session, "get", return_value=response):
+        assert client.download(URL, path) == 6
+    assert path.read_bytes() == b"PKdata"
+    assert sorted(p.name for p in path.parent.iterdir()) == ["hw_1.zip", "hw_1.zip.json"]
+    assert Manifest.load(path) == Manifest(url=URL, size=6, etag='"v1"', complete=True)
+
+
+def test_download_resumes_dropped_connection(client, path):
+    headers = {"Content-Length": "6", "ETag": '"v1"'}
+    responses = [
+        _response(b"PK", requests.exceptions.ChunkedEncodingError(), headers=headers),
+        _response(b"data", status_code=206, headers={"Content-Length": "4", "ETag": '"v1"'}),
+    ]
+    with mock.patch.object(client.session, "get", side_effect=responses) as get:
+        client.download(URL, path)
+    assert get.call_count == 2
+    assert get.call_args.kwargs["headers"] == {"Range": "bytes=2-", "If-Range": '"v1"'}
+    assert path.read_bytes() == b"PKdata"
+    assert Manifest.load(path).complete
+
+
+def test_download_starts_over_if_range_is_ignored(client, path):
+    headers = {"Content-Length": "6", "ETag": '"v1"'}
+    responses = [
+        _response(b"PK", requests.exceptions.ChunkedEncodingError(), headers=headers),
+        _response(b"PKdata", headers=headers),
+    ]
+    with mock.patch.object(client.session, "get", side_effect=responses):
+        client.download(URL, path)
+    assert path.read_bytes() == b"PKdata"
+
+
+def test_download_gives_up(client, path):
+    responses = [_response(b"PK", requests.exceptions.ChunkedEncodingError()) for _ in range(3)]
+    with mock.patch.object(client.session, "get", side_effect=responses) as get:
+        with pytest.raises(IncompleteDownload):
+            client.download(URL, path)
+    assert get.call_count == 3
+    assert not path.exists()
+
+
+def test_failed_requests_are_retried_once_per_attempt(client, path):
+    with mock.patch("urllib3.connection.HTTPConnection.connect", side_effect=ConnectionRefusedError) as connect:
+        with pytest.raises(requests.ConnectionError):
+            client.download("http://127.0.0.1:9/hw_1.zip", path)
+    assert connect.call_count == 3  # By the session alone, not multiplied by the retries of the download
+    assert not path.exists()
+
+
+def test_fetch_skips_complete_file(client, path):
+    path.write_bytes(b"PKdata")
+    Manifest(url=URL, size=6, etag='"v1"', complete=True).save(path)
+    with mock.patch.object(client.session, "get") as get:
+        assert not client.fetch(URL, path)
+    get.assert_not_called()
+
+
+def test_fetch_replaces_incomplete_file(client, path):
+    path.write_bytes(b"PK")
+    Manifest(url=URL, size=6, etag='"v1"', complete=True).save(path)
+    with mock.patch.object(client.session, "get", return_value=_response(b"PKdata")):
+        assert client.fetch(URL, path)
+    assert path.read_bytes() == b"PKdata"
+
+
+@pytest.mark.parametrize("etag,changed", (('"v1"', False), ('"v2"', True)))
+def test_fetch_refresh(etag, changed, client, path):
+    path.write_bytes(b"PKdata")
+    Manifest(url=URL, size=6, etag='"v1"', complete=True).save(path)
+    with mock.patch.object(client.session, "head", return_value=mock.Mock(headers={"ETag": etag})), mock.patch.object(
+        client.session, "get", return_value=_response(b"PKnew", headers={"ETag": etag})
+    ):
+        assert client.fetch(URL, path, refresh=True) == changed
+    assert path.read_bytes() == (b"PKnew" if changed else b"PKdata")
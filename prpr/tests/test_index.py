@@ -0,0 +1,70 @@
+import pytest
+
+from prpr.columns import HomeworkColumns
+from prpr.homework import CLOSED_STATUSES, OPEN_STATUSES, Homework
+from prpr.index import HomeworkIndex
+
+STUDENTS = (
+    "Даниил Хармс (yuvachev@yandex.ru)",
+    "Александр Введенский (vvedensky@yandex.ru)",
+    "Николай Олейников (oleynikov@yandex.ru)",
+)
+
+
+def _homework(number, status="open", student=STUDENTS[0]):
+    return Homework(
+        f"PCR-{number}",
+        f"[{number % 4 + 1}] {student}",
+        str(number % 3 + 1),
+        status,
+        "2021-05-11T02:13:00.000+0000",
+        "",
+        number,
+        "backend-developer",
+    )
+
+
+@pytest.fixture()
+def homeworks():
+    statuses = ("open", "inReview", "onTheSideOfUser", "closed")
+    return [_homework(n, statuses[n % len(statuses)], STUDENTS[n % len(STUDENTS)]) for n in range(1, 101)]
+
+
+@pytest.mark.parametrize(
+    "conditions",
+    (
+        {"statuses": OPEN_STATUSES},
+        {"statuses": CLOSED_STATUSES, "problems": [1, 2], "cohorts": ["2"]},
+        {"number": 42},
+        {"student": "Хармс"},
+        {"student": "ХА"},
+        {"student": "ov@yandex", "problems": [3]},
+        {"student": "nobody"},
+    ),
+)
+def test_lookup_matches_scan(conditions, homeworks):
+    expected = HomeworkColumns(homeworks).where(**conditions)
+    assert HomeworkIndex(homeworks).lookup(**conditions) == expected
+
+
+def test_sync_reindexes_changed_homeworks_only(homeworks):
+    index = HomeworkIndex(homeworks)
+    conditions = {"student": "хармс", "statuses": CLOSED_STATUSES}
+    assert 12 not in [homeworks[i].number for i in index.lookup(**conditions)]
+    refreshed = [_homework(12, "closed", STUDENTS[0])] + [hw for hw in homeworks if hw.number not in {12, 24}]
+    assert index.sync(refreshed) == 1
+    assert len(index) == 99
+    assert index.lookup(**conditions) == HomeworkColumns(refreshed).where(**conditions)
+    assert index.lookup(**conditions)[0] == 0
+    assert index.lookup(number=24) == []
+
+
+def test_replace_reindexes_given_homeworks_only(homeworks):
+    index = HomeworkIndex(homeworks)
+    closed = _homework(12, "closed", STUDENTS[0])
+    assert index.replace({11: closed, 12: homeworks[12]}) == 1
+    refreshed = homeworks[:11] + [closed] + homeworks[12:]
+    conditions = {"student": "хармс", "statuses": CLOSED_STATUSES}
+    assert index.lookup(**conditions) == HomeworkColumns(refreshed).where(**conditions)
+    with pytest.raises(AssertionError):
+        index.replace({0: closed})  # Not its position
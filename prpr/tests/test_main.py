@@ -0,0 +1,65 @@
+import subprocess
+import threading
+from argparse import Namespace
+from dataclasses import replace
+from unittest import mock
+
+from prpr.benchmarks.synthetic import make_issue_records
+from prpr.filters import FilterMode
+from prpr.main import FetchedHomeworks, download_and_process, select_homeworks
+
+
+class SignallingDownloader:
+    """Yields the homeworks one by one, signals when the last one is requested (i.e. the previous one is done)."""
+
+    def __init__(self):
+        self.last_requested = threading.Event()
+
+    def download_batch(self, homeworks, print_banner=False):
+        for index, homework in enumerate(homeworks):
+            if index == len(homeworks) - 1:
+                self.last_requested.set()
+            yield [homework]
+
+
+def test_download_and_process_overlaps_stages(capsys):
+    downloader = SignallingDownloader()
+
+    def post_process_homework(results, homework, config, print_step_output, refresh):
+        # Blocks the processing of the first homework until the last one is being downloaded:
+        # download_and_process would never get there if the stages ran one after another
+        assert downloader.last_requested.wait(timeout=10), "The downloads wait for the processing"
+        return [("echo", subprocess.CompletedProcess([], 0, stdout=f"{homework} processed"))]
+
+    homeworks = ["PCR-1", "PCR-2", "PCR-3"]
+    args = Namespace(post_process=True, open=False, refresh=False)
+    with mock.patch("prpr.post_process.post_process_homework", side_effect=post_process_homework):
+        download_and_process(downloader, homeworks, args, config={})
+    assert capsys.readouterr().out.splitlines() == ["PCR-1 processed", "PCR-2 processed", "PCR-3 processed"]
+
+
+def test_fetched_homeworks_are_updated_in_place():
+    records, histories = make_issue_records(200)
+    args = Namespace(
+        mode=FilterMode.OPEN, problems=None, no=None, student=None, cohorts=None, from_date=None, to_date=None
+    )
+    fetched = FetchedHomeworks(config={})
+    homeworks = fetched.update(records, histories)
+    columns = fetched.columns
+    select_homeworks(homeworks, args, {}, fetched=fetched)
+    kept = list(homeworks)
+
+    position = next(i for i, record in enumerate(records) if record.status == "closed")
+    records = list(records)
+    records[position] = replace(records[position], status="open", updated_at="2030-01-01T00:00:00.000+0000")
+    with mock.patch.object(fetched.index, "sync") as sync:  # Nothing is scanned in full
+        assert fetched.update(records, histories) is homeworks
+        selected = select_homeworks(homeworks, args, {}, fetched=fetched)
+    sync.assert_not_called()
+    assert fetched.columns is columns
+    assert [i for i, homework in enumerate(homeworks) if homework is not kept[i]] == [position]
+    assert homeworks[position] in selected
+    assert selected == select_homeworks(list(homeworks), args, {})  # Same as with the columns built anew
+
+    assert fetched.update(records[1:], histories) is not homeworks  # A ticket is gone, everything is rebuilt
+    assert fetched.columns is not columns
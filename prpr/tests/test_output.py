@@ -0,0 +1,56 @@
+import io
+import json
+
+import pytest
+from freezegun import freeze_time
+
+from prpr.homework import Homework
+from prpr.output import OutputFormat, stream_rows
+from prpr.table import COLUMN_NAMES
+
+
+@pytest.fixture()
+def homeworks():
+    return [
+        Homework(
+            f"PCR-{number}",
+            f"[{number}] Даниил Хармс (yuvachev@yandex.ru)",
+            "1",
+            status,
+            "2021-05-11T02:13:00.000+0000",
+            "",
+            number,
+            "backend-developer",
+        )
+        for number, status in ((1, "open"), (2, "closed"), (3, "inReview"))
+    ]
+
+
+@freeze_time("2021-05-11T10:00:00+00:00")
+@pytest.mark.parametrize("output_format", (OutputFormat.TSV, OutputFormat.JSONL, OutputFormat.PLAIN))
+def test_stream_rows(output_format, homeworks):
+    file = io.StringIO()
+    stream_rows(homeworks, output_format, last=2, file=file)
+    lines = file.getvalue().splitlines()
+
+    if output_format == OutputFormat.TSV:
+        header, *lines = lines
+        assert header.split("\t") == list(COLUMN_NAMES)
+        rows = [line.split("\t") for line in lines]
+    elif output_format == OutputFormat.JSONL:
+        rows = [list(json.loads(line).values()) for line in lines]
+    else:
+        rows = [line.split(" ") for line in lines]
+    assert [row[:3] for row in rows] == [
+        ["1", "https://st.yandex-team.ru/PCR-2", "2"],
+        ["2", "https://st.yandex-team.ru/PCR-3", "3"],
+    ]
+    if output_format == OutputFormat.PLAIN:
+        assert all("" not in row for row in rows)
+    else:
+        assert all(len(row) == len(COLUMN_NAMES) for row in rows)
+
+
+def test_output_format_from_string():
+    assert OutputFormat.from_string("jsonl") == OutputFormat.JSONL
+    assert str(OutputFormat.TSV) == "tsv"
@@ -0,0 +1,145 @@
+import time
+
+import pytest
+
+from prpr.download import DownloadedResult
+from prpr.post_process import collect_steps, post_process_homework, run_steps
+
+RUNNER = ["bash", "-c"]
+
+
+@pytest.fixture()
+def results(tmp_path):
+    return [
+        DownloadedResult(
+            zipfile=tmp_path / f"hw_{iteration}.zip",
+            iteration_directory=tmp_path / f"it_0{iteration}_{iteration}",
+            homework_directory=tmp_path,
+            iteration=iteration,
+            id=str(iteration),
+        )
+        for iteration in (1, 2)
+    ]
+
+
+def test_collect_steps_resolves_needs():
+    steps = collect_steps(
+        [
+            ("default", {"steps": {"install": "pip install", "diff": "diff"}}),
+            ("course.default", {"steps": {"pytest": {"command": "pytest", "needs": "install"}}}),
+            ("course.problems.1", {"steps": {"install": "npm i", "lint": {"command": "lint", "needs": ["install"]}}}),
+        ]
+    )
+    assert [step.name for step in steps] == ["install", "diff", "pytest", "install", "lint"]
+    assert [step.needs for step in steps] == [[], [], [0], [], [3]]
+
+
+@pytest.mark.parametrize(
+    "steps",
+    (
+        {"a": {"command": "a", "needs": "b"}, "b": {"command": "b", "needs": "a"}},
+        {"a": {"command": "a", "needs": "missing"}},
+    ),
+)
+def test_collect_steps_rejects_bad_needs(steps):
+    with pytest.raises(SystemExit):
+        collect_steps([("default", {"steps": steps})])
+
+
+def test_run_steps_concurrently_in_dependency_order(results, tmp_path):
+    steps = collect_steps(
+        [
+            (
+                "default",
+                {
+                    "steps": {
+                        "first": "sleep 0.3 && echo first > {hw}/marker",
+                        "second": {"command": "cat {hw}/marker", "needs": "first"},
+                        "independent": "sleep 0.3 && echo independent",
+                    }
+                },
+            )
+        ]
+    )
+    started = time.monotonic()
+    run_steps(steps, RUNNER, results, print_step_output=False, workers=2)
+    assert time.monotonic() - started < 0.55
+    assert (tmp_path / "2_2_second.log").read_text() == "first\n"
+    assert (tmp_path / "2_2_independent.log").read_text() == "independent\n"
+
+
+def test_post_process_prints_output_in_order(results, tmp_path, capsys):
+    config = {
+        "process": {
+            "cache": False,
+            "default": {"steps": {"slow": "sleep 0.2 && echo slow", "diff": "echo {it_prev_zip_} {it_last_zip_}"}},
+        }
+    }
+    post_process_homework(results, config=config)
+    assert capsys.readouterr().out == "slow\n\nhw_1.zip hw_2.zip\n\n"
+    assert (tmp_path / "1_vs_2_1_2_diff.log").exists()
+
+
+def test_step_cache_replays_unchanged_steps(results, tmp_path, capsys):
+    results[-1].zipfile.write_bytes(b"zip")
+    steps = {"count": "echo run >> {hw}/runs", "after": {"command": "echo after", "needs": "count"}}
+    config = {"process": {"default": {"steps": steps}}}
+    post_process_homework(results, config=config)
+    post_process_homework(results, config=config)
+    assert (tmp_path / "runs").read_text() == "run\n"
+    assert capsys.readouterr().out == "\nafter\n\n" * 2
+
+    results[-1].zipfile.write_bytes(b"new zip")
+    post_process_homework(results, config=config)
+    assert (tmp_path / "runs").read_text() == "run\nrun\n"
+
+    config["download"] = {"extract": {"include": ["*.py"]}}  # Another tree from the same zip
+    post_process_homework(results, config=config)
+    assert (tmp_path / "runs").read_text() == "run\nrun\nrun\n"
+
+    post_process_homework(results, config=config, refresh=True)
+    assert (tmp_path / "runs").read_text() == "run\nrun\nrun\nrun\n"
+
+
+def test_step_cache_skips_failed_steps(results, tmp_path):
+    results[-1].zipfile.write_bytes(b"zip")
+    config = {"process": {"default": {"steps": {"lint": "echo run >> {hw}/runs && no-such-linter"}}}}
+    ((_, step_process),) = post_process_homework(results, config=config, print_step_output=False)
+    post_process_homework(results, config=config, print_step_output=False)
+    assert step_process.returncode == 127
+    assert (tmp_path / "runs").read_text() == "run\nrun\n"
+    assert not (tmp_path / ".prpr-steps").exists()
+
+
+def test_run_steps_one_after_another_by_default(results, tmp_path):
+    steps = collect_steps(
+        [
+            ("default", {"steps": {"first": "sleep 0.2 && echo first >> {hw}/order"}}),
+            ("course.default", {"steps": {"second": "echo second >> {hw}/order"}}),
+        ]
+    )
+    run_steps(steps, RUNNER, results, print_step_output=False)
+    assert (tmp_path / "order").read_text() == "first\nsecond\n"
+
+
+@pytest.mark.parametrize("workers", (1, 2))
+def test_run_steps_skips_steps_whose_needs_failed(results, tmp_path, workers):
+    steps = collect_steps(
+        [
+            (
+                "default",
+                {
+                    "steps": {
+                        "install": "exit 1",
+                        "tests": {"command": "echo tests", "needs": "install"},
+                        "report": {"command": "echo report", "needs": "tests"},
+                        "lint": "echo lint",
+                    }
+                },
+            )
+        ]
+    )
+    processed = run_steps(steps, RUNNER, results, print_step_output=False, workers=workers)
+    assert [(name, step_process.returncode) for name, step_process in processed] == [("install", 1), ("lint", 0)]
+    assert not (tmp_path / "2_2_tests.log").exists()
+    assert not (tmp_path / "2_2_report.log").exists()
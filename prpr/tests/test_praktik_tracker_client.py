@@ -2,6 +2,7 @@ from unittest import mock
 
 import pytest
 from loguru import logger
+from yandex_tracker_client.exceptions import TrackerClientError
 
 from prpr.startrack_client import PraktikTrackerClient
 
@@ -29,4 +30,47 @@ def test_get_issues(find_mock, user, filter_queue, client):
     logger.disable("prpr.startrack_client")
     client.get_issues(user)
     logger.enable("prpr.startrack_client")
-    find_mock.assert_called_once_with(filter=filter_queue)
+    find_mock.assert_called_once_with(filter=filter_queue, order=["+key"], per_page=50)
+
+
+def _issue(key, status="open", changes=(), error=None):
+    issue = mock.Mock()
+    issue.key = key
+    issue.status.key = status
+    if error:
+        issue.changelog.get_all.side_effect = error
+    else:
+        issue.changelog.get_all.return_value = list(changes)
+    return issue
+
+
+def test_get_status_histories(client):
+    logger.disable("prpr.startrack_client")
+    issues = [
+        _issue("PCR-1"),
+        _issue("PCR-2", status="closed"),
+        _issue("PCR-3", error=TrackerClientError()),
+    ]
+    histories = client.get_status_histories(issues)
+    logger.enable("prpr.startrack_client")
+    assert histories == {"PCR-1": [], "PCR-2": None, "PCR-3": []}
+    issues[1].changelog.get_all.assert_not_called()
+
+
+@mock.patch("yandex_tracker_client.collections.Issues.find")
+def test_get_issues_with_pushdown(find_mock, client):
+    logger.disable("prpr.startrack_client")
+    client.get_issues(pushdown={"status": ["inReview", "open"]})
+    logger.enable("prpr.startrack_client")
+    find_mock.assert_called_once_with(
+        filter={"queue": "PCR", "assignee": "me()", "status": ["inReview", "open"]}, order=["+key"], per_page=50
+    )
+
+
+@mock.patch("yandex_tracker_client.collections.Issues.find")
+def test_iter_issues(find_mock, client):
+    logger.disable("prpr.startrack_client")
+    find_mock.return_value = [_issue(f"PCR-{i}") for i in range(5)]
+    pages = list(client.iter_issues(per_page=2))
+    logger.enable("prpr.startrack_client")
+    assert [[issue.key for issue in page] for page in pages] == [["PCR-0", "PCR-1"], ["PCR-2", "PCR-3"], ["PCR-4"]]
@@ -0,0 +1,62 @@
+import json
+import threading
+
+import pytest
+
+from prpr import profiling
+from prpr.profiling import Profiler, profiled, span
+
+
+@pytest.fixture()
+def profiler(monkeypatch):
+    profiler = Profiler()
+    profiler.enable()
+    monkeypatch.setattr(profiling, "PROFILER", profiler)
+    return profiler
+
+
+def test_disabled_profiler_keeps_nothing(monkeypatch):
+    profiler = Profiler()
+    monkeypatch.setattr(profiling, "PROFILER", profiler)
+    with span("phase") as phase:
+        phase.add(items=1, bytes=1)
+    assert profiler.summarize() == []
+
+
+def test_summary_per_phase(profiler):
+    @profiled("phase.decorated")
+    def decorated():
+        pass
+
+    for size in range(1, 21):
+        with span("phase.fetch") as fetching:
+            fetching.add(items=1, bytes=size)
+    threads = [threading.Thread(target=decorated) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    fetch, decorated_summary = profiler.summarize()
+    assert (fetch.name, fetch.calls, fetch.items, fetch.bytes) == ("phase.fetch", 20, 20, 210)
+    assert 0 <= fetch.p50 <= fetch.p95 <= fetch.total
+    assert (decorated_summary.name, decorated_summary.calls) == ("phase.decorated", 3)
+
+
+def test_trace_is_chrome_json(profiler, tmp_path):
+    with span("outer", homework="PCR-1"):
+        with span("inner") as inner:
+            inner.add(bytes=42)
+    profiler.write_trace(tmp_path / "trace.json")
+
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert [event["ph"] for event in events] == ["M", "X", "X"]
+    outer, inner = events[1:]
+    assert (outer["name"], outer["args"], inner["name"], inner["args"]) == (
+        "outer",
+        {"homework": "PCR-1"},
+        "inner",
+        {"bytes": 42},
+    )
+    assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert events[0]["args"]["name"] == threading.current_thread().name
@@ -0,0 +1,76 @@
+import sqlite3
+from unittest import mock
+
+import requests
+
+from prpr.revisor import RevisorClient, find_zip_urls, load_firefox_cookies
+
+REVISOR_URL = "https://praktikum-admin.yandex-team.ru/office/revisor-review/123/abc"
+PAGE = (
+    '{"homework_url": "https:\\u002F\\u002Fcode.s3.yandex.net\\u002Fhw\\u002Fhw_12.zip", '
+    '"homework_url":"https://code.s3.yandex.net/hw/hw_34.zip"}'
+)
+API_URL = "https://example.com/api/reviews/{review_id}?hash={review_hash}"
+REVIEW = {  # The shape of a review: the zips are in its iterations, next to the other urls
+    "id": 123,
+    "hash": "abc",
+    "status": "in_review",
+    "homework": {"title": "Проект спринта: сервис YaMDb", "repository_url": "https://github.com/student/api_yamdb"},
+    "iterations": [
+        {
+            "number": 2,
+            "homework_url": "https://code.s3.yandex.net/hw/hw_34.zip",
+            "created_at": "2021-05-18T10:00:00.000+0000",
+        },
+        {
+            "number": 1,
+            "homework_url": "https://code.s3.yandex.net/hw/hw_12.zip",
+            "created_at": "2021-05-11T10:00:00.000+0000",
+            "comments": [{"file": "api/views.py", "line": 7, "text": "Лучше вынести в сериализатор"}],
+        },
+    ],
+}
+
+
+def test_find_zip_urls():
+    assert find_zip_urls(PAGE) == [
+        "https://code.s3.yandex.net/hw/hw_12.zip",
+        "https://code.s3.yandex.net/hw/hw_34.zip",
+    ]
+
+
+def test_load_firefox_cookies(tmp_path):
+    connection = sqlite3.connect(str(tmp_path / "cookies.sqlite"))
+    connection.execute("CREATE TABLE moz_cookies (name, value, host, path, isSecure)")
+    connection.executemany(
+        "INSERT INTO moz_cookies VALUES (?, ?, ?, ?, ?)",
+        [("Session_id", "secret", ".yandex-team.ru", "/", 1), ("other", "value", ".example.com", "/", 0)],
+    )
+    connection.commit()
+    connection.close()
+    jar = load_firefox_cookies(tmp_path)
+    assert dict(jar) == {"Session_id": "secret"}
+
+
+def test_get_zip_urls():
+    client = RevisorClient({"api_url": API_URL})
+    with mock.patch.object(client.session, "get") as get:
+        get.return_value.json.return_value = REVIEW
+        assert client.get_zip_urls(REVISOR_URL) == [
+            "https://code.s3.yandex.net/hw/hw_12.zip",
+            "https://code.s3.yandex.net/hw/hw_34.zip",
+        ]
+    get.assert_called_once_with("https://example.com/api/reviews/123?hash=abc", timeout=60)
+
+
+def test_get_zip_urls_from_page():
+    client = RevisorClient({"api_url": "{revisor_url}"})
+    with mock.patch.object(client.session, "get") as get:
+        get.return_value.json.side_effect = ValueError  # An HTML page
+        assert client.get_zip_urls(REVISOR_URL) == []
+
+
+def test_get_zip_urls_failure():
+    client = RevisorClient({"api_url": API_URL})
+    with mock.patch.object(client.session, "get", side_effect=requests.ConnectionError):
+        assert client.get_zip_urls(REVISOR_URL) == []
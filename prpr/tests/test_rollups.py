@@ -0,0 +1,107 @@
+import datetime as dt
+
+import pytest
+from freezegun import freeze_time
+
+from prpr.homework import Homework, Status, StatusTransition
+from prpr.rollups import PayoutRollups, RollupRow, print_payout_stats
+
+MONTH_START = 16
+TODAY = dt.date(2021, 5, 20)
+
+
+def _homework(key, status, status_updated, problem=1, transitions=None):
+    return Homework(
+        issue_key=key,
+        summary=f"[{problem}] Даниил Хармс (yuvachev@yandex.ru)",
+        cohort="16",
+        status=status,
+        status_updated=status_updated,
+        description="",
+        number=int(key.split("-")[1]),
+        course="backend-developer",
+        transitions=transitions,
+    )
+
+
+def _in_review(key, timestamp, problem=1):
+    """In review for the second time, the iteration is known."""
+    changed_at = dt.datetime.fromisoformat(timestamp.replace(".000+0000", "+00:00"))
+    transitions = [
+        StatusTransition(None, Status.OPEN, changed_at),
+        StatusTransition(Status.OPEN, Status.IN_REVIEW, changed_at),
+        StatusTransition(Status.IN_REVIEW, Status.ON_THE_SIDE_OF_USER, changed_at),
+        StatusTransition(Status.ON_THE_SIDE_OF_USER, Status.OPEN, changed_at),
+        StatusTransition(Status.OPEN, Status.IN_REVIEW, changed_at),
+    ]
+    return _homework(key, "inReview", timestamp, problem, transitions)
+
+
+@pytest.fixture()
+def rollups(tmp_path):
+    with PayoutRollups(tmp_path / "rollups.sqlite3") as rollups:
+        yield rollups
+
+
+def test_counts_closed_homeworks_by_payout_month(rollups):
+    homeworks = [
+        _homework("PCR-1", "closed", "2021-04-20T10:00:00.000+0000"),
+        _homework("PCR-2", "resolved", "2021-05-15T10:00:00.000+0000"),
+        _homework("PCR-3", "closed", "2021-05-16T10:00:00.000+0000", problem=2),
+        _homework("PCR-4", "open", "2021-05-17T10:00:00.000+0000"),
+    ]
+    assert rollups.update(None, homeworks, MONTH_START, today=TODAY) == 2
+    assert rollups.rollups(None) == [
+        RollupRow("2021-05-16", "backend-developer", 2, 0, 1),
+        RollupRow("2021-04-16", "backend-developer", 1, 0, 2),
+    ]
+    assert rollups.rollups(None, dt.date(2021, 4, 16)) == [RollupRow("2021-04-16", "backend-developer", 1, 0, 2)]
+    assert rollups.rollups("someone") == []
+
+
+def test_recounts_only_changed_months(rollups):
+    homeworks = [
+        _homework("PCR-1", "closed", "2021-05-17T10:00:00.000+0000"),
+        _in_review("PCR-2", "2021-05-18T10:00:00.000+0000"),
+    ]
+    assert rollups.update(None, homeworks, MONTH_START, today=TODAY) == 1
+    assert rollups.update(None, homeworks, MONTH_START, today=TODAY) == 0
+
+    homeworks[1] = _homework("PCR-2", "closed", "2021-05-19T10:00:00.000+0000")
+    assert rollups.update(None, homeworks, MONTH_START, today=TODAY) == 1
+    assert rollups.rollups(None) == [
+        RollupRow("2021-05-16", "backend-developer", 1, 0, 1),
+        RollupRow("2021-05-16", "backend-developer", 1, 2, 1),  # The iteration seen while it was in review
+    ]
+
+
+def test_sealed_months_are_not_recomputed(rollups):
+    homeworks = [_homework("PCR-1", "closed", "2021-04-20T10:00:00.000+0000")]
+    rollups.update(None, homeworks, MONTH_START, complete=False, today=TODAY)
+    assert rollups.sealed_months(None) == set()
+
+    rollups.update(None, homeworks, MONTH_START, today=TODAY)
+    assert rollups.sealed_months(None) == {"2021-04-16"}
+
+    reopened = [_homework("PCR-1", "open", "2021-05-18T10:00:00.000+0000"), *homeworks[1:]]
+    late = [_homework("PCR-2", "closed", "2021-05-01T10:00:00.000+0000")]
+    assert rollups.update(None, reopened + late, MONTH_START, today=TODAY) == 0
+    assert rollups.rollups(None) == [RollupRow("2021-04-16", "backend-developer", 1, 0, 1)]
+
+
+@freeze_time("2021-05-20 12:00:00")
+def test_prints_a_section_per_month(rollups, capsys):
+    homeworks = [
+        _homework("PCR-1", "closed", "2021-04-20T10:00:00.000+0000"),
+        _homework("PCR-2", "closed", "2021-04-21T10:00:00.000+0000", problem=2),
+        _homework("PCR-3", "closed", "2021-05-17T10:00:00.000+0000"),
+    ]
+    rollups.update(None, homeworks, MONTH_START, today=TODAY)
+    print_payout_stats(rollups.rollups(None), rollups.sealed_months(None), MONTH_START)
+    lines = capsys.readouterr().out.splitlines()
+    months = [i for i, line in enumerate(lines) if "2021-" in line and "–" in line]
+    assert len(months) == 2
+    assert "2021-05-16 – 2021-06-15 ⏳" in lines[months[0]]
+    assert "2021-04-16 – 2021-05-15 🔒" in lines[months[1]]
+    separator = lines[months[1] - 1]
+    assert "─" in separator and not any(c.isalnum() for c in separator)
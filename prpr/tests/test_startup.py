@@ -0,0 +1,51 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+LAZY_MODULES = (
+    "selenium",
+    "questionary",
+    "pyfiglet",
+    "transliterate",
+    "yandex_tracker_client",
+    "requests",
+    "urllib3",
+    "sqlite3",
+    "rich.live",
+    "prpr.cache",
+    "prpr.download",
+    "prpr.http_client",
+    "prpr.post_process",
+    "prpr.revisor",
+    "prpr.rollups",
+    "prpr.startrack_client",
+    "prpr.unzip",
+    "prpr.watch",
+)
+STARTUP_BUDGET_SECONDS = 0.5  # About 0.2 s with the lazy imports, 0.4 s before them
+ROOT = Path(__file__).parents[2]
+
+
+def test_help_doesnt_import_heavy_modules():
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "prpr.main", "--help"],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        check=True,
+    )
+    imported = {}
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, name = line.split("|")
+            imported[name.strip()] = (len(name) - len(name.lstrip()), int(cumulative))
+    assert not [module for module in LAZY_MODULES if module in imported]
+    total = sum(cumulative for indent, cumulative in imported.values() if indent == 1)
+    assert total / 1e6 < STARTUP_BUDGET_SECONDS
+
+
+def test_import_doesnt_load_heavy_modules():
+    code = f"import json, sys, prpr.main; print(json.dumps([m for m in {list(LAZY_MODULES)!r} if m in sys.modules]))"
+    process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT, check=True)
+    assert json.loads(process.stdout) == []
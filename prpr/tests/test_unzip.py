@@ -0,0 +1,91 @@
+import zipfile
+
+import pytest
+
+from prpr.unzip import Extractor, ExtractSettings, UnsafeZipError
+
+
+@pytest.mark.parametrize(
+    "name,wanted",
+    (
+        ("project/manage.py", True),
+        ("project/venv/lib/site.py", False),
+        ("venv/lib/site.py", False),
+        ("project/app/__pycache__/views.cpython-39.pyc", False),
+        ("project/.git/HEAD", False),
+        ("project/static/vendor/jquery.js", False),
+        ("project/static/app.js", True),
+        ("project/debug.log", False),
+    ),
+)
+def test_wanted(name, wanted):
+    exclude = ExtractSettings().exclude + ["*.log", "*/vendor/*"]
+    download_config = {"extract": {"courses": {"backend-developer": {"exclude": exclude}}}}
+    settings = ExtractSettings.for_course(download_config, "backend-developer")
+    assert settings.wanted(name) == wanted
+
+
+def test_include():
+    settings = ExtractSettings(include=["*.py"])
+    assert settings.wanted("project/manage.py")
+    assert not settings.wanted("project/README.md")
+    assert not settings.wanted("project/venv/site.py")
+
+
+def _zip(path, files):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return path
+
+
+def test_extract(tmp_path):
+    files = {f"project/app/module_{i}.py": f"x = {i}" for i in range(20)}
+    files["project/node_modules/left-pad/index.js"] = "module.exports = 1"
+    homework_zip = _zip(tmp_path / "hw_1.zip", files)
+    target = tmp_path / "it_01_1"
+    assert Extractor({}).extract(homework_zip, target) == 20
+    assert (target / "project/app/module_7.py").read_text() == "x = 7"
+    assert not (target / "project/node_modules").exists()
+
+
+@pytest.mark.parametrize("extract_config", ({"max_ratio": 100}, {"max_size": 1024}))
+def test_extract_refuses_bombs(extract_config, tmp_path):
+    homework_zip = _zip(tmp_path / "hw_1.zip", {"zeros": b"\0" * 10 * 1024 * 1024})
+    with pytest.raises(UnsafeZipError):
+        Extractor({"extract": extract_config}).extract(homework_zip, tmp_path / "it_01_1")
+
+
+def test_extract_keeps_members_inside_target(tmp_path):
+    homework_zip = _zip(tmp_path / "hw_1.zip", {"../../x/y.py": "x = 1", "/abs/dir/z.py": "z = 1"})
+    target = tmp_path / "homework" / "it_01_1"
+    assert Extractor({}).extract(homework_zip, target) == 2
+    assert (target / "x/y.py").read_text() == "x = 1"
+    assert (target / "abs/dir/z.py").read_text() == "z = 1"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["homework", "hw_1.zip"]
+
+
+def test_extract_keeps_permissions(tmp_path):
+    homework_zip = tmp_path / "hw_1.zip"
+    with zipfile.ZipFile(homework_zip, "w") as archive:
+        for name, mode in (("project/gradlew", 0o755), ("project/build.gradle", 0o644)):
+            info = zipfile.ZipInfo(name)
+            info.create_system = 3
+            info.external_attr = mode << 16
+            archive.writestr(info, "#!/bin/sh\n")
+    extractor = Extractor({"directory": str(tmp_path), "dedup": True})
+    for target in (tmp_path / "it_01_1", tmp_path / "it_02_2"):
+        extractor.extract(homework_zip, target)
+        assert (target / "project/gradlew").stat().st_mode & 0o777 == 0o755
+        assert (target / "project/build.gradle").stat().st_mode & 0o777 == 0o644
+    assert (tmp_path / "it_01_1/project/gradlew").samefile(tmp_path / "it_02_2/project/gradlew")
+    assert not (tmp_path / "it_01_1/project/gradlew").samefile(tmp_path / "it_01_1/project/build.gradle")
+
+
+@pytest.mark.parametrize(
+    "extract_config",
+    ({"max_sise": 1024}, {"courses": {"backend-developer": {"exclude": []}, "frontend": {"inlcude": ["*.js"]}}}),
+)
+def test_unknown_settings_are_rejected(extract_config):
+    with pytest.raises(SystemExit):
+        ExtractSettings.for_course({"extract": extract_config}, "backend-developer")
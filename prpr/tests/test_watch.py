@@ -0,0 +1,56 @@
+from unittest import mock
+
+import pytest
+import requests
+
+from prpr.cli import configure_arg_parser
+from prpr.homework import Homework
+from prpr.watch import _render, watch
+
+
+def _homework():
+    return Homework(
+        "PCR-12345",
+        "[1] Даниил Хармс (yuvachev@yandex.ru)",
+        "1",
+        "open",
+        "2021-05-11T02:13:00.000+0000",
+        "",
+        1,
+        "backend-developer",
+    )
+
+
+def test_watch_polls_only_after_interval():
+    fetch = mock.Mock(return_value=[_homework()])
+    monotonic = iter([0, 0, 60, 60, 120, 120, 120])
+    sleeps = [None, None, KeyboardInterrupt()]
+    with mock.patch("prpr.watch.time.monotonic", side_effect=lambda: next(monotonic)), mock.patch(
+        "prpr.watch.time.sleep", side_effect=sleeps
+    ) as sleep:
+        watch(fetch=fetch, select=list, interval=120, refresh=True)
+
+    assert fetch.call_args_list == [mock.call(True), mock.call(False)]
+    assert sleep.call_args_list == [mock.call(60), mock.call(60), mock.call(60)]
+
+
+def test_watch_survives_failed_polls():
+    homeworks = [_homework()]
+    fetch = mock.Mock(side_effect=[homeworks, requests.ConnectionError("VPN is down"), homeworks])
+    monotonic = iter([0, 0, 60, 60, 60, 120, 120, 120])
+    sleeps = [None, None, KeyboardInterrupt()]
+    with mock.patch("prpr.watch.time.monotonic", side_effect=lambda: next(monotonic)), mock.patch(
+        "prpr.watch.time.sleep", side_effect=sleeps
+    ), mock.patch("prpr.watch._render", wraps=_render) as render:
+        watch(fetch=fetch, select=list, interval=60)
+
+    assert fetch.call_count == 3
+    errors = [call.args[3] if len(call.args) > 3 else None for call in render.call_args_list]
+    assert [type(error) for error in errors] == [type(None), requests.ConnectionError, type(None)]
+    assert all(call.args[0] == homeworks for call in render.call_args_list)  # The last table is kept
+
+
+@pytest.mark.parametrize("interval", ("0", "-5"))
+def test_watch_interval_is_positive(interval):
+    with pytest.raises(SystemExit):
+        configure_arg_parser().parse_args(["--watch", interval])
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import fnmatch
+import os
+import stat
+import sys
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from pathlib import Path, PurePosixPath
+from typing import Optional
+
+from loguru import logger
+
+from prpr.blobs import BlobStore, configure_blob_store
+
+DEFAULT_EXCLUDE = ["venv", ".venv", "env", "node_modules", ".git", "__pycache__", ".idea", ".DS_Store"]
+DEFAULT_EXTRACT_WORKERS = 4
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024  # bytes, uncompressed
+DEFAULT_MAX_RATIO = 200  # uncompressed / compressed, per member
+RATIO_CHECK_MIN_SIZE = 1024 * 1024  # small files of zeros are fine
+
+
+class UnsafeZipError(Exception):
+    pass
+
+
+@dataclass
+class ExtractSettings:
+    """download.extract section of the config, with download.extract.courses.<course> merged in.
+
+    A pattern without a slash matches any path component (e.g. "venv" or "*.pyc"),
+    a pattern with one is matched against the whole path inside the zip (e.g. "*/static/vendor/*")."""
+
+    include: list[str] = field(default_factory=list)  # empty means everything
+    exclude: list[str] = field(default_factory=lambda: list(DEFAULT_EXCLUDE))
+    workers: int = DEFAULT_EXTRACT_WORKERS
+    max_size: int = DEFAULT_MAX_SIZE
+    max_ratio: float = DEFAULT_MAX_RATIO
+    lazy: bool = False
+
+    @staticmethod
+    def for_course(download_config, course: Optional[str] = None) -> ExtractSettings:
+        extract_config = dict(download_config.get("extract", {}))
+        courses_config = extract_config.pop("courses", {})
+        _check_keys("download.extract", extract_config)
+        for course_name, course_config in courses_config.items():
+            _check_keys(f"download.extract.courses.{course_name}", course_config)
+        settings = ExtractSettings(**{**extract_config, **courses_config.get(course, {})})
+        logger.debug(f"Extract settings for {course}: {settings}.")
+        return settings
+
+    def wanted(self, name: str) -> bool:
+        path = PurePosixPath(name)
+        if self.include and not any(_matches(path, pattern) for pattern in self.include):
+            return False
+        return not any(_matches(path, pattern) for pattern in self.exclude)
+
+
+class Extractor:
+    def __init__(self, download_config):
+        self.download_config = download_config
+        self.settings()  # Unknown keys stop the run before anything is downloaded
+        self.blob_store: Optional[BlobStore] = configure_blob_store(download_config)
+
+    def settings(self, course: Optional[str] = None) -> ExtractSettings:
+        return ExtractSettings.for_course(self.download_config, course)
+
+    def extract(self, homework_zip: Path, target: Path, course: Optional[str] = None) -> int:
+        """Extract the wanted members of `homework_zip` to `target`, return the number of files extracted."""
+        settings = self.settings(course)
+        with zipfile.ZipFile(homework_zip) as archive:
+            members = [info for info in archive.infolist() if settings.wanted(info.filename)]
+            _check_sizes(homework_zip, members, settings)
+            skipped = len(archive.infolist()) - len(members)
+            logger.debug(f"Extracting {len(members)} members of {homework_zip}, {skipped} skipped...")
+            files = []
+            for info in members:  # directories first, so that the workers don't race to create them
+                if info.is_dir():
+                    archive.extract(info, path=target)
+                else:
+                    _member_path(target, info.filename).parent.mkdir(parents=True, exist_ok=True)
+                    files.append(info)
+            with ThreadPoolExecutor(max_workers=max(1, settings.workers)) as executor:
+                list(executor.map(lambda info: _extract_file(archive, info, target), files))
+        if self.blob_store:
+            self.blob_store.add_tree(target)
+        return len(files)
+
+
+def _check_keys(section: str, section_config: dict) -> None:
+    if unknown_keys := sorted(section_config.keys() - {setting.name for setting in fields(ExtractSettings)}):
+        logger.error(f"Unknown keys in {section}: {', '.join(unknown_keys)} 😿")
+        sys.exit(1)
+
+
+def _matches(path: PurePosixPath, pattern: str) -> bool:
+    if "/" in pattern.strip("/"):
+        return fnmatch.fnmatch(str(path), pattern)
+    return any(fnmatch.fnmatch(part, pattern.strip("/")) for part in path.parts)
+
+
+def _extract_file(archive: zipfile.ZipFile, info: zipfile.ZipInfo, target: Path) -> None:
+    path = archive.extract(info, path=target)
+    # zipfile doesn't restore the permissions, the zips made on Unix keep them in the upper bits (e.g. gradlew's x)
+    if info.create_system == 3 and (mode := stat.S_IMODE(info.external_attr >> 16) & 0o777):
+        os.chmod(path, mode)
+
+
+def _member_path(target: Path, name: str) -> Path:
+    """Where `archive.extract` puts a member: like zipfile, drop the absolute prefixes and the ".." parts."""
+    parts = [part for part in PurePosixPath(name).parts if part not in {"/", ".", ".."}]
+    path = target.joinpath(*parts)
+    if not path.resolve().is_relative_to(target.resolve()):  # Through symlinks, say
+        raise UnsafeZipError(f"{name} points outside of {target} 😿")
+    return path
+
+
+def _check_sizes(homework_zip: Path, members: list[zipfile.ZipInfo], settings: ExtractSettings) -> None:
+    total_size = sum(info.file_size for info in members)
+    if total_size > settings.max_size:
+        raise UnsafeZipError(f"{homework_zip} unpacks to {total_size} bytes, more than {settings.max_size} 😿")
+    for info in members:
+        if info.file_size < RATIO_CHECK_MIN_SIZE:
+            continue
+        if not info.compress_size or info.file_size / info.compress_size > settings.max_ratio:
+            raise UnsafeZipError(
+                f"{info.filename} in {homework_zip} is compressed more than {settings.max_ratio} times 😿"
+            )
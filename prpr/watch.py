@@ -0,0 +1,62 @@
+import time
+from datetime import datetime
+from typing import Callable
+
+from loguru import logger
+from rich.console import RenderableType
+from rich.live import Live
+from rich.text import Text
+
+from prpr.homework import Homework
+from prpr.table import DISPLAYED_TAIL_LENGTH, build_issue_table
+
+TICK_INTERVAL = 60  # seconds between redraws, the "left" column shows minutes
+
+
+def watch(
+    fetch: Callable[[bool], list[Homework]],
+    select: Callable[[list[Homework]], list[Homework]],
+    interval: int,
+    refresh: bool = False,
+    title: str = None,
+) -> None:
+    """Keep the table on screen and up to date until interrupted.
+
+    `fetch` is polled every `interval` seconds and is expected to be incremental
+    (see PraktikTrackerClient.get_issue_records), in between the table is only redrawn locally
+    so that deadlines keep ticking. If a poll fails (the tracker is down, the VPN dropped), the last table
+    is kept on screen, marked as stale, until the next poll."""
+    if interval <= 0:
+        raise ValueError(f"Expected a positive interval, got {interval}")
+    homeworks = select(fetch(refresh))
+    updated_at, error = datetime.now(), None
+    next_poll = time.monotonic() + interval
+    try:
+        with Live(_render(homeworks, title, updated_at), auto_refresh=False) as live:
+            while True:
+                time.sleep(max(0.0, min(next_poll - time.monotonic(), TICK_INTERVAL)))
+                if time.monotonic() >= next_poll:
+                    logger.debug("Polling for updated homeworks...")
+                    try:
+                        homeworks = select(fetch(False))
+                        updated_at, error = datetime.now(), None
+                    except Exception as e:  # Whatever it is, the next poll may go fine
+                        logger.opt(exception=True).debug("Failed to poll for updated homeworks 😿")
+                        error = e
+                    next_poll = time.monotonic() + interval
+                live.update(_render(homeworks, title, updated_at, error), refresh=True)
+    except KeyboardInterrupt:
+        logger.debug("Stopped watching.")
+
+
+def _render(
+    homeworks: list[Homework], title: str = None, updated_at: datetime = None, error: Exception = None
+) -> RenderableType:
+    caption = f"Updated at {updated_at or datetime.now():%H:%M}, press Ctrl+C to stop watching"
+    if error:
+        caption = f"Stale, failed to update at {datetime.now():%H:%M} ({type(error).__name__}: {error}). {caption}"
+    if not homeworks:
+        return Text(f"No homeworks for chosen filter combination. {caption}.", style="dim")
+    table = build_issue_table(homeworks, last=DISPLAYED_TAIL_LENGTH, title=title)
+    table.caption = caption
+    return table